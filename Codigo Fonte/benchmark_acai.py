@@ -0,0 +1,544 @@
+"""
+Açaí do Senna - Benchmarks
+
+Medições de desempenho e testes de regressão do Otimizador de Turnos,
+executados sobre dados sintéticos em um diretório temporário.
+
+Uso:
+
+    python benchmark_acai.py memoria
+    python benchmark_acai.py memoria --renderizacoes 5000 --tolerancia-mb 10
+    python benchmark_acai.py inicializacao --repeticoes 5
+    python benchmark_acai.py concorrencia --processos 8 --registros 200
+    python benchmark_acai.py operacoes --dias 1 100 10000 --lojas 1 50 --saida atual.json
+    python benchmark_acai.py comparar base.json atual.json
+
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from controle_acesso_streamlit import (LOGO_PATH, TURNOS, AnaliseDados, AnaliseRede, GerenciadorDados,
+                                       VisualizacaoDados, obter_cache_carregamento)
+
+DIRETORIO_APP = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_APP = os.path.join(DIRETORIO_APP, "controle_acesso_streamlit.py")
+
+# Executados em um processo novo, para medir a inicialização a frio
+CODIGO_IMPORTACAO = """
+import time
+inicio = time.perf_counter()
+import controle_acesso_streamlit
+print(time.perf_counter() - inicio)
+"""
+CODIGO_RENDERIZACAO = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+inicio = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=300).run()
+print(time.perf_counter() - inicio)
+"""
+
+
+# Movimento médio por turno (Manhã, Tarde, Noite) e fator de cada dia da semana
+# (segunda a domingo) do tráfego sintético
+MOVIMENTO_TURNOS = np.array([30, 60, 45])
+FATOR_DIAS = np.array([0.80, 0.85, 0.90, 0.95, 1.15, 1.40, 1.25])
+
+
+def gerar_movimento(n_dias, fim=None, semente=0, escala=1.0):
+    """
+    Gera um histórico sintético de movimento com os três turnos por dia.
+
+    O tráfego segue o padrão de uma loja real: tarde mais movimentada que a
+    manhã, fins de semana mais cheios e sazonalidade anual com pico no verão
+    (janeiro), com variação aleatória de Poisson.
+
+    Args:
+        n_dias (int): Quantidade de dias do histórico.
+        fim (datetime.date, optional): Último dia do histórico. Padrão: ontem.
+        semente (int): Semente do gerador de números aleatórios.
+        escala (float): Fator de porte da loja aplicado a todo o movimento.
+
+    Returns:
+        pandas.DataFrame: Registros com as colunas data, turno e quantidade_pessoas.
+    """
+    fim = fim or date.today() - timedelta(days=1)
+    rng = np.random.default_rng(semente)
+    datas = pd.date_range(end=pd.Timestamp(fim), periods=n_dias, freq="D")
+    sazonalidade = 1 + 0.25 * np.cos(2 * np.pi * (datas.dayofyear.to_numpy() - 15) / 365.25)
+    fator_dia = escala * FATOR_DIAS[datas.weekday.to_numpy()] * sazonalidade
+    quantidades = rng.poisson(np.outer(fator_dia, MOVIMENTO_TURNOS).ravel()).astype(np.int32)
+    return pd.DataFrame({
+        "data": np.repeat(datas.strftime("%Y-%m-%d"), len(TURNOS)),
+        "turno": np.tile(TURNOS, n_dias),
+        "quantidade_pessoas": quantidades,
+    })
+
+
+def gerar_rede(n_lojas, n_dias, diretorio, semente=0):
+    """
+    Gera as partições de dados sintéticos de uma rede de lojas, cada uma com
+    seu próprio porte.
+
+    Args:
+        n_lojas (int): Quantidade de lojas.
+        n_dias (int): Quantidade de dias do histórico de cada loja.
+        diretorio (str): Diretório das partições (uma subpasta por loja).
+        semente (int): Semente do gerador de números aleatórios.
+
+    Returns:
+        list: Gerenciadores das lojas criadas.
+    """
+    portes = np.random.default_rng(semente).lognormal(0, 0.35, n_lojas)
+    gerenciadores = []
+    for i, porte in enumerate(portes):
+        gerenciador = GerenciadorDados.para_loja(f"loja_{i:03d}", diretorio)
+        registros, _ = gerenciador.validar_lote(gerar_movimento(n_dias, semente=semente + i, escala=porte))
+        gerenciador.salvar_lote(registros)
+        gerenciadores.append(gerenciador)
+    return gerenciadores
+
+
+def memoria_processo():
+    """
+    Obtém a memória residente (RSS) atual do processo em MB.
+
+    Returns:
+        float: Memória residente em MB.
+    """
+    try:
+        with open("/proc/self/statm") as arquivo:
+            paginas = int(arquivo.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        # Sem /proc nem psutil: usar o pico de memória, que também cresce com vazamentos
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+
+def benchmark_memoria(args):
+    """
+    Renderiza o gráfico milhares de vezes e verifica se a memória do processo
+    permanece estável.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        int: 0 se o crescimento ficou dentro da tolerância, 1 caso contrário.
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerenciador = gerar_rede(1, args.dias, diretorio)[0]
+        vazio = GerenciadorDados.para_loja("vazio", diretorio)
+        visualizacoes = [VisualizacaoDados(gerenciador), VisualizacaoDados(vazio)]
+        for visualizacao in visualizacoes:
+            visualizacao.grafico_file = os.path.join(diretorio, "grafico_turnos.png")
+
+        def renderizar(i):
+            # Alternar entre o gráfico com dados e o de "sem dados", sem usar o cache de imagens
+            fig = visualizacoes[i % 2].gerar_grafico()
+            fig.savefig(io.BytesIO(), format="png")
+
+        for i in range(args.aquecimento):
+            renderizar(i)
+        gc.collect()
+        inicial = memoria_processo()
+
+        inicio = time.perf_counter()
+        amostras = []
+        for i in range(args.renderizacoes):
+            renderizar(i)
+            if (i + 1) % max(args.renderizacoes // 10, 1) == 0:
+                gc.collect()
+                amostras.append(memoria_processo())
+                print(f"{i + 1:>6} renderizações: {amostras[-1]:.1f} MB")
+        duracao = time.perf_counter() - inicio
+
+    crescimento = max(amostras, default=inicial) - inicial
+    print(f"Memória inicial: {inicial:.1f} MB")
+    print(f"Crescimento: {crescimento:.1f} MB (tolerância: {args.tolerancia_mb:.1f} MB)")
+    print(f"Tempo médio por renderização: {duracao / max(args.renderizacoes, 1) * 1000:.1f} ms")
+    if crescimento > args.tolerancia_mb:
+        print("FALHA: a memória cresceu além da tolerância.", file=sys.stderr)
+        return 1
+    print("OK: memória estável.")
+    return 0
+
+
+def medir_em_processo(codigo, diretorio, *argumentos):
+    """
+    Executa um trecho de código em um processo Python novo e lê o tempo
+    que ele imprime na última linha.
+
+    Args:
+        codigo (str): Código a executar.
+        diretorio (str): Diretório de trabalho do processo.
+        *argumentos (str): Argumentos repassados em sys.argv.
+
+    Returns:
+        float: Tempo medido em segundos.
+    """
+    ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [DIRETORIO_APP, os.environ.get("PYTHONPATH")])))
+    resultado = subprocess.run([sys.executable, "-c", codigo, *argumentos], cwd=diretorio,
+                               env=ambiente, capture_output=True, text=True, check=True)
+    return float(resultado.stdout.strip().splitlines()[-1])
+
+
+def benchmark_inicializacao(args):
+    """
+    Mede a importação do módulo e a primeira renderização da página, cada
+    repetição em um processo novo.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        int: 0 após imprimir os tempos.
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivos = ["movimento_loja.csv", "escala_funcionarios.csv", "relatorio_semanal.csv", "cubo_movimento.npz"]
+        gerenciador = GerenciadorDados(*[os.path.join(diretorio, arquivo) for arquivo in arquivos])
+        registros, _ = gerenciador.validar_lote(gerar_movimento(args.dias))
+        gerenciador.salvar_lote(registros)
+        logo = os.path.join(DIRETORIO_APP, LOGO_PATH)
+        if os.path.exists(logo):
+            shutil.copytree(os.path.dirname(logo), os.path.join(diretorio, os.path.dirname(LOGO_PATH)))
+
+        importacao = [medir_em_processo(CODIGO_IMPORTACAO, diretorio) for _ in range(args.repeticoes)]
+        renderizacao = [medir_em_processo(CODIGO_RENDERIZACAO, diretorio, SCRIPT_APP) for _ in range(args.repeticoes)]
+
+    for nome, tempos in (("Importação do módulo", importacao), ("Primeira renderização", renderizacao)):
+        print(f"{nome}: mediana {statistics.median(tempos) * 1000:.0f} ms "
+              f"(mín. {min(tempos) * 1000:.0f} ms, máx. {max(tempos) * 1000:.0f} ms)")
+    return 0
+
+
+def _registrar_concorrente(caminho, processo, registros, disputados, fim):
+    """
+    Registra movimentos um a um, como um caixa, a partir de um processo do
+    teste de concorrência.
+
+    Cada processo registra chaves (data, turno) exclusivas e tenta registrar
+    também as mesmas chaves disputadas pelos demais processos.
+
+    Args:
+        caminho (str): Arquivo de movimento compartilhado.
+        processo (int): Número do processo.
+        registros (int): Quantidade de chaves exclusivas do processo.
+        disputados (int): Quantidade de chaves disputadas por todos os processos.
+        fim (datetime.date): Data mais recente usada.
+
+    Returns:
+        int: Quantidade de registros gravados pelo processo.
+    """
+    gerenciador = GerenciadorDados(caminho, *[f"{caminho}.{processo}.{nome}" for nome in ("escala.csv", "relatorio.csv")],
+                                   cubo_file=os.path.splitext(caminho)[0] + ".npz")
+    # Chaves 0..disputados-1 são disputadas; as seguintes, exclusivas do processo
+    exclusivas = np.arange(registros) + disputados + processo * registros
+    chaves = np.random.default_rng(processo).permutation(np.concatenate([np.arange(disputados), exclusivas]))
+
+    gravados = 0
+    for chave in chaves:
+        data = fim - timedelta(days=int(chave) // len(TURNOS))
+        _, sucesso, _ = gerenciador.salvar_dados(data.strftime("%Y-%m-%d"), TURNOS[chave % len(TURNOS)], processo)
+        gravados += sucesso
+    return gravados
+
+
+def benchmark_concorrencia(args):
+    """
+    Teste de estresse com vários processos registrando ao mesmo tempo no
+    mesmo arquivo de movimento; verifica que nenhum registro foi perdido ou
+    duplicado.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        int: 0 se todos os registros foram preservados, 1 caso contrário.
+    """
+    fim = date.today() - timedelta(days=1)
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "movimento_loja.csv")
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processos) as executor:
+            tarefas = [executor.submit(_registrar_concorrente, caminho, i, args.registros, args.disputados, fim)
+                       for i in range(args.processos)]
+            gravados = sum(tarefa.result() for tarefa in tarefas)
+        duracao = time.perf_counter() - inicio
+        df = pd.read_csv(caminho)
+
+    esperados = args.processos * args.registros + args.disputados
+    repetidos = int(df.duplicated(subset=["data", "turno"]).sum())
+    tentativas = args.processos * (args.registros + args.disputados)
+    print(f"Processos: {args.processos}")
+    print(f"Tentativas: {tentativas} ({args.disputados} chaves disputadas por todos)")
+    print(f"Registros esperados: {esperados}")
+    print(f"Registros gravados: {gravados} (no arquivo: {len(df)}, repetidos: {repetidos})")
+    print(f"Vazão: {tentativas / duracao:.0f} tentativas/s ({duracao:.2f} s)")
+    if len(df) != esperados or gravados != esperados or repetidos:
+        print("FALHA: registros perdidos ou duplicados.", file=sys.stderr)
+        return 1
+    print("OK: nenhum registro perdido ou duplicado.")
+    return 0
+
+
+def medir(operacao, repeticoes, preparar=None):
+    """
+    Mede a latência e o pico de memória de uma operação.
+
+    Os tempos são medidos sem rastreamento de memória; o pico de memória é
+    obtido em uma execução adicional com tracemalloc.
+
+    Args:
+        operacao (callable): Função sem argumentos medida.
+        repeticoes (int): Quantidade de execuções cronometradas.
+        preparar (callable, optional): Função executada antes de cada execução,
+                                       fora da medição.
+
+    Returns:
+        dict: Latências em ms (mediana, p95, mínima), vazão em operações por
+              segundo e pico de memória em MB.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        operacao()
+        tempos.append(time.perf_counter() - inicio)
+
+    if preparar is not None:
+        preparar()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        operacao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tempos = np.array(tempos)
+    return {
+        "repeticoes": repeticoes,
+        "latencia_ms": {
+            "mediana": round(float(np.median(tempos)) * 1000, 3),
+            "p95": round(float(np.percentile(tempos, 95)) * 1000, 3),
+            "minima": round(float(tempos.min()) * 1000, 3),
+        },
+        "vazao_ops_s": round(repeticoes / float(tempos.sum()), 2) if tempos.sum() > 0 else None,
+        "memoria_pico_mb": round(pico / 2**20, 3),
+    }
+
+
+def medir_loja(n_dias, repeticoes, diretorio):
+    """
+    Mede as operações de dados e análises de uma loja com n_dias de histórico.
+
+    Args:
+        n_dias (int): Dias de histórico sintético.
+        repeticoes (int): Execuções cronometradas por operação.
+        diretorio (str): Diretório temporário dos dados.
+
+    Returns:
+        dict: Medições por nome de operação.
+    """
+    gerenciador = gerar_rede(1, n_dias, diretorio)[0]
+    analise = AnaliseDados(gerenciador)
+    visualizacao = VisualizacaoDados(gerenciador, os.path.join(diretorio, "grafico_turnos.png"))
+    cache = obter_cache_carregamento()
+    fim = date.today() - timedelta(days=1)
+    novas = iter(range(n_dias, n_dias + 10 * repeticoes + 10))
+
+    def salvar():
+        # Cada execução registra uma data ainda não usada, antes do início do histórico
+        gerenciador.salvar_dados((fim - timedelta(days=next(novas))).strftime("%Y-%m-%d"), TURNOS[0], 10)
+
+    def descartar_snapshot():
+        # Forçar a leitura e interpretação completas do arquivo de dados
+        cache.invalidar(gerenciador.data_file)
+        if os.path.exists(gerenciador.snapshot_file):
+            os.remove(gerenciador.snapshot_file)
+
+    def recriar_cubo():
+        # Descartar o cubo em memória e no disco, forçando a reconstrução
+        gerenciador._cubo = None
+        if os.path.exists(gerenciador.cubo_file):
+            os.remove(gerenciador.cubo_file)
+
+    operacoes = {
+        "carregar_dados_frio_sem_snapshot": (gerenciador.carregar_dados, descartar_snapshot),
+        "carregar_dados_frio": (gerenciador.carregar_dados, lambda: cache.invalidar(gerenciador.data_file)),
+        "carregar_dados": (gerenciador.carregar_dados, None),
+        "salvar_dados": (salvar, None),
+        "verificar_duplicidade": (lambda: gerenciador.verificar_duplicidade(fim.strftime("%Y-%m-%d"), TURNOS[1]), None),
+        "consultar_ultima_semana": (lambda: gerenciador.consultar(fim - timedelta(days=6), fim), None),
+        "gerar_escala_funcionarios": (analise.gerar_escala_funcionarios, None),
+        "gerar_escala_funcionarios_reconstruindo_cubo": (analise.gerar_escala_funcionarios, recriar_cubo),
+        "gerar_relatorio_semanal": (analise.gerar_relatorio_semanal, None),
+        "gerar_relatorio_movel_4_semanas": (lambda: analise.gerar_relatorio_movel(4), None),
+        "gerar_grafico": (visualizacao.gerar_grafico, None),
+    }
+    return {nome: medir(operacao, repeticoes, preparar) for nome, (operacao, preparar) in operacoes.items()}
+
+
+def benchmark_operacoes(args):
+    """
+    Mede as operações de dados e análises para cada tamanho de histórico e
+    de rede pedido, gravando os resultados em JSON.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        int: 0 após gravar os resultados.
+    """
+    for valor, minimo, maximo, nome in [(d, 1, 10_000, "--dias") for d in args.dias] + \
+                                       [(n, 1, 500, "--lojas") for n in args.lojas]:
+        if not minimo <= valor <= maximo:
+            print(f"{nome} deve estar entre {minimo} e {maximo}.", file=sys.stderr)
+            return 2
+
+    resultados = []
+    for n_dias in args.dias:
+        for n_lojas in args.lojas:
+            with tempfile.TemporaryDirectory() as diretorio:
+                if n_lojas == 1:
+                    medicoes = medir_loja(n_dias, args.repeticoes, diretorio)
+                else:
+                    gerar_rede(n_lojas, n_dias, diretorio)
+                    rede = AnaliseRede(diretorio=diretorio, max_processos=args.processos)
+                    medicoes = {"gerar_analises_rede": medir(rede.gerar_analises, max(args.repeticoes // 10, 1))}
+            for operacao, medicao in medicoes.items():
+                resultados.append({"operacao": operacao, "dias": n_dias, "lojas": n_lojas, **medicao})
+                print(f"{operacao:<45} dias={n_dias:<6} lojas={n_lojas:<4} "
+                      f"mediana={medicao['latencia_ms']['mediana']:>10.3f} ms  "
+                      f"pico={medicao['memoria_pico_mb']:>8.2f} MB")
+
+    try:
+        versao = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIRETORIO_APP,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        versao = None
+    relatorio = {
+        "versao": versao,
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "ambiente": {"python": platform.python_version(), "pandas": pd.__version__,
+                     "numpy": np.__version__, "plataforma": platform.platform()},
+        "resultados": resultados,
+    }
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {args.saida}")
+    return 0
+
+
+def benchmark_comparar(args):
+    """
+    Compara dois resultados do benchmark de operações e aponta as operações
+    cuja latência mediana piorou além da tolerância.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        int: 0 se não houve regressão, 1 caso contrário.
+    """
+    def carregar(caminho):
+        with open(caminho, encoding="utf-8") as arquivo:
+            return {(r["operacao"], r["dias"], r["lojas"]): r for r in json.load(arquivo)["resultados"]}
+
+    base, atual = carregar(args.base), carregar(args.atual)
+    regressoes = 0
+    for chave in sorted(base.keys() & atual.keys()):
+        antes = base[chave]["latencia_ms"]["mediana"]
+        depois = atual[chave]["latencia_ms"]["mediana"]
+        variacao = (depois - antes) / antes * 100 if antes else 0.0
+        regressao = variacao > args.tolerancia
+        regressoes += regressao
+        print(f"{chave[0]:<45} dias={chave[1]:<6} lojas={chave[2]:<4} "
+              f"{antes:>10.3f} -> {depois:>10.3f} ms ({variacao:+.1f}%){'  REGRESSÃO' if regressao else ''}")
+    return 1 if regressoes else 0
+
+
+def main():
+    """Executa o benchmark escolhido na linha de comando."""
+    parser = argparse.ArgumentParser(description="Benchmarks do Otimizador de Turnos.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    memoria = subparsers.add_parser("memoria", help="Regressão de memória da renderização de gráficos.")
+    memoria.add_argument("--renderizacoes", type=int, default=2000,
+                         help="Quantidade de renderizações medidas (padrão: 2000).")
+    memoria.add_argument("--aquecimento", type=int, default=50,
+                         help="Renderizações antes da medição inicial (padrão: 50).")
+    memoria.add_argument("--dias", type=int, default=365,
+                         help="Dias de histórico sintético (padrão: 365).")
+    memoria.add_argument("--tolerancia-mb", type=float, default=20.0,
+                         help="Crescimento máximo aceito da memória em MB (padrão: 20).")
+    memoria.set_defaults(funcao=benchmark_memoria)
+
+    inicializacao = subparsers.add_parser("inicializacao", help="Tempo de importação e da primeira renderização.")
+    inicializacao.add_argument("--repeticoes", type=int, default=5,
+                               help="Quantidade de processos medidos (padrão: 5).")
+    inicializacao.add_argument("--dias", type=int, default=365,
+                               help="Dias de histórico sintético (padrão: 365).")
+    inicializacao.set_defaults(funcao=benchmark_inicializacao)
+
+    concorrencia = subparsers.add_parser("concorrencia", help="Estresse de gravações concorrentes entre processos.")
+    concorrencia.add_argument("--processos", type=int, default=8,
+                              help="Quantidade de processos gravando ao mesmo tempo (padrão: 8).")
+    concorrencia.add_argument("--registros", type=int, default=200,
+                              help="Registros exclusivos por processo (padrão: 200).")
+    concorrencia.add_argument("--disputados", type=int, default=30,
+                              help="Registros que todos os processos tentam gravar (padrão: 30).")
+    concorrencia.set_defaults(funcao=benchmark_concorrencia)
+
+    operacoes = subparsers.add_parser("operacoes", help="Latência, vazão e memória das operações de dados e análises.")
+    operacoes.add_argument("--dias", type=int, nargs="+", default=[30, 365, 3650],
+                           help="Tamanhos de histórico em dias, de 1 a 10000 (padrão: 30 365 3650).")
+    operacoes.add_argument("--lojas", type=int, nargs="+", default=[1],
+                           help="Quantidades de lojas, de 1 a 500 (padrão: 1).")
+    operacoes.add_argument("--repeticoes", type=int, default=20,
+                           help="Execuções cronometradas por operação (padrão: 20).")
+    operacoes.add_argument("--processos", type=int, default=None,
+                           help="Processos da análise da rede (padrão: um por CPU).")
+    operacoes.add_argument("--saida", default="benchmark_operacoes.json",
+                           help="Arquivo JSON de resultados (padrão: benchmark_operacoes.json).")
+    operacoes.set_defaults(funcao=benchmark_operacoes)
+
+    comparar = subparsers.add_parser("comparar", help="Compara dois resultados do benchmark de operações.")
+    comparar.add_argument("base", help="JSON de resultados de referência.")
+    comparar.add_argument("atual", help="JSON de resultados a comparar.")
+    comparar.add_argument("--tolerancia", type=float, default=20.0,
+                          help="Piora máxima aceita da latência mediana, em %% (padrão: 20).")
+    comparar.set_defaults(funcao=benchmark_comparar)
+
+    args = parser.parse_args()
+    return args.funcao(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
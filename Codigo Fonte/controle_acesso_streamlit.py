@@ -18,452 +18,4104 @@ Versão: 8.0
 # Importação das bibliotecas
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+import numpy as np
+from contextlib import closing, contextmanager
+from datetime import date, datetime, timedelta
+import functools
+import hashlib
+import importlib
+import io
+import json
 import os
+import sqlite3
+import sys
+import threading
+import time
 import traceback
-from PIL import Image
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# As visões dos dados em cache são compartilhadas entre as sessões sem cópia
+# (ver ConjuntoMovimento) e só são seguras com o Copy-on-Write, padrão a
+# partir do pandas 3
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.options.mode.copy_on_write = True
 
 # Constantes globais
 TURNOS = ["Manhã", "Tarde", "Noite"]
 DIAS_ORDENADOS = ["segunda-feira", "terça-feira", "quarta-feira", 
                  "quinta-feira", "sexta-feira", "sábado", "domingo"]
 LOGO_PATH = "img/acai_do_senna_img.png"
+GRAFICO_PATH = "grafico_turnos.png"
+MODOS_GRAFICO = ["Interativo", "Imagem"]
+REGRAS_PATH = "regras_funcionarios.csv"
+LOJAS_DIR = "lojas"
+TAMANHO_BLOCO = 100_000                      # Linhas por bloco na leitura em blocos
+LIMITE_LEITURA_COMPLETA = 256 * 1024 * 1024  # Acima deste tamanho (bytes), ler em blocos
+COLUNAS = ["data", "dia_da_semana", "turno", "quantidade_pessoas"]
+PERCENTIS_RELATORIO = (50, 90)               # Percentis dos relatórios por período
+EXTENSOES_SQLITE = (".db", ".sqlite", ".sqlite3")  # Arquivos de dados em banco SQLite
+SUFIXO_LOG = ".log"                          # Log de escrita ao lado do arquivo de dados
+LIMITE_LOG = 256 * 1024                      # Acima deste tamanho (bytes), compactar o log
+SUFIXO_SNAPSHOT = ".snapshot.json"           # Indicação do snapshot binário em vigor ao lado do arquivo de dados
+TEMPOS_PATH = "tempos_execucao.jsonl"        # Registro dos tempos de cada execução da interface
 
 
-class GerenciadorDados:
+class Instrumentacao:
     """
-    Classe responsável pelo gerenciamento de dados e operações com arquivos CSV.
+    Coletor dos tempos e contadores das operações da aplicação, para
+    identificar onde o tempo de cada execução é gasto (leitura e
+    interpretação dos arquivos, agregações, renderização dos gráficos e
+    gravações em disco).
+    
+    Os trechos medidos dentro de uma execução da interface (entre
+    iniciar_execucao e finalizar_execucao, na mesma thread) são agrupados
+    nela; os medidos fora dela, como no processamento em segundo plano,
+    entram apenas nos totais acumulados.
     
     Attributes:
-        data_file (str): Caminho para o arquivo de dados de movimento.
-        escala_file (str): Caminho para o arquivo de escala de funcionários.
-        relatorio_file (str): Caminho para o arquivo de relatório semanal.
+        log_file (str): Arquivo JSON Lines onde cada execução finalizada é
+                        registrada, ou None para não registrar.
+        historico (collections.deque): Últimas execuções finalizadas.
+        _totais (dict): Mapeia trecho -> [chamadas, tempo total, tempo máximo].
+        _contadores (dict): Mapeia contador -> valor acumulado.
+        _local (threading.local): Execução em andamento e nível de aninhamento
+                                  dos trechos de cada thread.
+        _trava (threading.Lock): Trava para acesso concorrente entre sessões.
     """
     
-    def __init__(self, data_file="movimento_loja.csv", 
-                 escala_file="escala_funcionarios.csv", 
-                 relatorio_file="relatorio_semanal.csv"):
+    def __init__(self, log_file=None, capacidade=50):
         """
-        Inicializa o gerenciador de dados com os caminhos dos arquivos.
+        Inicializa o coletor vazio.
         
         Args:
-            data_file (str): Caminho para o arquivo de dados de movimento.
-            escala_file (str): Caminho para o arquivo de escala de funcionários.
-            relatorio_file (str): Caminho para o arquivo de relatório semanal.
+            log_file (str, optional): Arquivo de registro das execuções.
+            capacidade (int): Quantidade de execuções mantidas no histórico.
         """
-        self.data_file = data_file
-        self.escala_file = escala_file
-        self.relatorio_file = relatorio_file
+        self.log_file = log_file
+        self.historico = deque(maxlen=capacidade)
+        self._totais = {}
+        self._contadores = {}
+        self._local = threading.local()
+        self._trava = threading.Lock()
     
-    def carregar_dados(self):
+    @contextmanager
+    def medir(self, trecho):
         """
-        Carrega os dados do arquivo CSV de movimento.
+        Mede o tempo de um trecho de código.
         
-        Returns:
-            pandas.DataFrame: DataFrame com os dados carregados ou um DataFrame vazio
-                             se o arquivo não existir.
+        Args:
+            trecho (str): Nome do trecho.
         """
+        local = self._local
+        nivel = getattr(local, "nivel", 0)
+        local.nivel = nivel + 1
+        inicio = time.perf_counter()
         try:
-            if os.path.exists(self.data_file):
-                # Usar parse_dates e format='mixed' para lidar com diferentes formatos de data
-                df = pd.read_csv(self.data_file)
-                
-                # Garantir que a coluna de data seja do tipo datetime
-                if 'data' in df.columns:
-                    # Usar format='mixed' para permitir inferência de diferentes formatos
-                    df['data'] = pd.to_datetime(df['data'], errors='coerce')
-                    
-                    # Verificar se há datas inválidas (NaT)
-                    if df['data'].isna().any():
-                        st.warning("Algumas datas no arquivo não puderam ser interpretadas corretamente.")
-                        # Remover linhas com datas inválidas
-                        df = df.dropna(subset=['data'])
-                
-                return df
-            else:
-                return pd.DataFrame(columns=["data", "dia_da_semana", "turno", "quantidade_pessoas"])
-        except Exception as e:
-            st.error(f"Erro ao carregar dados: {str(e)}")
-            traceback.print_exc()
-            return pd.DataFrame(columns=["data", "dia_da_semana", "turno", "quantidade_pessoas"])
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            local.nivel = nivel
+            with self._trava:
+                total = self._totais.setdefault(trecho, [0, 0.0, 0.0])
+                total[0] += 1
+                total[1] += duracao
+                total[2] = max(total[2], duracao)
+            execucao = getattr(local, "execucao", None)
+            if execucao is not None:
+                execucao["trechos"].append({
+                    "trecho": trecho,
+                    "nivel": nivel,
+                    "inicio_ms": round((inicio - execucao["_inicio"]) * 1000, 3),
+                    "duracao_ms": round(duracao * 1000, 3)
+                })
     
-    def verificar_duplicidade(self, data, turno):
+    def contar(self, contador, quantidade=1):
         """
-        Verifica se já existe um registro para a data e turno especificados.
+        Incrementa um contador.
         
         Args:
-            data (str): Data no formato YYYY-MM-DD.
-            turno (str): Turno do dia (Manhã, Tarde, Noite).
+            contador (str): Nome do contador.
+            quantidade (int): Valor a somar.
+        """
+        with self._trava:
+            self._contadores[contador] = self._contadores.get(contador, 0) + quantidade
+        execucao = getattr(self._local, "execucao", None)
+        if execucao is not None:
+            execucao["contadores"][contador] = execucao["contadores"].get(contador, 0) + quantidade
+    
+    def leitura(self, caminho):
+        """
+        Mede a leitura de um arquivo e a conta em 'arquivos_lidos'.
+        
+        Args:
+            caminho (str): Caminho do arquivo lido.
             
         Returns:
-            bool: True se já existe um registro, False caso contrário.
+            Gerenciador de contexto que mede o trecho 'ler <arquivo>'.
         """
-        df = self.carregar_dados()
-        if df.empty:
-            return False
+        self.contar("arquivos_lidos")
+        return self.medir(f"ler {os.path.basename(caminho)}")
+    
+    def gravacao(self, caminho):
+        """
+        Mede a gravação de um arquivo e a conta em 'arquivos_gravados'.
         
-        try:
-            # Converter a data de entrada para o mesmo formato do DataFrame
-            data_dt = pd.to_datetime(data, errors='coerce')
-            if pd.isna(data_dt):
-                return False
+        Args:
+            caminho (str): Caminho do arquivo gravado.
             
-            # Verificar se já existe um registro para esta data e turno
-            # Comparar apenas as datas (sem horas/minutos/segundos)
-            return ((df['data'].dt.date == data_dt.date()) & (df['turno'] == turno)).any()
-        except Exception as e:
-            st.error(f"Erro ao verificar duplicidade: {str(e)}")
-            traceback.print_exc()
-            return False
+        Returns:
+            Gerenciador de contexto que mede o trecho 'gravar <arquivo>'.
+        """
+        self.contar("arquivos_gravados")
+        return self.medir(f"gravar {os.path.basename(caminho)}")
     
-    def salvar_dados(self, data, turno, quantidade):
+    def iniciar_execucao(self):
+        """Inicia o agrupamento das medições da thread atual em uma execução."""
+        self._local.nivel = 0
+        self._local.execucao = {
+            "data": datetime.now().isoformat(timespec="milliseconds"),
+            "_inicio": time.perf_counter(),
+            "trechos": [],
+            "contadores": {}
+        }
+    
+    def finalizar_execucao(self, rotulo=None, log_file=None):
         """
-        Salva os dados de movimento no arquivo CSV.
+        Finaliza a execução da thread atual, guardando-a no histórico e
+        registrando-a no arquivo de log, se configurado.
         
         Args:
-            data (str): Data no formato YYYY-MM-DD.
-            turno (str): Turno do dia (Manhã, Tarde, Noite).
-            quantidade (int): Quantidade de pessoas.
+            rotulo (str, optional): Identificação da execução (ex.: a loja).
+            log_file (str, optional): Arquivo onde registrar apenas esta
+                                    execução, além do log_file do coletor
+                                    (ex.: escolhido pela sessão da interface).
+        
+        Returns:
+            dict: Execução com data, rótulo, duração total, trechos (em ordem
+                  de início) e contadores, ou None se não houver execução.
+        """
+        execucao = getattr(self._local, "execucao", None)
+        if execucao is None:
+            return None
+        self._local.execucao = None
+        execucao["rotulo"] = rotulo
+        execucao["duracao_ms"] = round((time.perf_counter() - execucao.pop("_inicio")) * 1000, 3)
+        execucao["trechos"].sort(key=lambda trecho: trecho["inicio_ms"])
+        
+        with self._trava:
+            self.historico.append(execucao)
+            arquivos = {self.log_file, log_file} - {None}
+        for arquivo_log in arquivos:
+            try:
+                with open(arquivo_log, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(execucao, ensure_ascii=False) + "\n")
+            except OSError:
+                traceback.print_exc()
+        return execucao
+    
+    def resumo(self):
+        """
+        Obtém os totais acumulados de cada trecho medido.
+        
+        Returns:
+            pandas.DataFrame: Trechos com chamadas e tempos total, médio e
+                              máximo (ms), do mais demorado ao mais rápido.
+        """
+        with self._trava:
+            totais = [(trecho, chamadas, total * 1000, total * 1000 / chamadas, maximo * 1000)
+                      for trecho, (chamadas, total, maximo) in self._totais.items()]
+        resumo = pd.DataFrame(totais, columns=["trecho", "chamadas", "total_ms", "media_ms", "maximo_ms"])
+        return resumo.sort_values("total_ms", ascending=False, ignore_index=True).round(3)
+    
+    def contadores(self):
+        """
+        Obtém os contadores acumulados.
+        
+        Returns:
+            dict: Cópia dos contadores.
+        """
+        with self._trava:
+            return dict(self._contadores)
+    
+    def limpar(self):
+        """Descarta os totais, contadores e o histórico de execuções."""
+        with self._trava:
+            self._totais.clear()
+            self._contadores.clear()
+            self.historico.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def obter_instrumentacao():
+    """
+    Obtém o coletor de instrumentação compartilhado pelo processo,
+    preservado entre as reexecuções do Streamlit. A variável de ambiente
+    ACAI_LOG_TEMPOS ativa o registro das execuções no arquivo indicado.
+    
+    Returns:
+        Instrumentacao: Instância única do coletor.
+    """
+    return Instrumentacao(os.environ.get("ACAI_LOG_TEMPOS"))
+
+
+INSTRUMENTACAO = obter_instrumentacao()
+
+
+def instrumentar(funcao):
+    """
+    Decorador que mede cada chamada de uma função ou método como um trecho
+    da instrumentação, identificado pelo nome qualificado (Classe.metodo).
+    
+    Args:
+        funcao (callable): Função a medir.
+        
+    Returns:
+        callable: Função que registra o tempo de cada chamada.
+    """
+    trecho = funcao.__qualname__
+    
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        with INSTRUMENTACAO.medir(trecho):
+            return funcao(*args, **kwargs)
+    return medida
+
+
+def aplicar_esquema(df):
+    """
+    Converte um DataFrame de movimento para o esquema tipado do sistema.
+    
+    A coluna 'data' passa a ser datetime64, 'dia_da_semana' e 'turno' passam
+    a ser categóricas (com as categorias na ordem de DIAS_ORDENADOS e TURNOS)
+    e 'quantidade_pessoas' passa a ser um inteiro compacto. Linhas com data,
+    turno ou quantidade inválidos (ausente ou negativa) são descartadas. O
+    dia da semana é sempre derivado da data, e não lido da coluna.
+    
+    DataFrames que já estão no esquema não são convertidos novamente: é
+    devolvida apenas uma visão deles, sem cópia dos dados.
+    
+    Args:
+        df (pandas.DataFrame): DataFrame com as colunas de movimento.
+        
+    Returns:
+        pandas.DataFrame: DataFrame no esquema tipado.
+    """
+    if tem_esquema(df):
+        return df.copy(deep=False)
+    
+    INSTRUMENTACAO.contar("conversoes_esquema")
+    df = df.reindex(columns=COLUNAS)
+    df['data'] = pd.to_datetime(df['data'], errors='coerce')
+    # Turnos fora de TURNOS passam a ser ausentes antes da conversão
+    df['turno'] = pd.Categorical(df['turno'].where(df['turno'].isin(TURNOS)), categories=TURNOS)
+    df['quantidade_pessoas'] = pd.to_numeric(df['quantidade_pessoas'], errors='coerce')
+    
+    df = df.dropna(subset=['data', 'turno', 'quantidade_pessoas'])
+    df = df[df['quantidade_pessoas'] >= 0]
+    df['dia_da_semana'] = pd.Categorical.from_codes(df['data'].dt.dayofweek.to_numpy(), categories=DIAS_ORDENADOS)
+    df['quantidade_pessoas'] = df['quantidade_pessoas'].astype("int32")
+    return df.reset_index(drop=True)
+
+
+def tem_esquema(df):
+    """
+    Verifica se um DataFrame já está no esquema tipado de aplicar_esquema,
+    sem valores inválidos.
+    
+    Args:
+        df (pandas.DataFrame): DataFrame a verificar.
+        
+    Returns:
+        bool: True se o DataFrame já está no esquema tipado.
+    """
+    if list(df.columns) != COLUNAS:
+        return False
+    dia, turno = df['dia_da_semana'].dtype, df['turno'].dtype
+    return (pd.api.types.is_datetime64_dtype(df['data']) and df['quantidade_pessoas'].dtype == np.int32
+            and isinstance(dia, pd.CategoricalDtype) and list(dia.categories) == DIAS_ORDENADOS
+            and isinstance(turno, pd.CategoricalDtype) and list(turno.categories) == TURNOS
+            and not df['data'].hasnans and not (df['turno'].cat.codes < 0).any()
+            and not (df['quantidade_pessoas'] < 0).any()
+            and (df['dia_da_semana'].cat.codes == df['data'].dt.dayofweek).all())
+
+
+class ConjuntoMovimento:
+    """
+    Conjunto imutável dos registros de movimento, validado uma única vez no
+    esquema tipado (ver aplicar_esquema).
+    
+    Os consumidores recebem visões dos registros, que com o Copy-on-Write do
+    pandas não duplicam a memória: as datas não são convertidas novamente e
+    não são necessárias cópias defensivas, pois alterações em uma visão não
+    afetam o conjunto.
+    
+    Um conjunto criado a partir de registros compactos (ver de_registros)
+    só monta o DataFrame quando os dados são pedidos.
+    
+    Attributes:
+        _df (pandas.DataFrame): Registros no esquema tipado, ou None se
+                                ainda não foram decodificados.
+        _registros (RegistrosCompactos): Vetores compactos dos registros,
+                                         criados no primeiro uso.
+    """
+    
+    def __init__(self, df=None):
+        """
+        Valida os registros no esquema tipado.
+        
+        Args:
+            df (pandas.DataFrame, optional): Registros de movimento. Se None,
+                                           cria um conjunto vazio.
+        """
+        self._df = aplicar_esquema(pd.DataFrame(columns=COLUNAS) if df is None else df)
+        self._registros = None
+    
+    @classmethod
+    def de_registros(cls, registros):
+        """
+        Cria o conjunto a partir de registros compactos, sem decodificá-los.
+        
+        Args:
+            registros (RegistrosCompactos): Registros de movimento.
             
         Returns:
-            tuple: (DataFrame atualizado, bool indicando sucesso, mensagem)
+            ConjuntoMovimento: Conjunto com os registros.
         """
-        try:
-            # Verificar se a data é futura
-            data_dt = pd.to_datetime(data, errors='coerce')
-            if pd.isna(data_dt):
-                return None, False, "Formato de data inválido."
-                
-            if data_dt.date() > datetime.today().date():
-                return None, False, "Não é possível registrar datas futuras."
+        conjunto = cls.__new__(cls)
+        conjunto._df = None
+        conjunto._registros = registros
+        return conjunto
+    
+    @property
+    def dados(self):
+        """pandas.DataFrame: Visão dos registros, sem cópia."""
+        if self._df is None:
+            self._df = self._registros.para_dataframe()
+        return self._df.copy(deep=False)
+    
+    @property
+    def registros(self):
+        """RegistrosCompactos: Registros em vetores compactos, para agregações em NumPy."""
+        if self._registros is None:
+            self._registros = RegistrosCompactos.de_dataframe(self._df)
+        return self._registros
+    
+    @property
+    def vazio(self):
+        """bool: True se o conjunto não tem registros."""
+        return len(self) == 0
+    
+    def __len__(self):
+        """Quantidade de registros."""
+        return len(self._df) if self._df is not None else len(self._registros)
+
+
+class RegistrosCompactos:
+    """
+    Registros de movimento em vetores NumPy compactos: o dia como int32
+    (dias desde 1970-01-01), o turno como uint8 (posição em TURNOS) e a
+    quantidade de pessoas como uint16 (uint32 se alguma passar de 65535).
+    O dia da semana não é guardado, pois é derivado do dia quando necessário.
+    
+    Com 7 bytes por registro, dez anos de uma loja ocupam cerca de 77 KB. Os
+    vetores podem ser mapeados diretamente de um arquivo (ver carregar), de
+    modo que apenas as partes acessadas são lidas do disco.
+    
+    Attributes:
+        dias (numpy.ndarray): Dias desde 1970-01-01 (int32).
+        turnos (numpy.ndarray): Posição do turno em TURNOS (uint8).
+        quantidades (numpy.ndarray): Quantidade de pessoas (uint16 ou uint32).
+    """
+    
+    def __init__(self, dias=None, turnos=None, quantidades=None):
+        """
+        Inicializa os registros a partir dos vetores já codificados.
+        
+        Args:
+            dias (numpy.ndarray, optional): Dias desde 1970-01-01.
+            turnos (numpy.ndarray, optional): Posições dos turnos em TURNOS.
+            quantidades (numpy.ndarray, optional): Quantidades de pessoas.
+        """
+        self.dias = np.empty(0, dtype=np.int32) if dias is None else dias
+        self.turnos = np.empty(0, dtype=np.uint8) if turnos is None else turnos
+        self.quantidades = np.empty(0, dtype=np.uint16) if quantidades is None else quantidades
+    
+    @staticmethod
+    def tipo_quantidade(maximo):
+        """
+        Escolhe o menor tipo inteiro sem sinal para as quantidades de pessoas.
+        
+        Args:
+            maximo (int): Maior quantidade a representar.
             
-            # Verificar duplicidade
-            if self.verificar_duplicidade(data, turno):
-                return None, False, "Já existe um registro para esta data e turno."
+        Returns:
+            type: numpy.uint16 ou numpy.uint32.
+        """
+        return np.uint16 if maximo <= np.iinfo(np.uint16).max else np.uint32
+    
+    @classmethod
+    def de_dataframe(cls, df):
+        """
+        Codifica um DataFrame de movimento nos vetores compactos.
+        
+        Args:
+            df (pandas.DataFrame): Registros de movimento.
             
-            # Carregar dados existentes ou criar novo DataFrame
-            df = self.carregar_dados()
+        Returns:
+            RegistrosCompactos: Registros codificados.
+        """
+        # O esquema tipado garante quantidades não negativas
+        df = aplicar_esquema(df)
+        quantidades = df['quantidade_pessoas'].to_numpy()
+        return cls(df['data'].to_numpy().astype('datetime64[D]').astype(np.int32),
+                   df['turno'].cat.codes.to_numpy().astype(np.uint8),
+                   quantidades.astype(cls.tipo_quantidade(quantidades.max() if len(quantidades) else 0)))
+    
+    @classmethod
+    def concatenar(cls, partes):
+        """
+        Junta registros compactos em um único conjunto de vetores.
+        
+        Args:
+            partes (iterable): Registros compactos (RegistrosCompactos).
             
-            # Traduzir o dia da semana
-            dia_en = data_dt.day_name()
-            dia_pt = self.traduzir_dia(dia_en)
+        Returns:
+            RegistrosCompactos: Registros de todas as partes, na ordem recebida.
+        """
+        partes = [parte for parte in partes if len(parte)]
+        if not partes:
+            return cls()
+        # uint16 com uint32 resulta em uint32
+        return cls(np.concatenate([parte.dias for parte in partes]),
+                   np.concatenate([parte.turnos for parte in partes]),
+                   np.concatenate([parte.quantidades for parte in partes]))
+    
+    def __len__(self):
+        """Quantidade de registros."""
+        return len(self.dias)
+    
+    @property
+    def nbytes(self):
+        """int: Memória ocupada pelos vetores, em bytes."""
+        return self.dias.nbytes + self.turnos.nbytes + self.quantidades.nbytes
+    
+    @property
+    def dias_semana(self):
+        """numpy.ndarray: Posição do dia da semana em DIAS_ORDENADOS (0 = segunda-feira)."""
+        # 1970-01-01 foi uma quinta-feira (posição 3)
+        return ((self.dias.astype(np.int64) + 3) % 7).astype(np.uint8)
+    
+    def para_dataframe(self):
+        """
+        Decodifica os registros em um DataFrame no esquema tipado.
+        
+        Returns:
+            pandas.DataFrame: Registros com as colunas de COLUNAS.
+        """
+        return pd.DataFrame({
+            "data": self.dias.astype('datetime64[D]').astype('datetime64[us]'),
+            "dia_da_semana": pd.Categorical.from_codes(self.dias_semana, categories=DIAS_ORDENADOS),
+            "turno": pd.Categorical.from_codes(self.turnos, categories=TURNOS),
+            "quantidade_pessoas": self.quantidades.astype(np.int32),
+        })
+    
+    def salvar(self, caminho):
+        """
+        Grava os registros em um arquivo .npy com um vetor estruturado de
+        largura fixa (dia, turno, quantidade), que pode ser mapeado na memória.
+        
+        Args:
+            caminho (str): Caminho do arquivo .npy.
+        """
+        tipo = np.dtype([("dia", "<i4"), ("turno", "u1"), ("quantidade", self.quantidades.dtype.newbyteorder("<"))])
+        vetor = np.empty(len(self), dtype=tipo)
+        vetor["dia"], vetor["turno"], vetor["quantidade"] = self.dias, self.turnos, self.quantidades
+        
+        def escrever(temporario):
+            with open(temporario, "wb") as arquivo:
+                np.save(arquivo, vetor)
+        
+        gravar_atomico(caminho, escrever)
+    
+    @classmethod
+    def carregar(cls, caminho, mapear=False):
+        """
+        Carrega os registros gravados por salvar.
+        
+        Args:
+            caminho (str): Caminho do arquivo .npy.
+            mapear (bool): Se True, mapeia o arquivo na memória (somente
+                          leitura) em vez de lê-lo: apenas as partes
+                          acessadas são lidas do disco.
             
-            # Criar nova linha - usar formato ISO para a data para evitar problemas
-            nova_linha = {
-                "data": data_dt.strftime("%Y-%m-%d"),  # Formato ISO para evitar problemas
-                "dia_da_semana": dia_pt,
-                "turno": turno,
-                "quantidade_pessoas": int(quantidade)
-            }
+        Returns:
+            RegistrosCompactos: Registros do arquivo.
+        """
+        with INSTRUMENTACAO.leitura(caminho):
+            vetor = np.load(caminho, mmap_mode="r" if mapear else None)
+        return cls(vetor["dia"], vetor["turno"], vetor["quantidade"])
+
+
+class IndiceChaves:
+    """
+    Índice em memória das chaves (data, turno) já registradas.
+    
+    Cada chave é codificada como um inteiro (dias desde 1970-01-01 vezes a
+    quantidade de turnos, mais a posição do turno em TURNOS), o que permite
+    consultas individuais em O(1) e verificações em lote vetorizadas.
+    
+    Attributes:
+        _codigos (set): Conjunto de chaves codificadas.
+        _vetor (numpy.ndarray): Cópia ordenada das chaves para consultas em lote.
+    """
+    
+    DIA_ZERO = date(1970, 1, 1).toordinal()
+    
+    def __init__(self):
+        """Inicializa um índice vazio."""
+        self._codigos = set()
+        self._vetor = None
+    
+    @classmethod
+    def de_dataframe(cls, df):
+        """
+        Constrói o índice a partir de um DataFrame de movimento.
+        
+        Args:
+            df (pandas.DataFrame): DataFrame com as colunas 'data' e 'turno'.
+            
+        Returns:
+            IndiceChaves: Índice com as chaves presentes no DataFrame.
+        """
+        indice = cls()
+        if not df.empty:
+            indice.adicionar_lote(df['data'], df['turno'])
+        return indice
+    
+    @classmethod
+    def de_registros(cls, registros):
+        """
+        Constrói o índice a partir dos registros compactos, sem decodificá-los.
+        
+        Args:
+            registros (RegistrosCompactos): Registros de movimento.
+            
+        Returns:
+            IndiceChaves: Índice com as chaves presentes nos registros.
+        """
+        indice = cls()
+        codigos = registros.dias.astype(np.int64) * len(TURNOS) + registros.turnos
+        indice._codigos.update(codigos.tolist())
+        return indice
+    
+    @classmethod
+    def codificar(cls, data, turno):
+        """
+        Codifica uma única chave (data, turno).
+        
+        Args:
+            data (datetime.date): Data do registro.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
+            
+        Returns:
+            int: Chave codificada ou -1 se o turno for inválido.
+        """
+        if turno not in TURNOS:
+            return -1
+        return (data.toordinal() - cls.DIA_ZERO) * len(TURNOS) + TURNOS.index(turno)
+    
+    @staticmethod
+    def codificar_lote(datas, turnos):
+        """
+        Codifica um lote de chaves (data, turno) de forma vetorizada.
+        
+        Args:
+            datas (array-like): Datas dos registros.
+            turnos (array-like): Turnos dos registros.
+            
+        Returns:
+            numpy.ndarray: Chaves codificadas (int64); -1 para datas ou turnos inválidos.
+        """
+        datas = pd.Series(datas)
+        if not pd.api.types.is_datetime64_dtype(datas):
+            datas = pd.to_datetime(datas, errors='coerce')
+        dias = datas.to_numpy().astype('datetime64[D]').astype(np.int64)
+        posicoes = pd.Index(TURNOS).get_indexer(np.asarray(turnos, dtype=object)).astype(np.int64)
+        codigos = dias * len(TURNOS) + posicoes
+        codigos[datas.isna().to_numpy() | (posicoes < 0)] = -1
+        return codigos
+    
+    def adicionar(self, data, turno):
+        """
+        Adiciona uma chave ao índice.
+        
+        Args:
+            data (datetime.date): Data do registro.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
+        """
+        self._codigos.add(self.codificar(data, turno))
+        self._vetor = None
+    
+    def adicionar_lote(self, datas, turnos):
+        """
+        Adiciona um lote de chaves ao índice.
+        
+        Args:
+            datas (array-like): Datas dos registros.
+            turnos (array-like): Turnos dos registros.
+        """
+        codigos = self.codificar_lote(datas, turnos)
+        self._codigos.update(codigos[codigos >= 0].tolist())
+        self._vetor = None
+    
+    def contem(self, data, turno):
+        """
+        Verifica se a chave (data, turno) já está no índice.
+        
+        Args:
+            data (datetime.date): Data do registro.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
             
-            # Adicionar ao DataFrame e salvar
-            df = pd.concat([df, pd.DataFrame([nova_linha])], ignore_index=True)
+        Returns:
+            bool: True se a chave já existe, False caso contrário.
+        """
+        return self.codificar(data, turno) in self._codigos
+    
+    def contem_lote(self, datas, turnos):
+        """
+        Verifica, em uma única operação vetorizada, quais chaves de um lote
+        já existem no índice ou se repetem dentro do próprio lote.
+        
+        Args:
+            datas (array-like): Datas dos registros candidatos.
+            turnos (array-like): Turnos dos registros candidatos.
             
-            # Garantir que a coluna de data seja do tipo datetime antes de salvar
-            if 'data' in df.columns:
-                df['data'] = pd.to_datetime(df['data'], errors='coerce')
-                # Remover linhas com datas inválidas
-                df = df.dropna(subset=['data'])
-                # Converter para string no formato ISO antes de salvar
-                df['data'] = df['data'].dt.strftime("%Y-%m-%d")
+        Returns:
+            numpy.ndarray: Vetor booleano, True para cada registro duplicado.
+        """
+        codigos = self.codificar_lote(datas, turnos)
+        if self._vetor is None:
+            self._vetor = np.fromiter(self._codigos, dtype=np.int64, count=len(self._codigos))
+            self._vetor.sort()
+        
+        # Duplicados em relação ao índice
+        posicoes = np.searchsorted(self._vetor, codigos)
+        posicoes[posicoes >= len(self._vetor)] = 0
+        existentes = (self._vetor[posicoes] == codigos) if len(self._vetor) else np.zeros(len(codigos), dtype=bool)
+        
+        # Duplicados dentro do próprio lote (a primeira ocorrência é mantida)
+        repetidos = pd.Series(codigos).duplicated().to_numpy()
+        
+        return (existentes | repetidos) & (codigos >= 0)
+    
+    def __len__(self):
+        """Retorna a quantidade de chaves no índice."""
+        return len(self._codigos)
+
+
+class TravaArquivo:
+    """
+    Trava de escrita de um arquivo de dados, compartilhada entre processos
+    (trava consultiva em um arquivo '.lock' ao lado do arquivo) e entre as
+    threads do mesmo processo. A mesma thread pode adquiri-la novamente.
+    
+    Attributes:
+        caminho (str): Caminho do arquivo de trava.
+    """
+    
+    # Estado por arquivo de trava, compartilhado por todas as instâncias do processo
+    _estados = {}
+    _trava_estados = threading.Lock()
+    
+    def __init__(self, caminho):
+        """
+        Inicializa a trava de um arquivo de dados.
+        
+        Args:
+            caminho (str): Caminho do arquivo de dados.
+        """
+        self.caminho = os.path.abspath(caminho) + ".lock"
+        with TravaArquivo._trava_estados:
+            self._estado = TravaArquivo._estados.setdefault(
+                self.caminho, {"trava": threading.RLock(), "profundidade": 0, "arquivo": None})
+    
+    def __enter__(self):
+        """Adquire a trava, aguardando outros processos e threads."""
+        estado = self._estado
+        estado["trava"].acquire()
+        if estado["profundidade"] == 0:
+            try:
+                arquivo = open(self.caminho, "a+b")
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+                    else:
+                        arquivo.seek(0)
+                        while True:
+                            try:
+                                msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+                                break
+                            except OSError:
+                                pass  # LK_LOCK desiste após 10 s; tentar de novo
+                except BaseException:
+                    arquivo.close()
+                    raise
+            except BaseException:
+                estado["trava"].release()
+                raise
+            estado["arquivo"] = arquivo
+        estado["profundidade"] += 1
+        return self
+    
+    def __exit__(self, tipo, valor, rastro):
+        """Libera a trava."""
+        estado = self._estado
+        estado["profundidade"] -= 1
+        if estado["profundidade"] == 0:
+            arquivo, estado["arquivo"] = estado["arquivo"], None
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+            arquivo.close()
+        estado["trava"].release()
+        return False
+
+
+def gravar_atomico(caminho, escrever):
+    """
+    Grava um arquivo de forma atômica: o conteúdo é escrito em um arquivo
+    temporário no mesmo diretório, que só substitui o original depois de
+    completo. Uma falha no meio da gravação preserva o arquivo anterior.
+    
+    Args:
+        caminho (str): Caminho do arquivo de destino.
+        escrever (callable): Função que recebe o caminho temporário e grava
+                             o conteúdo nele.
+    """
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with INSTRUMENTACAO.gravacao(caminho):
+            escrever(temporario)
+            with open(temporario, "rb+") as arquivo:
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def anexar_linhas_csv(caminho, df, cabecalho=True, sincronizar=False):
+    """
+    Anexa registros ao final de um arquivo CSV, sem reescrever o conteúdo existente.
+    
+    Args:
+        caminho (str): Caminho do arquivo CSV.
+        df (pandas.DataFrame): Registros a serem anexados.
+        cabecalho (bool): Se True, escreve o cabeçalho quando o arquivo é criado.
+        sincronizar (bool): Se True, força a gravação em disco (fsync) antes de retornar.
+    """
+    arquivo_existe = os.path.exists(caminho) and os.path.getsize(caminho) > 0
+    
+    with INSTRUMENTACAO.gravacao(caminho), open(caminho, "ab") as arquivo:
+        # Garantir que a última linha do arquivo termine com quebra de linha
+        if arquivo_existe:
+            with open(caminho, "rb") as leitura:
+                leitura.seek(-1, os.SEEK_END)
+                if leitura.read(1) not in (b"\n", b"\r"):
+                    arquivo.write(os.linesep.encode())
+        
+        arquivo.write(df.to_csv(header=cabecalho and not arquivo_existe, index=False,
+                                date_format="%Y-%m-%d", lineterminator=os.linesep).encode("utf-8"))
+        if sincronizar:
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+
+class ArmazenamentoCSV:
+    """
+    Armazenamento dos dados de movimento em arquivo CSV.
+    
+    Attributes:
+        caminho (str): Caminho do arquivo de dados.
+        anexa_no_fim (bool): Se as anexações apenas acrescentam bytes ao fim
+                             do arquivo (permitindo ler só os registros novos).
+    """
+    
+    anexa_no_fim = True
+    
+    def __init__(self, caminho):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            caminho (str): Caminho do arquivo de dados.
+        """
+        self.caminho = caminho
+    
+    def ler(self):
+        """
+        Lê o arquivo de dados.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com os dados do arquivo, sem conversão de tipos.
+        """
+        with INSTRUMENTACAO.leitura(self.caminho):
+            return pd.read_csv(self.caminho)
+    
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        """
+        Lê o arquivo de dados em blocos de tamanho limitado.
+        
+        Args:
+            tamanho_bloco (int): Quantidade de linhas por bloco.
+            
+        Yields:
+            pandas.DataFrame: Blocos de registros, sem conversão de tipos.
+        """
+        INSTRUMENTACAO.contar("arquivos_lidos")
+        with pd.read_csv(self.caminho, chunksize=tamanho_bloco) as leitor:
+            yield from leitor
+    
+    def ler_a_partir(self, posicao):
+        """
+        Lê apenas os registros anexados depois de uma posição do arquivo.
+        
+        Somente linhas completas são lidas: uma linha que outro processo
+        ainda está anexando fica para a próxima leitura.
+        
+        Args:
+            posicao (int): Posição em bytes do fim dos registros já lidos.
+            
+        Returns:
+            tuple: (DataFrame com os registros novos, sem conversão de tipos,
+                    posição em bytes do fim da última linha completa lida)
+        """
+        with INSTRUMENTACAO.leitura(self.caminho):
+            colunas = pd.read_csv(self.caminho, nrows=0).columns
+            with open(self.caminho, "rb") as arquivo:
+                arquivo.seek(posicao)
+                conteudo = arquivo.read()
+        completas = conteudo.rfind(b"\n") + 1
+        conteudo, posicao = conteudo[:completas], posicao + completas
+        if not conteudo.strip():
+            return pd.DataFrame(columns=colunas), posicao
+        return pd.read_csv(io.BytesIO(conteudo), header=None, names=colunas), posicao
+    
+    def fim_linhas_completas(self, limite):
+        """
+        Obtém a posição logo após a última quebra de linha antes de um limite,
+        descartando uma linha que ainda esteja sendo anexada.
+        
+        Args:
+            limite (int): Posição em bytes até onde procurar.
+            
+        Returns:
+            int: Posição do fim da última linha completa (0 se não houver).
+        """
+        with open(self.caminho, "rb") as arquivo:
+            fim = limite
+            while fim > 0:
+                inicio = max(fim - 4096, 0)
+                arquivo.seek(inicio)
+                quebra = arquivo.read(fim - inicio).rfind(b"\n")
+                if quebra >= 0:
+                    return inicio + quebra + 1
+                fim = inicio
+        return 0
+    
+    def anexar(self, df):
+        """
+        Anexa registros ao final do arquivo, sem reescrever o conteúdo existente.
+        
+        Args:
+            df (pandas.DataFrame): Registros a serem anexados.
+        """
+        # Um registro confirmado ao caixa precisa estar no disco, e não só no cache do sistema
+        anexar_linhas_csv(self.caminho, df, sincronizar=True)
+    
+    def gravar(self, df):
+        """
+        Grava todos os registros, substituindo o conteúdo do arquivo de forma atômica.
+        
+        Args:
+            df (pandas.DataFrame): Registros a serem gravados.
+        """
+        gravar_atomico(self.caminho, lambda temporario: df.to_csv(temporario, index=False, date_format="%Y-%m-%d"))
+    
+    def tamanho_log(self):
+        """
+        Obtém o tamanho do log de escrita pendente de compactação.
+        
+        O próprio CSV já recebe as anexações em sequência, então não há log
+        separado.
+        
+        Returns:
+            int: Sempre 0.
+        """
+        return 0
+    
+    def compactar(self):
+        """
+        Incorpora o log de escrita ao arquivo principal. Sem log separado, não
+        há o que compactar.
+        
+        Returns:
+            bool: Sempre False.
+        """
+        return False
+
+
+class ArmazenamentoColunar(ArmazenamentoCSV):
+    """
+    Armazenamento dos dados de movimento em formato colunar (Parquet ou
+    Feather), preservando os tipos do esquema (datas nativas, colunas
+    categóricas e inteiros compactos). Requer a biblioteca pyarrow.
+    
+    Como formatos colunares não permitem anexar linhas, as anexações são
+    gravadas em sequência em um log de escrita (CSV ao lado do arquivo),
+    incorporado periodicamente ao arquivo colunar por compactar. A leitura
+    combina o arquivo colunar com o log; após uma queda, os registros do log
+    são recuperados na próxima leitura.
+    
+    Attributes:
+        caminho (str): Caminho do arquivo de dados.
+        formato (str): 'parquet' ou 'feather'.
+        log (str): Caminho do log de escrita.
+        anexa_no_fim (bool): Sempre False (a compactação regrava o arquivo).
+    """
+    
+    anexa_no_fim = False
+    
+    def __init__(self, caminho):
+        """
+        Inicializa o armazenamento, definindo o formato pela extensão do arquivo.
+        
+        Args:
+            caminho (str): Caminho do arquivo de dados (.parquet ou .feather).
+        """
+        super().__init__(caminho)
+        self.formato = "feather" if caminho.lower().endswith(".feather") else "parquet"
+        self.log = caminho + SUFIXO_LOG
+    
+    def _ler_colunar(self):
+        """
+        Lê apenas o arquivo colunar, sem o log de escrita.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com os dados do arquivo colunar.
+        """
+        with INSTRUMENTACAO.leitura(self.caminho):
+            if self.formato == "feather":
+                return pd.read_feather(self.caminho)
+            return pd.read_parquet(self.caminho)
+    
+    def _ler_log(self, tamanho_bloco=None):
+        """
+        Lê os registros do log de escrita.
+        
+        Args:
+            tamanho_bloco (int, optional): Se informado, lê o log em blocos.
+            
+        Returns:
+            Registros do log sem conversão de tipos (DataFrame, ou iterador de
+            DataFrames se tamanho_bloco for informado), ou None se não houver log.
+        """
+        if self.tamanho_log() == 0:
+            return None
+        if tamanho_bloco is not None:
+            INSTRUMENTACAO.contar("arquivos_lidos")
+            return pd.read_csv(self.log, header=None, names=COLUNAS, chunksize=tamanho_bloco)
+        with INSTRUMENTACAO.leitura(self.log):
+            return pd.read_csv(self.log, header=None, names=COLUNAS)
+    
+    def ler(self):
+        """
+        Lê o arquivo de dados, incluindo os registros do log de escrita.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com os dados do arquivo.
+        """
+        df = self._ler_colunar()
+        log = self._ler_log()
+        if log is None:
+            return df
+        
+        # Registros do log já incorporados por uma compactação interrompida
+        # antes da remoção do log são descartados
+        df = pd.concat([aplicar_esquema(df), aplicar_esquema(log)], ignore_index=True)
+        return df.drop_duplicates(subset=["data", "turno"], ignore_index=True)
+    
+    def _ler_blocos_colunar(self, tamanho_bloco):
+        """
+        Lê apenas o arquivo colunar em blocos (grupos de linhas do Parquet ou
+        lotes do arquivo Feather), sem o log de escrita.
+        
+        Args:
+            tamanho_bloco (int): Quantidade máxima de linhas por bloco.
+            
+        Yields:
+            pandas.DataFrame: Blocos de registros.
+        """
+        if self.formato == "feather":
+            import pyarrow.ipc
+            
+            with pyarrow.ipc.open_file(self.caminho) as leitor:
+                for i in range(leitor.num_record_batches):
+                    yield leitor.get_batch(i).to_pandas()
+        else:
+            import pyarrow.parquet
+            
+            for lote in pyarrow.parquet.ParquetFile(self.caminho).iter_batches(batch_size=tamanho_bloco):
+                yield lote.to_pandas()
+    
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        """
+        Lê o arquivo de dados em blocos, sem carregar o arquivo inteiro na
+        memória.
+        
+        Como em ler, os registros do log cuja chave (data, turno) já está no
+        arquivo colunar ou em um bloco anterior do log são descartados.
+        
+        Args:
+            tamanho_bloco (int): Quantidade máxima de linhas por bloco.
+            
+        Yields:
+            pandas.DataFrame: Blocos de registros.
+        """
+        log = self._ler_log(tamanho_bloco)
+        if log is None:
+            yield from self._ler_blocos_colunar(tamanho_bloco)
+            return
+        
+        # Chaves já lidas, para descartar registros do log incorporados por
+        # uma compactação interrompida antes da remoção do log
+        chaves = IndiceChaves()
+        for bloco in self._ler_blocos_colunar(tamanho_bloco):
+            chaves.adicionar_lote(bloco['data'], bloco['turno'])
+            yield bloco
+        with log as leitor:
+            for bloco in leitor:
+                bloco = bloco[~chaves.contem_lote(bloco['data'], bloco['turno'])]
+                chaves.adicionar_lote(bloco['data'], bloco['turno'])
+                yield bloco
+    
+    def anexar(self, df):
+        """
+        Anexa registros ao log de escrita, sem regravar o arquivo colunar. O
+        primeiro lote cria o arquivo colunar diretamente.
+        
+        Args:
+            df (pandas.DataFrame): Registros a serem anexados.
+        """
+        if not os.path.exists(self.caminho):
+            self.gravar(df)
+            return
+        anexar_linhas_csv(self.log, df[COLUNAS], cabecalho=False, sincronizar=True)
+    
+    def tamanho_log(self):
+        """
+        Obtém o tamanho do log de escrita pendente de compactação.
+        
+        Returns:
+            int: Tamanho do log em bytes (0 se não houver log).
+        """
+        try:
+            return os.path.getsize(self.log)
+        except OSError:
+            return 0
+    
+    def compactar(self):
+        """
+        Incorpora o log de escrita ao arquivo colunar, regravando-o de forma
+        atômica, e remove o log.
+        
+        Returns:
+            bool: True se havia log a compactar.
+        """
+        if self.tamanho_log() == 0:
+            return False
+        df = aplicar_esquema(self.ler())
+        gravar_atomico(self.caminho, lambda temporario: self._gravar_colunar(df, temporario))
+        os.remove(self.log)
+        return True
+    
+    def gravar(self, df):
+        """
+        Grava todos os registros no esquema tipado, substituindo o conteúdo do
+        arquivo de forma atômica.
+        
+        Args:
+            df (pandas.DataFrame): Registros a serem gravados.
+        """
+        df = aplicar_esquema(df)
+        # O log deixa de valer antes de o arquivo ser substituído
+        if os.path.exists(self.log):
+            os.remove(self.log)
+        gravar_atomico(self.caminho, lambda temporario: self._gravar_colunar(df, temporario))
+    
+    def _gravar_colunar(self, df, caminho):
+        """
+        Grava um DataFrame no formato colunar do armazenamento.
+        
+        Args:
+            df (pandas.DataFrame): Registros no esquema tipado.
+            caminho (str): Caminho do arquivo de destino.
+        """
+        if self.formato == "feather":
+            df.to_feather(caminho)
+        else:
+            df.to_parquet(caminho, index=False)
+
+
+class ArmazenamentoSQLite:
+    """
+    Armazenamento dos dados de movimento em um banco SQLite local.
+    
+    A tabela possui restrição UNIQUE (data, turno) e índice sobre a data, de
+    modo que consultas por período são feitas por faixa no índice e as
+    gravações são transacionais.
+    
+    Attributes:
+        caminho (str): Caminho do arquivo do banco de dados.
+        anexa_no_fim (bool): Sempre False (páginas do banco são reescritas).
+    """
+    
+    anexa_no_fim = False
+    
+    def __init__(self, caminho):
+        """
+        Inicializa o armazenamento, criando a tabela e o índice se necessário.
+        
+        Args:
+            caminho (str): Caminho do arquivo do banco de dados.
+        """
+        self.caminho = caminho
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS movimento (
+                    data TEXT NOT NULL,
+                    dia_da_semana TEXT NOT NULL,
+                    turno TEXT NOT NULL,
+                    quantidade_pessoas INTEGER NOT NULL,
+                    UNIQUE (data, turno)
+                )
+            """)
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_movimento_data ON movimento (data)")
+    
+    def _conectar(self):
+        """
+        Abre uma conexão com o banco de dados.
+        
+        Returns:
+            sqlite3.Connection: Conexão aberta.
+        """
+        return sqlite3.connect(self.caminho, timeout=30)
+    
+    def ler(self):
+        """
+        Lê todos os registros do banco de dados.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com os registros, ordenados por data.
+        """
+        return self.ler_periodo(None, None)
+    
+    def ler_periodo(self, inicio, fim, turnos=None, dias=None):
+        """
+        Lê os registros de um período usando o índice sobre a data.
+        
+        Args:
+            inicio (datetime.date): Primeiro dia do período (None para sem limite).
+            fim (datetime.date): Último dia do período (None para sem limite).
+            turnos (list, optional): Turnos a incluir (None para todos).
+            dias (list, optional): Dias da semana a incluir (None para todos).
+            
+        Returns:
+            pandas.DataFrame: DataFrame com os registros do período, ordenados por data.
+        """
+        consulta = "SELECT data, dia_da_semana, turno, quantidade_pessoas FROM movimento"
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append("data >= ?")
+            parametros.append(inicio.strftime("%Y-%m-%d"))
+        if fim is not None:
+            condicoes.append("data <= ?")
+            parametros.append(fim.strftime("%Y-%m-%d"))
+        for coluna, valores in (("turno", turnos), ("dia_da_semana", dias)):
+            if valores is not None:
+                valores = list(valores)
+                condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})")
+                parametros.extend(valores)
+        if condicoes:
+            consulta += " WHERE " + " AND ".join(condicoes)
+        consulta += " ORDER BY data"
+        
+        with INSTRUMENTACAO.leitura(self.caminho), closing(self._conectar()) as conexao:
+            return pd.read_sql_query(consulta, conexao, params=parametros)
+    
+    def ler_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        """
+        Lê todos os registros do banco de dados em blocos.
+        
+        Args:
+            tamanho_bloco (int): Quantidade de linhas por bloco.
+            
+        Yields:
+            pandas.DataFrame: Blocos de registros.
+        """
+        INSTRUMENTACAO.contar("arquivos_lidos")
+        with closing(self._conectar()) as conexao:
+            yield from pd.read_sql_query("SELECT data, dia_da_semana, turno, quantidade_pessoas FROM movimento",
+                                         conexao, chunksize=tamanho_bloco)
+    
+    def contem(self, data, turno):
+        """
+        Verifica se já existe um registro para a data e turno, usando o
+        índice da restrição UNIQUE.
+        
+        Args:
+            data (datetime.date): Data do registro.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
+            
+        Returns:
+            bool: True se já existe um registro, False caso contrário.
+        """
+        with closing(self._conectar()) as conexao:
+            cursor = conexao.execute("SELECT 1 FROM movimento WHERE data = ? AND turno = ?",
+                                     (data.strftime("%Y-%m-%d"), turno))
+            return cursor.fetchone() is not None
+    
+    @staticmethod
+    def _linhas(df):
+        """
+        Converte um DataFrame de movimento em tuplas para inserção.
+        
+        Args:
+            df (pandas.DataFrame): Registros a converter.
+            
+        Returns:
+            list: Lista de tuplas (data, dia_da_semana, turno, quantidade_pessoas).
+        """
+        df = aplicar_esquema(df)
+        return list(zip(df['data'].dt.strftime("%Y-%m-%d"), df['dia_da_semana'].astype(str),
+                        df['turno'].astype(str), df['quantidade_pessoas'].astype(int).tolist()))
+    
+    def anexar(self, df):
+        """
+        Insere registros em uma única transação. Se algum registro violar a
+        restrição UNIQUE (data, turno), nenhum registro é inserido.
+        
+        Args:
+            df (pandas.DataFrame): Registros a serem inseridos.
+            
+        Raises:
+            sqlite3.IntegrityError: Se já existir registro para alguma (data, turno).
+        """
+        with INSTRUMENTACAO.gravacao(self.caminho), closing(self._conectar()) as conexao, conexao:
+            conexao.executemany("INSERT INTO movimento VALUES (?, ?, ?, ?)", self._linhas(df))
+    
+    def gravar(self, df):
+        """
+        Substitui todos os registros em uma única transação.
+        
+        Args:
+            df (pandas.DataFrame): Registros a serem gravados.
+        """
+        with INSTRUMENTACAO.gravacao(self.caminho), closing(self._conectar()) as conexao, conexao:
+            conexao.execute("DELETE FROM movimento")
+            conexao.executemany("INSERT INTO movimento VALUES (?, ?, ?, ?)", self._linhas(df))
+    
+    def tamanho_log(self):
+        """
+        Obtém o tamanho do log de escrita pendente de compactação. O SQLite
+        mantém seu próprio diário de transações.
+        
+        Returns:
+            int: Sempre 0.
+        """
+        return 0
+    
+    def compactar(self):
+        """
+        Incorpora o log de escrita ao banco. Sem log separado, não há o que compactar.
+        
+        Returns:
+            bool: Sempre False.
+        """
+        return False
+
+
+def criar_armazenamento(caminho):
+    """
+    Cria o armazenamento adequado à extensão do arquivo de dados.
+    
+    Args:
+        caminho (str): Caminho do arquivo de dados.
+        
+    Returns:
+        Armazenamento CSV, colunar (.parquet, .feather) ou SQLite (.db, .sqlite).
+    """
+    if caminho.lower().endswith(EXTENSOES_SQLITE):
+        return ArmazenamentoSQLite(caminho)
+    if caminho.lower().endswith((".parquet", ".feather")):
+        return ArmazenamentoColunar(caminho)
+    return ArmazenamentoCSV(caminho)
+
+
+class CuboAgregados:
+    """
+    Cubo de agregados pré-calculados do movimento, mantido a cada gravação.
+    
+    Guarda soma, contagem, mínimo e máximo de pessoas por (semana ISO, dia da
+    semana, turno); como cada semana e dia da semana correspondem a uma data,
+    esse nível também responde às consultas por (data, turno). Os totais por
+    (dia da semana, turno) de todo o histórico são obtidos somando as semanas.
+    Assim, o gráfico, a escala e o relatório semanal são respondidos pelo
+    cubo, sem percorrer os registros brutos, e cada novo registro atualiza o
+    cubo em O(1).
+    
+    O cubo é persistido junto com a assinatura do arquivo de dados a que
+    corresponde.
+    
+    Attributes:
+        semana_inicial (int): Número da primeira semana do cubo (semanas
+                              iniciadas na segunda-feira, contadas desde 1970).
+        soma (numpy.ndarray): Soma de pessoas por [semana, dia, turno].
+        contagem (numpy.ndarray): Quantidade de registros por [semana, dia, turno].
+        minimo (numpy.ndarray): Menor quantidade de pessoas por [semana, dia, turno].
+        maximo (numpy.ndarray): Maior quantidade de pessoas por [semana, dia, turno].
+        assinatura (tuple): Assinatura do arquivo de dados correspondente.
+        posicao (tuple): Inode e posição em bytes do arquivo de dados até onde
+                         o cubo está em dia (None se desconhecida), para
+                         incorporar apenas os registros anexados depois.
+        _parciais (dict): Agregados parciais já calculados (somas acumuladas
+                          por semana e janelas móveis), descartados quando o
+                          cubo muda. O cubo não tem trava própria: quem o
+                          compartilha entre threads calcula os parciais sob a
+                          mesma trava das gravações (GerenciadorDados.trava).
+    """
+    
+    def __init__(self, assinatura=None):
+        """
+        Inicializa um cubo vazio.
+        
+        Args:
+            assinatura (tuple, optional): Assinatura do arquivo de dados.
+        """
+        forma = (0, len(DIAS_ORDENADOS), len(TURNOS))
+        self.semana_inicial = 0
+        self.soma = np.zeros(forma, dtype=np.float64)
+        self.contagem = np.zeros(forma, dtype=np.int64)
+        self.minimo = np.full(forma, np.inf)
+        self.maximo = np.full(forma, -np.inf)
+        self.assinatura = tuple(assinatura) if assinatura is not None else None
+        self.posicao = None
+        self._parciais = {}
+    
+    @staticmethod
+    def numero_semana(dia):
+        """
+        Obtém o número da semana (iniciada na segunda-feira) de uma data.
+        
+        Args:
+            dia (datetime.date): Data.
+            
+        Returns:
+            int: Número da semana contado desde 1970.
+        """
+        # 1970-01-01 foi uma quinta-feira (dia 3 de uma semana iniciada na segunda)
+        return (dia.toordinal() - IndiceChaves.DIA_ZERO + 3) // 7
+    
+    @staticmethod
+    def inicio_semana(numero):
+        """
+        Obtém a segunda-feira de uma semana.
+        
+        Args:
+            numero (int): Número da semana contado desde 1970.
+            
+        Returns:
+            datetime.date: Segunda-feira da semana.
+        """
+        return date.fromordinal(int(numero) * 7 - 3 + IndiceChaves.DIA_ZERO)
+    
+    @classmethod
+    def de_dataframe(cls, df, assinatura=None):
+        """
+        Constrói o cubo a partir de um DataFrame de movimento.
+        
+        Args:
+            df (pandas.DataFrame): DataFrame de movimento.
+            assinatura (tuple, optional): Assinatura do arquivo de dados.
+            
+        Returns:
+            CuboAgregados: Cubo com os agregados do DataFrame.
+        """
+        cubo = cls(assinatura=assinatura)
+        if not df.empty:
+            cubo.adicionar_lote(df)
+        return cubo
+    
+    def _garantir_semanas(self, primeira, ultima):
+        """
+        Amplia os vetores do cubo para incluir o intervalo de semanas informado.
+        
+        Args:
+            primeira (int): Primeira semana necessária.
+            ultima (int): Última semana necessária.
+        """
+        if len(self.soma) == 0:
+            self.semana_inicial = primeira
+        antes = max(self.semana_inicial - primeira, 0)
+        depois = max(ultima - (self.semana_inicial + len(self.soma) - 1), 0)
+        if antes or depois:
+            largura = ((antes, depois), (0, 0), (0, 0))
+            self.soma = np.pad(self.soma, largura)
+            self.contagem = np.pad(self.contagem, largura)
+            self.minimo = np.pad(self.minimo, largura, constant_values=np.inf)
+            self.maximo = np.pad(self.maximo, largura, constant_values=-np.inf)
+            self.semana_inicial -= antes
+    
+    def adicionar_lote(self, df):
+        """
+        Acrescenta novos registros ao cubo.
+        
+        Args:
+            df (pandas.DataFrame): Registros de movimento.
+        """
+        self.adicionar_registros(RegistrosCompactos.de_dataframe(df))
+    
+    def adicionar_registros(self, registros):
+        """
+        Acrescenta novos registros compactos ao cubo, sem decodificá-los.
+        
+        Args:
+            registros (RegistrosCompactos): Registros de movimento.
+        """
+        if len(registros) == 0:
+            return
+        self._parciais.clear()
+        
+        dias = registros.dias.astype(np.int64) + 3
+        semanas, dias_semana = dias // 7, dias % 7
+        turnos = registros.turnos
+        quantidades = registros.quantidades
+        
+        self._garantir_semanas(int(semanas.min()), int(semanas.max()))
+        posicao = (semanas - self.semana_inicial, dias_semana, turnos)
+        np.add.at(self.soma, posicao, quantidades)
+        np.add.at(self.contagem, posicao, 1)
+        np.minimum.at(self.minimo, posicao, quantidades)
+        np.maximum.at(self.maximo, posicao, quantidades)
+    
+    def totais(self, semana=None):
+        """
+        Obtém os agregados por (dia da semana, turno) de todo o histórico ou
+        de uma semana.
+        
+        Args:
+            semana (datetime.date, optional): Qualquer data da semana desejada.
+                                            Se None, considera todo o histórico.
+        
+        Returns:
+            tuple: (soma, contagem, mínimo, máximo), vetores [dia, turno].
+        """
+        if semana is None:
+            return (self.soma.sum(axis=0), self.contagem.sum(axis=0),
+                    self.minimo.min(axis=0, initial=np.inf), self.maximo.max(axis=0, initial=-np.inf))
+        
+        posicao = self.numero_semana(semana) - self.semana_inicial
+        if 0 <= posicao < len(self.soma):
+            return self.soma[posicao], self.contagem[posicao], self.minimo[posicao], self.maximo[posicao]
+        forma = (len(DIAS_ORDENADOS), len(TURNOS))
+        return np.zeros(forma), np.zeros(forma, dtype=np.int64), np.full(forma, np.inf), np.full(forma, -np.inf)
+    
+    def acumulados(self):
+        """
+        Obtém as somas e contagens acumuladas semana a semana, calculadas uma
+        vez e reutilizadas até o cubo mudar.
+        
+        Returns:
+            tuple: (soma, contagem) acumuladas, vetores [semana + 1, dia, turno];
+                   a posição i contém o total das semanas anteriores a i.
+        """
+        if "acumulados" not in self._parciais:
+            inicio = np.zeros((1, len(DIAS_ORDENADOS), len(TURNOS)))
+            self._parciais["acumulados"] = (
+                np.concatenate([inicio, self.soma.cumsum(axis=0)]),
+                np.concatenate([inicio.astype(np.int64), self.contagem.cumsum(axis=0)])
+            )
+        return self._parciais["acumulados"]
+    
+    def _posicoes(self, inicio, fim):
+        """
+        Converte um período para as posições diárias do cubo (semana * 7 + dia),
+        limitadas à extensão do cubo.
+        
+        Args:
+            inicio (datetime.date): Primeiro dia do período (None para sem limite).
+            fim (datetime.date): Último dia do período (None para sem limite).
+            
+        Returns:
+            tuple: (primeira posição, última posição); vazio se a primeira for maior.
+        """
+        deslocamento = 3 - IndiceChaves.DIA_ZERO - self.semana_inicial * 7
+        primeira = 0 if inicio is None else pd.Timestamp(inicio).date().toordinal() + deslocamento
+        ultima = len(self.soma) * 7 - 1 if fim is None else pd.Timestamp(fim).date().toordinal() + deslocamento
+        return max(primeira, 0), min(ultima, len(self.soma) * 7 - 1)
+    
+    def totais_periodo(self, inicio=None, fim=None):
+        """
+        Obtém a soma e a contagem por (dia da semana, turno) de um período
+        qualquer. As semanas completas vêm das somas acumuladas e apenas a
+        primeira e a última semana são somadas dia a dia, então o custo não
+        depende do tamanho do período.
+        
+        Args:
+            inicio (datetime.date, optional): Primeiro dia do período (None para sem limite).
+            fim (datetime.date, optional): Último dia do período (None para sem limite).
+            
+        Returns:
+            tuple: (soma, contagem), vetores [dia, turno].
+        """
+        forma = (len(DIAS_ORDENADOS), len(TURNOS))
+        primeira, ultima = self._posicoes(inicio, fim)
+        if primeira > ultima:
+            return np.zeros(forma), np.zeros(forma, dtype=np.int64)
+        
+        semana_inicio, dia_inicio = divmod(primeira, 7)
+        semana_fim, dia_fim = divmod(ultima, 7)
+        if semana_inicio == semana_fim:
+            soma, contagem = np.zeros(forma), np.zeros(forma, dtype=np.int64)
+            soma[dia_inicio:dia_fim + 1] = self.soma[semana_inicio, dia_inicio:dia_fim + 1]
+            contagem[dia_inicio:dia_fim + 1] = self.contagem[semana_inicio, dia_inicio:dia_fim + 1]
+            return soma, contagem
+        
+        # Semanas completas entre a primeira e a última, mais as semanas das pontas
+        soma_acumulada, contagem_acumulada = self.acumulados()
+        soma = soma_acumulada[semana_fim] - soma_acumulada[semana_inicio + 1]
+        contagem = contagem_acumulada[semana_fim] - contagem_acumulada[semana_inicio + 1]
+        soma[dia_inicio:] += self.soma[semana_inicio, dia_inicio:]
+        contagem[dia_inicio:] += self.contagem[semana_inicio, dia_inicio:]
+        soma[:dia_fim + 1] += self.soma[semana_fim, :dia_fim + 1]
+        contagem[:dia_fim + 1] += self.contagem[semana_fim, :dia_fim + 1]
+        return soma, contagem
+    
+    def _valores(self, semanas=slice(None)):
+        """
+        Obtém a quantidade de pessoas de cada data e turno (NaN sem registro).
+        
+        Args:
+            semanas (slice): Semanas do cubo a considerar.
+            
+        Returns:
+            numpy.ndarray: Valores por [semana, dia, turno].
+        """
+        contagem = self.contagem[semanas]
+        return np.where(contagem > 0, self.soma[semanas] / np.maximum(contagem, 1), np.nan)
+    
+    @staticmethod
+    def _percentis(valores, percentis, eixo):
+        """
+        Calcula percentis ignorando as posições sem registro.
+        
+        Args:
+            valores (numpy.ndarray): Valores com NaN nas posições sem registro.
+            percentis (tuple): Percentis desejados (0 a 100).
+            eixo (int): Eixo sobre o qual os percentis são calculados.
+            
+        Returns:
+            numpy.ndarray: Percentis, com o primeiro eixo indexando os percentis.
+        """
+        with warnings.catch_warnings():
+            # Combinações sem nenhum registro resultam em NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanpercentile(valores, list(percentis), axis=eixo)
+    
+    def percentis_periodo(self, inicio=None, fim=None, percentis=PERCENTIS_RELATORIO):
+        """
+        Calcula percentis da quantidade de pessoas por (dia da semana, turno)
+        em um período, percorrendo apenas as semanas do período.
+        
+        Args:
+            inicio (datetime.date, optional): Primeiro dia do período (None para sem limite).
+            fim (datetime.date, optional): Último dia do período (None para sem limite).
+            percentis (tuple): Percentis desejados (0 a 100).
+            
+        Returns:
+            numpy.ndarray: Percentis por [percentil, dia, turno] (NaN sem registros).
+        """
+        primeira, ultima = self._posicoes(inicio, fim)
+        if primeira > ultima:
+            return np.full((len(percentis), len(DIAS_ORDENADOS), len(TURNOS)), np.nan)
+        
+        valores = self._valores(slice(primeira // 7, ultima // 7 + 1)).copy()
+        # Descartar os dias das semanas das pontas que ficam fora do período
+        valores[0, :primeira % 7] = np.nan
+        valores[-1, ultima % 7 + 1:] = np.nan
+        return self._percentis(valores, percentis, eixo=0)
+    
+    def janelas_moveis(self, semanas, percentis=PERCENTIS_RELATORIO):
+        """
+        Calcula, de uma só vez para todo o histórico, os agregados de janelas
+        móveis de N semanas por (dia da semana, turno). As somas vêm das somas
+        acumuladas e os percentis de uma visão deslizante dos valores, sem
+        laços sobre as janelas. O resultado fica guardado até o cubo mudar.
+        
+        Args:
+            semanas (int): Tamanho da janela em semanas.
+            percentis (tuple): Percentis desejados (0 a 100).
+            
+        Returns:
+            tuple: (números das semanas finais de cada janela, soma [janela, dia, turno],
+                    contagem [janela, dia, turno], percentis [percentil, janela, dia, turno]).
+        """
+        chave = ("janelas", semanas, tuple(percentis))
+        if chave not in self._parciais:
+            quantidade = len(self.soma) - semanas + 1
+            if semanas < 1 or quantidade < 1:
+                forma = (0, len(DIAS_ORDENADOS), len(TURNOS))
+                self._parciais[chave] = (np.empty(0, dtype=np.int64), np.zeros(forma), np.zeros(forma, dtype=np.int64),
+                                         np.zeros((len(percentis),) + forma))
+            else:
+                soma_acumulada, contagem_acumulada = self.acumulados()
+                janelas = np.lib.stride_tricks.sliding_window_view(self._valores(), semanas, axis=0)
+                self._parciais[chave] = (
+                    self.semana_inicial + np.arange(semanas - 1, len(self.soma)),
+                    soma_acumulada[semanas:] - soma_acumulada[:-semanas],
+                    contagem_acumulada[semanas:] - contagem_acumulada[:-semanas],
+                    self._percentis(janelas, percentis, eixo=-1)
+                )
+        return self._parciais[chave]
+    
+    @staticmethod
+    def medias_de(soma, contagem):
+        """
+        Calcula a média de pessoas por dia e turno a partir de somas e contagens.
+        
+        Args:
+            soma (numpy.ndarray): Soma de pessoas por [dia, turno].
+            contagem (numpy.ndarray): Quantidade de registros por [dia, turno].
+            
+        Returns:
+            pandas.DataFrame: DataFrame com as colunas 'dia_da_semana', 'turno' e
+                              'quantidade_pessoas', apenas para combinações com registros.
+        """
+        dias, turnos = np.nonzero(contagem)
+        return pd.DataFrame({
+            "dia_da_semana": pd.Categorical.from_codes(dias, categories=DIAS_ORDENADOS),
+            "turno": pd.Categorical.from_codes(turnos, categories=TURNOS),
+            "quantidade_pessoas": soma[dias, turnos] / contagem[dias, turnos]
+        })
+    
+    def medias(self, semana=None):
+        """
+        Calcula a média de pessoas por dia da semana e turno.
+        
+        Args:
+            semana (datetime.date, optional): Qualquer data da semana desejada.
+                                            Se None, considera todo o histórico.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com as colunas 'dia_da_semana', 'turno' e
+                              'quantidade_pessoas', apenas para combinações com registros.
+        """
+        soma, contagem, _, _ = self.totais(semana)
+        return self.medias_de(soma, contagem)
+    
+    def estatisticas(self, semana=None):
+        """
+        Obtém soma, contagem, média, mínimo e máximo por dia da semana e turno.
+        
+        Args:
+            semana (datetime.date, optional): Qualquer data da semana desejada.
+                                            Se None, considera todo o histórico.
+        
+        Returns:
+            pandas.DataFrame: Estatísticas das combinações com registros.
+        """
+        soma, contagem, minimo, maximo = self.totais(semana)
+        estatisticas = self.medias_de(soma, contagem)
+        dias, turnos = np.nonzero(contagem)
+        estatisticas["soma"] = soma[dias, turnos]
+        estatisticas["contagem"] = contagem[dias, turnos]
+        estatisticas["minimo"] = minimo[dias, turnos]
+        estatisticas["maximo"] = maximo[dias, turnos]
+        return estatisticas
+    
+    @classmethod
+    def carregar(cls, caminho):
+        """
+        Carrega o cubo persistido.
+        
+        Args:
+            caminho (str): Caminho do arquivo do cubo (.npz).
+            
+        Returns:
+            CuboAgregados: Cubo carregado ou None se o arquivo não existir ou
+                           estiver inválido.
+        """
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with INSTRUMENTACAO.leitura(caminho), np.load(caminho) as arquivo:
+                assinatura = tuple(arquivo["assinatura"].tolist())
+                cubo = cls(assinatura=assinatura if assinatura != (-1, -1) else None)
+                cubo.semana_inicial = int(arquivo["semana_inicial"])
+                cubo.soma = arquivo["soma"]
+                cubo.contagem = arquivo["contagem"]
+                cubo.minimo = arquivo["minimo"]
+                cubo.maximo = arquivo["maximo"]
+                if "posicao" in arquivo.files:
+                    posicao = tuple(arquivo["posicao"].tolist())
+                    cubo.posicao = posicao if posicao != (-1, -1) else None
+            return cubo
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def salvar(self, caminho):
+        """
+        Persiste o cubo.
+        
+        Args:
+            caminho (str): Caminho do arquivo do cubo (.npz).
+        """
+        def escrever(temporario):
+            with open(temporario, "wb") as arquivo:
+                np.savez(arquivo, assinatura=np.asarray(self.assinatura or (-1, -1), dtype=np.int64),
+                         posicao=np.asarray(self.posicao or (-1, -1), dtype=np.int64),
+                         semana_inicial=self.semana_inicial, soma=self.soma, contagem=self.contagem,
+                         minimo=self.minimo, maximo=self.maximo)
+        
+        gravar_atomico(caminho, escrever)
+
+
+class RegraFuncionarios:
+    """
+    Tabela de faixas que relaciona a média de pessoas ao número recomendado
+    de funcionários.
+    
+    Cada faixa começa em um limite mínimo de pessoas; a média é associada à
+    última faixa cujo limite mínimo ela atinge. A consulta é uma busca binária
+    vetorizada sobre toda a coluna de médias.
+    
+    Attributes:
+        limites (numpy.ndarray): Limites mínimos de pessoas de cada faixa, em ordem crescente.
+        funcionarios (numpy.ndarray): Número de funcionários de cada faixa.
+    """
+    
+    # Faixas padrão: até 25 pessoas, 1 funcionário; até 50, 2; até 100, 3; acima, 4
+    LIMITES_PADRAO = [0, 25, 50, 100]
+    FUNCIONARIOS_PADRAO = [1, 2, 3, 4]
+    
+    def __init__(self, limites=None, funcionarios=None):
+        """
+        Inicializa a regra com as faixas informadas ou com as faixas padrão.
+        
+        Args:
+            limites (array-like, optional): Limites mínimos de pessoas de cada faixa.
+            funcionarios (array-like, optional): Número de funcionários de cada faixa.
+        """
+        if limites is None or funcionarios is None:
+            limites, funcionarios = self.LIMITES_PADRAO, self.FUNCIONARIOS_PADRAO
+        
+        limites = np.asarray(limites, dtype=np.float64)
+        funcionarios = np.asarray(funcionarios, dtype=np.int64)
+        if len(limites) == 0 or len(limites) != len(funcionarios):
+            raise ValueError("A regra de funcionários deve ter ao menos uma faixa e um número de funcionários por faixa.")
+        
+        ordem = np.argsort(limites, kind="stable")
+        self.limites = limites[ordem]
+        self.funcionarios = funcionarios[ordem]
+    
+    @classmethod
+    def carregar(cls, caminho=REGRAS_PATH, loja=None):
+        """
+        Carrega a regra de um arquivo CSV com as colunas 'limite_minimo' e
+        'funcionarios' e, opcionalmente, 'loja'.
+        
+        Linhas com a coluna 'loja' vazia valem para todas as lojas; se houver
+        linhas específicas da loja informada, apenas elas são usadas.
+        
+        Args:
+            caminho (str): Caminho do arquivo de regras.
+            loja (str, optional): Loja cuja regra deve ser carregada.
+            
+        Returns:
+            RegraFuncionarios: Regra carregada ou a regra padrão se o arquivo
+                               não existir, não tiver faixas para a loja ou
+                               for inválido.
+        """
+        if not os.path.exists(caminho):
+            return cls()
+        
+        try:
+            with INSTRUMENTACAO.leitura(caminho):
+                regras = pd.read_csv(caminho)
+            if 'loja' in regras.columns:
+                especificas = regras[regras['loja'].astype(str) == str(loja)] if loja is not None else regras.iloc[0:0]
+                regras = especificas if not especificas.empty else regras[regras['loja'].isna()]
+            if regras.empty:
+                return cls()
+            return cls(regras['limite_minimo'], regras['funcionarios'])
+        except (ValueError, KeyError) as e:
+            st.error(f"Arquivo de regras de funcionários inválido, usando as faixas padrão: {str(e)}")
+            traceback.print_exc()
+            return cls()
+    
+    def aplicar(self, medias):
+        """
+        Calcula o número recomendado de funcionários para um conjunto de médias.
+        
+        Args:
+            medias (array-like): Médias de pessoas.
+            
+        Returns:
+            numpy.ndarray: Número recomendado de funcionários para cada média.
+        """
+        posicoes = np.searchsorted(self.limites, np.asarray(medias, dtype=np.float64), side="right") - 1
+        return self.funcionarios[np.clip(posicoes, 0, None)]
+
+
+class CacheCarregamento:
+    """
+    Cache em nível de processo dos conjuntos de movimento carregados dos
+    arquivos de dados.
+    
+    Cada entrada é indexada pelo caminho absoluto do arquivo e validada pela
+    assinatura (mtime, tamanho) do arquivo, de modo que o disco só é lido
+    novamente quando o arquivo muda. Os conjuntos são imutáveis e, por isso,
+    compartilhados sem cópia entre as sessões.
+    
+    Attributes:
+        _entradas (dict): Mapeia caminho -> (assinatura, ConjuntoMovimento).
+        _trava (threading.Lock): Trava para acesso concorrente entre sessões.
+    """
+    
+    def __init__(self):
+        """Inicializa o cache vazio."""
+        self._entradas = {}
+        self._trava = threading.Lock()
+    
+    @staticmethod
+    def assinatura(caminho):
+        """
+        Obtém a assinatura atual de um arquivo, incluindo o log de escrita
+        ao lado dele (caminho + SUFIXO_LOG), quando existir.
+        
+        Args:
+            caminho (str): Caminho do arquivo.
+            
+        Returns:
+            tuple: (mtime em nanossegundos, tamanho em bytes), seguidos dos
+                   mesmos dados do log, ou None se o arquivo não existir.
+        """
+        try:
+            info = os.stat(caminho)
+        except OSError:
+            return None
+        try:
+            log = os.stat(caminho + SUFIXO_LOG)
+        except OSError:
+            return (info.st_mtime_ns, info.st_size)
+        return (info.st_mtime_ns, info.st_size, log.st_mtime_ns, log.st_size)
+    
+    def obter(self, caminho, carregador):
+        """
+        Obtém o conjunto de movimento de um arquivo, lendo o disco apenas se
+        o arquivo tiver mudado desde a última leitura.
+        
+        Args:
+            caminho (str): Caminho do arquivo.
+            carregador (callable): Função sem argumentos que lê e valida o arquivo.
+            
+        Returns:
+            ConjuntoMovimento: Conjunto em cache.
+        """
+        chave = os.path.abspath(caminho)
+        assinatura = self.assinatura(caminho)
+        with self._trava:
+            entrada = self._entradas.get(chave)
+        if entrada is not None and entrada[0] == assinatura:
+            INSTRUMENTACAO.contar("cache_carregamento_acertos")
+            return entrada[1]
+        
+        INSTRUMENTACAO.contar("cache_carregamento_falhas")
+        conjunto = carregador()
+        with self._trava:
+            self._entradas[chave] = (assinatura, conjunto)
+        return conjunto
+    
+    def invalidar(self, caminho):
+        """
+        Remove do cache a entrada de um arquivo.
+        
+        Args:
+            caminho (str): Caminho do arquivo.
+        """
+        with self._trava:
+            self._entradas.pop(os.path.abspath(caminho), None)
+
+
+@st.cache_resource(show_spinner=False)
+def obter_cache_carregamento():
+    """
+    Obtém o cache de carregamento compartilhado pelo processo, preservado
+    entre as reexecuções do Streamlit.
+    
+    Returns:
+        CacheCarregamento: Instância única do cache.
+    """
+    return CacheCarregamento()
+
+
+class CacheGraficos:
+    """
+    Cache em nível de processo das imagens de gráficos já renderizadas, com
+    descarte do item usado há mais tempo (LRU).
+    
+    Attributes:
+        capacidade (int): Quantidade máxima de imagens guardadas.
+        _imagens (collections.OrderedDict): Mapeia impressão digital -> bytes da imagem.
+        _trava (threading.Lock): Trava para acesso concorrente entre sessões.
+    """
+    
+    def __init__(self, capacidade=32):
+        """
+        Inicializa o cache vazio.
+        
+        Args:
+            capacidade (int): Quantidade máxima de imagens guardadas.
+        """
+        self.capacidade = capacidade
+        self._imagens = OrderedDict()
+        self._trava = threading.Lock()
+    
+    def obter(self, chave):
+        """
+        Obtém uma imagem do cache, marcando-a como usada recentemente.
+        
+        Args:
+            chave (str): Impressão digital do gráfico.
+            
+        Returns:
+            bytes: Imagem renderizada ou None se não estiver no cache.
+        """
+        with self._trava:
+            imagem = self._imagens.get(chave)
+            if imagem is not None:
+                self._imagens.move_to_end(chave)
+        INSTRUMENTACAO.contar("cache_graficos_acertos" if imagem is not None else "cache_graficos_falhas")
+        return imagem
+    
+    def guardar(self, chave, imagem):
+        """
+        Guarda uma imagem no cache, descartando a menos usada se necessário.
+        
+        Args:
+            chave (str): Impressão digital do gráfico.
+            imagem (bytes): Imagem renderizada.
+        """
+        with self._trava:
+            self._imagens[chave] = imagem
+            self._imagens.move_to_end(chave)
+            while len(self._imagens) > self.capacidade:
+                self._imagens.popitem(last=False)
+
+
+@st.cache_resource(show_spinner=False)
+def obter_cache_graficos():
+    """
+    Obtém o cache de gráficos compartilhado pelo processo, preservado entre
+    as reexecuções do Streamlit.
+    
+    Returns:
+        CacheGraficos: Instância única do cache.
+    """
+    return CacheGraficos()
+
+
+@st.cache_resource(show_spinner=False)
+def carregar_logo(caminho=LOGO_PATH, largura=300, assinatura=None):
+    """
+    Decodifica a logo uma única vez e guarda uma miniatura em PNG, evitando
+    abrir a imagem original a cada execução.
+    
+    Args:
+        caminho (str): Caminho da imagem da logo.
+        largura (int): Largura máxima da miniatura em pixels.
+        assinatura (tuple, optional): Assinatura do arquivo, para recarregar a
+                                      logo quando ele mudar.
+        
+    Returns:
+        bytes: Miniatura da logo em PNG.
+    """
+    from PIL import Image
+    
+    with Image.open(caminho) as imagem:
+        imagem.thumbnail((largura, largura))
+        buffer = io.BytesIO()
+        imagem.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@st.cache_resource(show_spinner=False)
+def obter_gerenciador(loja=None):
+    """
+    Obtém o gerenciador de dados compartilhado pelo processo, preservando o
+    índice de chaves entre as reexecuções do Streamlit.
+    
+    Args:
+        loja (str, optional): Loja cujos dados serão gerenciados. Se None,
+                            usa os arquivos da pasta da aplicação.
+    
+    Returns:
+        GerenciadorDados: Instância única do gerenciador da loja.
+    """
+    if loja is None:
+        return GerenciadorDados()
+    return GerenciadorDados.para_loja(loja)
+
+
+def listar_lojas(diretorio=LOJAS_DIR):
+    """
+    Lista as lojas que possuem partição de dados.
+    
+    Args:
+        diretorio (str): Diretório com uma subpasta de dados por loja.
+        
+    Returns:
+        list: Nomes das lojas, em ordem alfabética.
+    """
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(nome for nome in os.listdir(diretorio)
+                  if os.path.isdir(os.path.join(diretorio, nome)))
+
+
+class GerenciadorDados:
+    """
+    Classe responsável pelo gerenciamento de dados e operações com arquivos CSV.
+    
+    O formato do arquivo de movimento é definido pela extensão de data_file:
+    CSV (padrão), colunar (.parquet, .feather) ou SQLite (.db, .sqlite). Para
+    arquivos SQLite é criado um GerenciadorDadosSQLite.
+    
+    Attributes:
+        data_file (str): Caminho para o arquivo de dados de movimento.
+        escala_file (str): Caminho para o arquivo de escala de funcionários.
+        relatorio_file (str): Caminho para o arquivo de relatório semanal.
+        cubo_file (str): Caminho para o arquivo do cubo de agregados.
+        grafico_file (str): Caminho para o arquivo de imagem do gráfico.
+        snapshot_file (str): Caminho dos metadados do snapshot binário dos
+                             registros (data_file + SUFIXO_SNAPSHOT), que
+                             indicam a versão em vigor, mapeada na memória na
+                             carga inicial.
+        armazenamento: Armazenamento do arquivo de movimento (ver criar_armazenamento).
+        loja (str): Loja a que os dados pertencem (None para a loja única).
+        trava (threading.RLock): Trava do cubo de agregados em memória, para
+                                 leituras em segundo plano durante gravações.
+        trava_escrita (TravaArquivo): Trava de escrita do arquivo de dados,
+                                      compartilhada com outros processos.
+    """
+    
+    def __new__(cls, data_file="movimento_loja.csv", *args, **kwargs):
+        """
+        Cria o gerenciador adequado ao arquivo de dados: bancos SQLite usam
+        a restrição UNIQUE do banco em vez do índice de chaves em memória.
+        
+        Args:
+            data_file (str): Caminho para o arquivo de dados de movimento.
+            
+        Returns:
+            GerenciadorDados: Gerenciador (ou GerenciadorDadosSQLite) não inicializado.
+        """
+        if cls is GerenciadorDados and data_file.lower().endswith(EXTENSOES_SQLITE):
+            cls = GerenciadorDadosSQLite
+        return super().__new__(cls)
+    
+    def __init__(self, data_file="movimento_loja.csv", 
+                 escala_file="escala_funcionarios.csv", 
+                 relatorio_file="relatorio_semanal.csv",
+                 cubo_file="cubo_movimento.npz",
+                 grafico_file=GRAFICO_PATH):
+        """
+        Inicializa o gerenciador de dados com os caminhos dos arquivos.
+        
+        Args:
+            data_file (str): Caminho para o arquivo de dados de movimento.
+            escala_file (str): Caminho para o arquivo de escala de funcionários.
+            relatorio_file (str): Caminho para o arquivo de relatório semanal.
+            cubo_file (str): Caminho para o arquivo do cubo de agregados.
+            grafico_file (str): Caminho para o arquivo de imagem do gráfico.
+        """
+        self.data_file = data_file
+        self.escala_file = escala_file
+        self.relatorio_file = relatorio_file
+        self.cubo_file = cubo_file
+        self.grafico_file = grafico_file
+        self.snapshot_file = data_file + SUFIXO_SNAPSHOT
+        self.armazenamento = criar_armazenamento(data_file)
+        self.loja = None
+        # Índice em memória das chaves (data, turno) já registradas e a
+        # assinatura do arquivo de dados correspondente ao índice
+        self._indice = None
+        self._assinatura_indice = None
+        # Inode e tamanho do arquivo já indexados, para indexar só o que foi anexado
+        self._posicao_indice = None
+        # Cubo de agregados em memória e a assinatura com que foi salvo por
+        # último (o arquivo do cubo é regravado fora do caminho das gravações)
+        self._cubo = None
+        self._assinatura_cubo_salvo = None
+        # Dados ordenados por data para consultas por período, com as datas
+        # em dias (vetor para busca binária) e a assinatura correspondente
+        self._ordenado = None
+        self._dias_ordenados = None
+        self._assinatura_ordenado = None
+        self.trava = threading.RLock()
+        self.trava_escrita = TravaArquivo(data_file)
+    
+    @classmethod
+    def para_loja(cls, loja, diretorio=LOJAS_DIR, extensao=".csv"):
+        """
+        Cria o gerenciador da partição de dados de uma loja, com todos os
+        arquivos na subpasta da loja.
+        
+        Args:
+            loja (str): Nome da loja.
+            diretorio (str): Diretório com uma subpasta de dados por loja.
+            extensao (str): Extensão do arquivo de movimento (define o armazenamento).
+            
+        Returns:
+            GerenciadorDados: Gerenciador dos dados da loja.
+        """
+        pasta = os.path.join(diretorio, loja)
+        os.makedirs(pasta, exist_ok=True)
+        gerenciador = cls(os.path.join(pasta, "movimento_loja" + extensao),
+                          os.path.join(pasta, "escala_funcionarios.csv"),
+                          os.path.join(pasta, "relatorio_semanal.csv"),
+                          os.path.join(pasta, "cubo_movimento.npz"),
+                          os.path.join(pasta, "grafico_turnos.png"))
+        gerenciador.loja = loja
+        return gerenciador
+    
+    @instrumentar
+    def obter_conjunto(self):
+        """
+        Obtém o conjunto de movimento do arquivo de dados, validado no esquema
+        tipado.
+        
+        O arquivo só é lido e validado novamente quando muda; caso contrário,
+        o conjunto é obtido do cache de carregamento do processo.
+        
+        Returns:
+            ConjuntoMovimento: Conjunto com os dados carregados ou um conjunto
+                               vazio se o arquivo não existir.
+        """
+        try:
+            if os.path.exists(self.data_file):
+                return obter_cache_carregamento().obter(self.data_file, self._ler_arquivo)
+            else:
+                return ConjuntoMovimento()
+        except Exception as e:
+            st.error(f"Erro ao carregar dados: {str(e)}")
+            traceback.print_exc()
+            return ConjuntoMovimento()
+    
+    @instrumentar
+    def carregar_dados(self):
+        """
+        Carrega os dados do arquivo de movimento.
+        
+        Returns:
+            pandas.DataFrame: Visão dos dados no esquema tipado (sem cópia) ou
+                             um DataFrame vazio se o arquivo não existir.
+        """
+        return self.obter_conjunto().dados
+    
+    @instrumentar
+    def _ler_arquivo(self):
+        """
+        Obtém os registros do arquivo de movimento.
+        
+        Se o snapshot binário corresponder ao arquivo, ele é apenas mapeado na
+        memória: nada é lido nem decodificado até ser usado, e os processos que
+        mapeiam o mesmo snapshot compartilham as páginas em memória. Caso
+        contrário, o arquivo é lido, o esquema tipado é aplicado e o snapshot
+        é regravado para as próximas cargas.
+        
+        Returns:
+            ConjuntoMovimento: Conjunto com os dados do arquivo.
+        """
+        assinatura = CacheCarregamento.assinatura(self.data_file)
+        registros = self._ler_snapshot(assinatura)
+        if registros is not None:
+            return ConjuntoMovimento.de_registros(registros)
+        
+        df = self.armazenamento.ler()
+        conjunto = ConjuntoMovimento(df)
+        
+        # Verificar se havia linhas inválidas (descartadas pelo esquema)
+        if len(conjunto) < len(df):
+            st.warning("Alguns registros do arquivo (datas, turnos ou quantidades inválidos) foram ignorados.")
+        
+        self._salvar_snapshot(conjunto.registros, assinatura)
+        return conjunto
+    
+    def _versao_snapshot(self, versao):
+        """
+        Obtém o caminho de uma versão do snapshot binário.
+        
+        Cada versão é gravada em um arquivo próprio e nunca substituída: no
+        Windows, um arquivo mapeado na memória por outro processo não pode
+        ser substituído.
+        
+        Args:
+            versao (str): Identificação da versão.
+            
+        Returns:
+            str: Caminho do arquivo .npy da versão.
+        """
+        return f"{self.data_file}.snapshot.{versao}.npy"
+    
+    def _remover_snapshots_antigos(self, atual):
+        """
+        Remove as versões do snapshot diferentes da atual. Versões ainda
+        mapeadas por outro processo (no Windows) ficam para a próxima vez.
+        
+        Args:
+            atual (str): Caminho da versão em vigor.
+        """
+        pasta, nome = os.path.split(os.path.abspath(self.data_file))
+        prefixo = nome + ".snapshot."
+        for arquivo in os.listdir(pasta):
+            caminho = os.path.join(pasta, arquivo)
+            if arquivo.startswith(prefixo) and arquivo.endswith(".npy") and caminho != os.path.abspath(atual):
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+    
+    def _ler_snapshot(self, assinatura):
+        """
+        Mapeia o snapshot binário dos registros, se corresponder ao arquivo
+        de dados.
+        
+        Args:
+            assinatura (tuple): Assinatura atual do arquivo de dados.
+            
+        Returns:
+            RegistrosCompactos: Registros mapeados na memória, ou None se o
+                                snapshot não existir ou estiver desatualizado.
+        """
+        try:
+            with open(self.snapshot_file, encoding="utf-8") as arquivo:
+                metadados = json.load(arquivo)
+            if assinatura is None or tuple(metadados["assinatura"]) != assinatura:
+                return None
+            registros = RegistrosCompactos.carregar(self._versao_snapshot(metadados["versao"]), mapear=True)
+            return registros if len(registros) == metadados["registros"] else None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _salvar_snapshot(self, registros, assinatura):
+        """
+        Grava uma nova versão do snapshot binário dos registros e, depois
+        dela, os metadados que a indicam, com a assinatura do arquivo de dados
+        a que corresponde. As versões anteriores são removidas em seguida.
+        
+        Args:
+            registros (RegistrosCompactos): Registros a gravar.
+            assinatura (tuple): Assinatura do arquivo de dados lido.
+        """
+        if assinatura is None:
+            return
+        
+        # A versão é derivada da assinatura: a mesma versão tem sempre o mesmo conteúdo
+        versao = hashlib.sha1(repr(tuple(assinatura)).encode()).hexdigest()[:16]
+        caminho = self._versao_snapshot(versao)
+        
+        def escrever(temporario):
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump({"assinatura": list(assinatura), "versao": versao, "registros": len(registros)}, arquivo)
+        
+        try:
+            if not os.path.exists(caminho):
+                registros.salvar(caminho)
+            gravar_atomico(self.snapshot_file, escrever)
+            self._remover_snapshots_antigos(caminho)
+        except OSError as e:
+            st.warning(f"Não foi possível salvar o snapshot dos dados: {str(e)}")
+    
+    def atualizar_snapshot(self):
+        """
+        Regrava o snapshot binário se ele não corresponder mais ao arquivo de
+        dados, para que a próxima carga inicial apenas o mapeie na memória.
+        
+        O arquivo é lido em blocos e cada bloco é codificado nos vetores
+        compactos, de modo que apenas os registros compactos de todo o
+        histórico (e não o DataFrame completo) ficam na memória.
+        
+        Returns:
+            bool: True se o snapshot foi regravado.
+        """
+        assinatura = CacheCarregamento.assinatura(self.data_file)
+        if assinatura is None or self._ler_snapshot(assinatura) is not None:
+            return False
+        # Os registros são lidos depois da assinatura, portanto são no mínimo tão recentes quanto ela
+        registros = RegistrosCompactos.concatenar(
+            RegistrosCompactos.de_dataframe(bloco) for bloco in self.armazenamento.ler_blocos())
+        self._salvar_snapshot(registros, assinatura)
+        return True
+    
+    @instrumentar
+    def importar_csv(self, caminho):
+        """
+        Importa um arquivo CSV de movimento, substituindo os dados atuais.
+        
+        Args:
+            caminho (str): Caminho do arquivo CSV a importar.
+            
+        Returns:
+            pandas.DataFrame: DataFrame com os dados importados.
+        """
+        with INSTRUMENTACAO.leitura(caminho):
+            df = aplicar_esquema(pd.read_csv(caminho))
+        with self.trava_escrita:
+            self.armazenamento.gravar(df)
+        obter_cache_carregamento().invalidar(self.data_file)
+        return df
+    
+    @instrumentar
+    def exportar_csv(self, caminho=None):
+        """
+        Exporta os dados de movimento em formato CSV, com datas no formato ISO.
+        
+        Args:
+            caminho (str, optional): Caminho do arquivo de destino. Se None,
+                                   retorna o conteúdo em bytes.
+        
+        Returns:
+            bytes: Conteúdo CSV codificado em UTF-8, se caminho for None.
+        """
+        df = self.carregar_dados()
+        if caminho is not None:
+            with INSTRUMENTACAO.gravacao(caminho):
+                df.to_csv(caminho, index=False, date_format="%Y-%m-%d")
+            return None
+        return df.to_csv(index=False, date_format="%Y-%m-%d").encode('utf-8')
+    
+    @instrumentar
+    def carregar_periodo(self, inicio, fim=None):
+        """
+        Carrega os dados de um período, considerando apenas o dia das datas.
+        
+        Args:
+            inicio (datetime.date): Primeiro dia do período.
+            fim (datetime.date, optional): Último dia do período. Se None,
+                                         não há limite final.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com os dados do período.
+        """
+        return self.consultar(inicio, fim)
+    
+    @instrumentar
+    def consultar(self, inicio=None, fim=None, turnos=None, dias=None):
+        """
+        Consulta os registros de um período, considerando apenas o dia das
+        datas, opcionalmente restritos a alguns turnos e dias da semana.
+        
+        O período é localizado por busca binária sobre os dados ordenados por
+        data, de modo que o custo da consulta é proporcional ao tamanho do
+        resultado, e não ao do histórico. Os dados ordenados são preparados
+        uma vez a cada alteração do arquivo.
+        
+        Args:
+            inicio (datetime.date, optional): Primeiro dia do período (None para sem limite).
+            fim (datetime.date, optional): Último dia do período (None para sem limite).
+            turnos (list, optional): Turnos a incluir (None para todos).
+            dias (list, optional): Dias da semana a incluir (None para todos).
+        
+        Returns:
+            pandas.DataFrame: Registros do período, ordenados por data.
+        """
+        # Arquivos grandes são filtrados bloco a bloco, sem carregar todo o histórico
+        tamanho = os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+        if tamanho > LIMITE_LEITURA_COMPLETA:
+            blocos = [self._filtrar(aplicar_esquema(bloco), inicio, fim, turnos, dias)
+                      for bloco in self.armazenamento.ler_blocos()]
+            df = pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame(columns=COLUNAS)
+            return df.sort_values('data', kind='stable', ignore_index=True)
+        
+        df, dias_ordenados = self._obter_ordenado()
+        if df.empty:
+            return df.copy(deep=False)
+        
+        # Faixa [primeira posição >= início, primeira posição > fim)
+        limite_inicial = 0 if inicio is None else np.searchsorted(dias_ordenados, self._dia(inicio), side='left')
+        limite_final = len(df) if fim is None else np.searchsorted(dias_ordenados, self._dia(fim), side='right')
+        resultado = df.iloc[limite_inicial:limite_final]
+        return self._filtrar(resultado, None, None, turnos, dias).reset_index(drop=True)
+    
+    @staticmethod
+    def _dia(valor):
+        """
+        Converte uma data para a quantidade de dias desde 1970-01-01.
+        
+        Args:
+            valor: Data (datetime.date, datetime, pandas.Timestamp ou texto ISO).
+            
+        Returns:
+            int: Dias desde 1970-01-01.
+        """
+        return pd.Timestamp(valor).normalize().value // (24 * 3600 * 10**9)
+    
+    @instrumentar
+    def _obter_ordenado(self):
+        """
+        Obtém os dados ordenados por data e o vetor das datas em dias,
+        reordenando-os apenas se o arquivo tiver mudado.
+        
+        Returns:
+            tuple: (DataFrame ordenado por data, numpy.ndarray com as datas em dias)
+        """
+        assinatura = CacheCarregamento.assinatura(self.data_file)
+        if self._ordenado is None or assinatura != self._assinatura_ordenado:
+            conjunto = self.obter_conjunto()
+            # Ordenar pelos dias compactos (int32), sem comparar as datas
+            dias = conjunto.registros.dias
+            ordem = np.argsort(dias, kind='stable')
+            df = conjunto.dados.take(ordem).reset_index(drop=True)
+            dias_ordenados = dias[ordem]
+            self._ordenado, self._dias_ordenados = df, dias_ordenados
+            self._assinatura_ordenado = assinatura
+        return self._ordenado, self._dias_ordenados
+    
+    @staticmethod
+    def _filtrar(df, inicio, fim, turnos=None, dias=None):
+        """
+        Filtra os registros de um período, considerando apenas o dia das
+        datas, e dos turnos e dias da semana informados.
+        
+        Args:
+            df (pandas.DataFrame): DataFrame no esquema tipado.
+            inicio (datetime.date): Primeiro dia do período (None para sem limite).
+            fim (datetime.date): Último dia do período (None para sem limite).
+            turnos (list, optional): Turnos a incluir (None para todos).
+            dias (list, optional): Dias da semana a incluir (None para todos).
+            
+        Returns:
+            pandas.DataFrame: DataFrame com os registros filtrados.
+        """
+        filtro = np.ones(len(df), dtype=bool)
+        if inicio is not None:
+            filtro &= (df['data'] >= pd.Timestamp(inicio).normalize()).to_numpy()
+        if fim is not None:
+            filtro &= (df['data'] < pd.Timestamp(fim).normalize() + timedelta(days=1)).to_numpy()
+        if turnos is not None:
+            filtro &= df['turno'].isin(list(turnos)).to_numpy()
+        if dias is not None:
+            filtro &= df['dia_da_semana'].isin(list(dias)).to_numpy()
+        return df if filtro.all() else df[filtro]
+    
+    @instrumentar
+    def agregar_em_blocos(self, tamanho_bloco=TAMANHO_BLOCO):
+        """
+        Constrói o cubo de agregados percorrendo o arquivo de dados em blocos,
+        com uso de memória limitado ao tamanho do bloco, independentemente do
+        tamanho do histórico.
+        
+        Args:
+            tamanho_bloco (int): Quantidade de linhas por bloco.
+            
+        Returns:
+            CuboAgregados: Cubo com os agregados de todo o histórico.
+        """
+        cubo = CuboAgregados(assinatura=CacheCarregamento.assinatura(self.data_file))
+        if os.path.exists(self.data_file):
+            for bloco in self.armazenamento.ler_blocos(tamanho_bloco):
+                cubo.adicionar_lote(bloco)
+        return cubo
+    
+    @instrumentar
+    def verificar_duplicidade(self, data, turno):
+        """
+        Verifica se já existe um registro para a data e turno especificados.
+        
+        Args:
+            data (str): Data no formato YYYY-MM-DD.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
+            
+        Returns:
+            bool: True se já existe um registro, False caso contrário.
+        """
+        try:
+            # Converter a data de entrada para o mesmo formato do índice
+            data_dt = pd.to_datetime(data, errors='coerce')
+            if pd.isna(data_dt):
+                return False
+            return self._existe(data_dt.date(), turno)
+        except Exception as e:
+            st.error(f"Erro ao verificar duplicidade: {str(e)}")
+            traceback.print_exc()
+            return False
+    
+    def _existe(self, dia, turno):
+        """
+        Verifica se já existe um registro para o dia e turno, consultando o
+        índice de chaves (data, turno) em memória.
+        
+        Args:
+            dia (datetime.date): Dia do registro.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
+            
+        Returns:
+            bool: True se já existe um registro, False caso contrário.
+        """
+        return self._obter_indice().contem(dia, turno)
+    
+    @instrumentar
+    def verificar_duplicidade_lote(self, datas, turnos):
+        """
+        Verifica a duplicidade de um lote de registros em uma única operação.
+        
+        Args:
+            datas (array-like): Datas dos registros candidatos.
+            turnos (array-like): Turnos dos registros candidatos.
+            
+        Returns:
+            numpy.ndarray: Vetor booleano, True para cada registro que já existe
+                           ou que se repete dentro do lote.
+        """
+        return self._obter_indice().contem_lote(datas, turnos)
+    
+    @instrumentar
+    def _obter_indice(self):
+        """
+        Obtém o índice de chaves (data, turno), reconstruindo-o a partir dos
+        dados carregados caso ainda não exista ou o arquivo tenha sido
+        alterado por outro processo. Se o outro processo apenas anexou
+        registros, somente os registros novos são indexados, até a última
+        linha completa (a leitura pode ocorrer durante uma gravação alheia).
+        
+        Returns:
+            IndiceChaves: Índice das chaves já registradas.
+        """
+        assinatura = CacheCarregamento.assinatura(self.data_file)
+        if self._indice is None or assinatura != self._assinatura_indice:
+            posicao = self._posicao_arquivo()
+            anterior = self._posicao_indice
+            if (self._indice is not None and anterior is not None and posicao is not None
+                    and self.armazenamento.anexa_no_fim
+                    and posicao[0] == anterior[0] and posicao[1] >= anterior[1]):
+                novos, fim = self.armazenamento.ler_a_partir(anterior[1])
+                novos = aplicar_esquema(novos)
+                self._indice.adicionar_lote(novos['data'], novos['turno'])
+                posicao = (posicao[0], fim)
+            else:
+                self._indice = IndiceChaves.de_registros(self.obter_conjunto().registros)
+                if posicao is not None and self.armazenamento.anexa_no_fim:
+                    # A próxima leitura incremental recomeça na última linha
+                    # completa; linhas já indexadas lidas de novo não mudam o índice
+                    posicao = (posicao[0], self.armazenamento.fim_linhas_completas(posicao[1]))
+            self._assinatura_indice = assinatura
+            self._posicao_indice = posicao
+        return self._indice
+    
+    def _posicao_arquivo(self):
+        """
+        Obtém o inode e o tamanho atuais do arquivo de dados.
+        
+        Returns:
+            tuple: (inode, tamanho em bytes) ou None se o arquivo não existir.
+        """
+        try:
+            info = os.stat(self.data_file)
+        except OSError:
+            return None
+        return (info.st_ino, info.st_size)
+    
+    @instrumentar
+    def salvar_dados(self, data, turno, quantidade):
+        """
+        Salva os dados de movimento no arquivo de dados, anexando apenas o
+        novo registro ao final do arquivo.
+        
+        Args:
+            data (str): Data no formato YYYY-MM-DD.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
+            quantidade (int): Quantidade de pessoas.
+            
+        Returns:
+            tuple: (DataFrame com o registro inserido, bool indicando sucesso, mensagem)
+        """
+        try:
+            # Verificar se a data é futura
+            data_dt = pd.to_datetime(data, errors='coerce')
+            if pd.isna(data_dt):
+                return None, False, "Formato de data inválido."
+                
+            if data_dt.date() > datetime.today().date():
+                return None, False, "Não é possível registrar datas futuras."
+            
+            # Mesmas regras de validar_lote, garantidas também pelo esquema tipado
+            if turno not in TURNOS:
+                return None, False, "Turno inválido."
+            if pd.isna(pd.to_numeric(quantidade, errors='coerce')) or int(quantidade) < 0:
+                return None, False, "Quantidade de pessoas inválida."
+            
+            # Traduzir o dia da semana
+            dia_en = data_dt.day_name()
+            dia_pt = self.traduzir_dia(dia_en)
+            
+            # Criar a nova linha já no esquema tipado, com a data convertida uma única vez
+            df = aplicar_esquema(pd.DataFrame({
+                "data": [data_dt.normalize()],
+                "dia_da_semana": [dia_pt],
+                "turno": [turno],
+                "quantidade_pessoas": [int(quantidade)]
+            }))
+            
+            # Verificar duplicidade e gravar sob a trava de escrita, para que
+            # outro caixa não grave o mesmo registro entre as duas etapas
+            with self.trava_escrita:
+                if self._existe(data_dt.date(), turno):
+                    return None, False, "Já existe um registro para esta data e turno."
+                
+                # Anexar apenas a nova linha ao arquivo (sem reescrever o histórico)
+                if not self._inserir(df):
+                    return None, False, "Já existe um registro para esta data e turno."
+            
+            return df, True, "Registro salvo com sucesso!"
+        except Exception as e:
+            st.error(f"Erro ao salvar dados: {str(e)}")
+            traceback.print_exc()
+            return None, False, f"Erro ao salvar dados: {str(e)}"
+    
+    @instrumentar
+    def validar_lote(self, df, indice_lote=None):
+        """
+        Valida um lote de registros de forma vetorizada, com as mesmas regras
+        de salvar_dados (data válida e não futura, turno válido, quantidade
+        válida e sem duplicidade).
+        
+        Args:
+            df (pandas.DataFrame): Registros com as colunas 'data', 'turno' e
+                                 'quantidade_pessoas'.
+            indice_lote (IndiceChaves, optional): Chaves já aceitas em lotes
+                                                anteriores da mesma importação.
+        
+        Returns:
+            tuple: (DataFrame com os registros válidos no esquema tipado,
+                    Series com o motivo da rejeição de cada registro inválido)
+        """
+        datas = pd.to_datetime(df['data'], errors='coerce')
+        quantidades = pd.to_numeric(df['quantidade_pessoas'], errors='coerce')
+        motivos = pd.Series(None, index=df.index, dtype=object)
+        
+        # As regras são aplicadas em ordem; cada registro fica com o primeiro motivo
+        regras = [
+            (datas.isna().to_numpy(), "Formato de data inválido."),
+            ((datas.dt.normalize() > pd.Timestamp(date.today())).to_numpy(), "Não é possível registrar datas futuras."),
+            (~df['turno'].isin(TURNOS).to_numpy(), "Turno inválido."),
+            ((quantidades.isna() | (quantidades < 0)).to_numpy(), "Quantidade de pessoas inválida."),
+        ]
+        for filtro, motivo in regras:
+            motivos[filtro & motivos.isna().to_numpy()] = motivo
+        
+        # Verificar duplicidade apenas entre os registros que passaram nas demais regras
+        validos = motivos.isna().to_numpy()
+        duplicados = self.verificar_duplicidade_lote(datas[validos], df['turno'][validos])
+        if indice_lote is not None:
+            duplicados |= indice_lote.contem_lote(datas[validos], df['turno'][validos])
+        motivos.iloc[np.flatnonzero(validos)[duplicados]] = "Já existe um registro para esta data e turno."
+        
+        validos = motivos.isna().to_numpy()
+        registros = pd.DataFrame({
+            "data": datas[validos].dt.normalize(),
+            "dia_da_semana": np.asarray(DIAS_ORDENADOS)[datas[validos].dt.weekday.to_numpy()],
+            "turno": df['turno'][validos],
+            "quantidade_pessoas": quantidades[validos],
+        })
+        return aplicar_esquema(registros), motivos.dropna()
+    
+    @instrumentar
+    def salvar_lote(self, df):
+        """
+        Grava de uma só vez um lote de registros já validados por validar_lote.
+        
+        O lote é validado novamente sob a trava de escrita, pois outro processo
+        pode ter gravado as mesmas chaves depois da validação; um lote com
+        qualquer registro inválido ou duplicado não é gravado.
+        
+        Args:
+            df (pandas.DataFrame): Registros validados.
+            
+        Returns:
+            bool: True se os registros foram gravados, False se algum
+                  registro era inválido ou duplicado.
+        """
+        if df.empty:
+            return True
+        with self.trava_escrita:
+            registros, motivos = self.validar_lote(df)
+            if not motivos.empty:
+                return False
+            if not self._inserir(registros):
+                return False
+        # Um lote costuma ser uma importação: o cubo é salvo em seguida
+        self.salvar_cubo()
+        return True
+    
+    @instrumentar
+    def _inserir(self, df):
+        """
+        Grava novos registros no armazenamento e atualiza o índice de chaves.
+        
+        Args:
+            df (pandas.DataFrame): Registros já validados.
+            
+        Returns:
+            bool: True se os registros foram gravados, False se houve duplicidade.
+        """
+        # Gravar sempre as colunas de COLUNAS, no esquema tipado
+        df = aplicar_esquema(df)
+        indice = self._obter_indice()
+        assinatura_anterior = self._assinatura_indice
+        self.armazenamento.anexar(df)
+        indice.adicionar_lote(df['data'], df['turno'])
+        self._assinatura_indice = CacheCarregamento.assinatura(self.data_file)
+        self._posicao_indice = self._posicao_arquivo()
+        
+        self._apos_insercao(df, assinatura_anterior)
+        return True
+    
+    @instrumentar
+    def _apos_insercao(self, df, assinatura_anterior):
+        """
+        Atualiza os dados derivados após a gravação de novos registros.
+        
+        Args:
+            df (pandas.DataFrame): Registros gravados.
+            assinatura_anterior (tuple): Assinatura do arquivo de dados antes da gravação.
+        """
+        # Atualizar o cubo de agregados em memória: com os registros gravados,
+        # se estava em dia com o arquivo, ou com os registros anexados desde
+        # a posição em que estava (inclusive os de outros processos). O
+        # arquivo do cubo é salvo depois, em segundo plano (ver salvar_cubo).
+        with self.trava:
+            cubo = self._cubo
+            if cubo is None:
+                cubo = CuboAgregados.carregar(self.cubo_file)
+            if cubo is not None and cubo.assinatura == assinatura_anterior:
+                cubo.adicionar_lote(df)
+                cubo.assinatura = CacheCarregamento.assinatura(self.data_file)
+                cubo.posicao = self._posicao_arquivo()
+                self._cubo = cubo
+            elif cubo is not None and self._acompanhar_cubo(cubo):
+                self._cubo = cubo
+        
+        # Invalidar o cache de carregamento para a próxima leitura
+        obter_cache_carregamento().invalidar(self.data_file)
+    
+    def precisa_compactar(self):
+        """
+        Verifica se o log de escrita atingiu o tamanho de compactação.
+        
+        Returns:
+            bool: True se o log deve ser compactado.
+        """
+        return self.armazenamento.tamanho_log() > LIMITE_LOG
+    
+    @instrumentar
+    def compactar(self):
+        """
+        Incorpora o log de escrita ao arquivo de dados principal, mantendo em
+        dia o índice de chaves e o cubo de agregados (o conteúdo não muda).
+        
+        Returns:
+            bool: True se havia log a compactar.
+        """
+        with self.trava_escrita, self.trava:
+            anterior = CacheCarregamento.assinatura(self.data_file)
+            if not self.armazenamento.compactar():
+                return False
+            
+            assinatura = CacheCarregamento.assinatura(self.data_file)
+            if self._assinatura_indice == anterior:
+                self._assinatura_indice = assinatura
+                self._posicao_indice = self._posicao_arquivo()
+            if self._cubo is not None and self._cubo.assinatura == anterior:
+                self._cubo.assinatura = assinatura
+                self._cubo.posicao = self._posicao_arquivo()
+                self._assinatura_cubo_salvo = assinatura
+                try:
+                    self._cubo.salvar(self.cubo_file)
+                except OSError as e:
+                    st.warning(f"Não foi possível salvar o cubo de agregados: {str(e)}")
+        
+        obter_cache_carregamento().invalidar(self.data_file)
+        return True
+    
+    @instrumentar
+    def obter_cubo(self):
+        """
+        Obtém o cubo de agregados correspondente ao arquivo de dados, da
+        memória ou do arquivo do cubo, reconstruindo-o apenas se estiver
+        ausente ou desatualizado.
+        
+        Returns:
+            CuboAgregados: Cubo de agregados do movimento.
+        """
+        with self.trava:
+            assinatura = CacheCarregamento.assinatura(self.data_file)
+            if self._cubo is None or self._cubo.assinatura != assinatura:
+                INSTRUMENTACAO.contar("cache_cubo_falhas")
+                cubo = self._cubo
+                if cubo is None or not self._acompanhar_cubo(cubo):
+                    cubo = CuboAgregados.carregar(self.cubo_file)
+                    if cubo is not None and cubo.assinatura == assinatura:
+                        self._assinatura_cubo_salvo = assinatura
+                    elif cubo is None or not self._acompanhar_cubo(cubo):
+                        cubo = self.reconstruir_cubo()
+                self._cubo = cubo
+            else:
+                INSTRUMENTACAO.contar("cache_cubo_acertos")
+            return self._cubo
+    
+    def _acompanhar_cubo(self, cubo):
+        """
+        Incorpora ao cubo apenas os registros anexados ao arquivo de dados
+        depois da posição em que ele está em dia, sem reconstruí-lo. Como no
+        índice de chaves, somente linhas completas são lidas. Deve ser
+        chamado com a trava do cubo adquirida.
+        
+        Args:
+            cubo (CuboAgregados): Cubo a atualizar.
+            
+        Returns:
+            bool: True se o cubo foi atualizado; False se o arquivo não
+                  permite a leitura apenas do que foi anexado (o cubo não é
+                  alterado).
+        """
+        # Assinatura e posição obtidas antes da leitura: o cubo fica no mínimo tão recente quanto elas
+        assinatura = CacheCarregamento.assinatura(self.data_file)
+        posicao, anterior = self._posicao_arquivo(), cubo.posicao
+        if (not self.armazenamento.anexa_no_fim or anterior is None or posicao is None
+                or posicao[0] != anterior[0] or posicao[1] < anterior[1]):
+            return False
+        
+        novos, fim = self.armazenamento.ler_a_partir(anterior[1])
+        cubo.adicionar_lote(novos)
+        # Com uma linha ainda incompleta, a assinatura fica em aberto para a próxima leitura
+        cubo.assinatura = assinatura if fim >= posicao[1] else None
+        cubo.posicao = (posicao[0], fim)
+        return True
+    
+    def salvar_cubo(self):
+        """
+        Salva o cubo de agregados em memória, se estiver em dia com o arquivo
+        de dados e ainda não tiver sido salvo nesse estado. As gravações só
+        atualizam o cubo em memória; o arquivo do cubo é regravado aqui, em
+        segundo plano, para que as demais instâncias o carreguem em dia.
+        
+        Returns:
+            bool: True se o cubo foi salvo.
+        """
+        with self.trava:
+            cubo = self._cubo
+            if (cubo is None or cubo.assinatura is None or cubo.assinatura == self._assinatura_cubo_salvo
+                    or cubo.assinatura != CacheCarregamento.assinatura(self.data_file)):
+                return False
+            try:
+                cubo.salvar(self.cubo_file)
+            except OSError as e:
+                st.warning(f"Não foi possível salvar o cubo de agregados: {str(e)}")
+                return False
+            self._assinatura_cubo_salvo = cubo.assinatura
+            return True
+    
+    @instrumentar
+    def reconstruir_cubo(self):
+        """
+        Reconstrói o cubo de agregados a partir de todo o histórico, lendo o
+        arquivo de dados em blocos.
+        
+        Returns:
+            CuboAgregados: Cubo reconstruído.
+        """
+        cubo = self.agregar_em_blocos()
+        with self.trava:
+            self._cubo = cubo
+        try:
+            cubo.salvar(self.cubo_file)
+            self._assinatura_cubo_salvo = cubo.assinatura
+        except OSError as e:
+            st.warning(f"Não foi possível salvar o cubo de agregados: {str(e)}")
+        return cubo
+    
+    def traduzir_dia(self, dia_en):
+        """
+        Traduz o nome do dia da semana do inglês para o português.
+        
+        Args:
+            dia_en (str): Nome do dia em inglês.
+            
+        Returns:
+            str: Nome do dia em português.
+        """
+        traducoes = {
+            "Monday": "segunda-feira",
+            "Tuesday": "terça-feira",
+            "Wednesday": "quarta-feira",
+            "Thursday": "quinta-feira",
+            "Friday": "sexta-feira",
+            "Saturday": "sábado",
+            "Sunday": "domingo"
+        }
+        return traducoes.get(dia_en, dia_en)
+    
+    @instrumentar
+    def obter_dados_semana(self):
+        """
+        Obtém os dados da última semana.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com os dados da última semana.
+        """
+        try:
+            return self.consultar(date.today() - timedelta(days=6))
+        except Exception as e:
+            st.error(f"Erro ao obter dados da semana: {str(e)}")
+            traceback.print_exc()
+            return pd.DataFrame(columns=["data", "dia_da_semana", "turno", "quantidade_pessoas"])
+
+
+class GerenciadorDadosSQLite(GerenciadorDados):
+    """
+    Variante do gerenciador de dados que utiliza um banco SQLite local.
+    
+    A verificação de duplicidade é feita pela restrição UNIQUE (data, turno)
+    do banco, as consultas por período usam o índice sobre a data e as
+    gravações são transacionais, permitindo vários caixas registrando ao
+    mesmo tempo.
+    """
+    
+    def __init__(self, data_file="movimento_loja.db", 
+                 escala_file="escala_funcionarios.csv", 
+                 relatorio_file="relatorio_semanal.csv",
+                 cubo_file="cubo_movimento.npz",
+                 grafico_file=GRAFICO_PATH):
+        """
+        Inicializa o gerenciador com o banco de dados SQLite.
+        
+        Args:
+            data_file (str): Caminho para o banco de dados de movimento.
+            escala_file (str): Caminho para o arquivo de escala de funcionários.
+            relatorio_file (str): Caminho para o arquivo de relatório semanal.
+            cubo_file (str): Caminho para o arquivo do cubo de agregados.
+            grafico_file (str): Caminho para o arquivo de imagem do gráfico.
+        """
+        super().__init__(data_file, escala_file, relatorio_file, cubo_file, grafico_file)
+    
+    @instrumentar
+    def consultar(self, inicio=None, fim=None, turnos=None, dias=None):
+        """
+        Consulta os registros de um período com uma consulta por faixa no
+        índice sobre a data, com os filtros de turno e dia da semana no SQL.
+        
+        Args:
+            inicio (datetime.date, optional): Primeiro dia do período (None para sem limite).
+            fim (datetime.date, optional): Último dia do período (None para sem limite).
+            turnos (list, optional): Turnos a incluir (None para todos).
+            dias (list, optional): Dias da semana a incluir (None para todos).
+        
+        Returns:
+            pandas.DataFrame: Registros do período, ordenados por data.
+        """
+        inicio = None if inicio is None else pd.Timestamp(inicio)
+        fim = None if fim is None else pd.Timestamp(fim)
+        return aplicar_esquema(self.armazenamento.ler_periodo(inicio, fim, turnos, dias))
+    
+    def _existe(self, dia, turno):
+        """
+        Verifica se já existe um registro para o dia e turno, usando o índice
+        da restrição UNIQUE.
+        
+        Args:
+            dia (datetime.date): Dia do registro.
+            turno (str): Turno do dia (Manhã, Tarde, Noite).
+            
+        Returns:
+            bool: True se já existe um registro, False caso contrário.
+        """
+        return self.armazenamento.contem(dia, turno)
+    
+    @instrumentar
+    def _inserir(self, df):
+        """
+        Insere novos registros em uma transação; a restrição UNIQUE do banco
+        rejeita registros gravados por outro caixa ao mesmo tempo.
+        
+        Args:
+            df (pandas.DataFrame): Registros já validados.
+            
+        Returns:
+            bool: True se os registros foram gravados, False se houve duplicidade.
+        """
+        assinatura_anterior = CacheCarregamento.assinatura(self.data_file)
+        try:
+            self.armazenamento.anexar(df)
+        except sqlite3.IntegrityError:
+            return False
+        self._apos_insercao(df, assinatura_anterior)
+        return True
+
+
+class ImportadorMovimento:
+    """
+    Classe responsável pela importação em lote de históricos de movimento
+    (exportações de PDV, contadores de porta etc.).
+    
+    Os arquivos são lidos em blocos, cada bloco é validado de forma vetorizada
+    com as regras de salvar_dados e todos os registros válidos são gravados
+    de uma só vez ao final.
+    
+    Attributes:
+        gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+        tamanho_bloco (int): Quantidade de linhas lidas por bloco.
+    """
+    
+    def __init__(self, gerenciador, tamanho_bloco=200_000):
+        """
+        Inicializa o importador.
+        
+        Args:
+            gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+            tamanho_bloco (int): Quantidade de linhas lidas por bloco.
+        """
+        self.gerenciador = gerenciador
+        self.tamanho_bloco = tamanho_bloco
+    
+    def ler_blocos(self, caminho):
+        """
+        Lê um arquivo CSV ou JSON em blocos.
+        
+        Arquivos .json/.jsonl com um registro por linha são lidos em blocos;
+        arquivos JSON com uma lista de registros são lidos de uma só vez.
+        
+        Args:
+            caminho (str): Caminho do arquivo a importar.
+            
+        Yields:
+            pandas.DataFrame: Blocos de registros.
+        """
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao in (".json", ".jsonl", ".ndjson"):
+            with open(caminho, encoding="utf-8") as arquivo:
+                por_linha = not arquivo.read(1024).lstrip().startswith("[")
+            if por_linha:
+                with pd.read_json(caminho, lines=True, chunksize=self.tamanho_bloco,
+                                  dtype={"data": str}) as leitor:
+                    yield from leitor
+            else:
+                yield pd.read_json(caminho, dtype={"data": str})
+        else:
+            with pd.read_csv(caminho, chunksize=self.tamanho_bloco,
+                             dtype={"data": str, "turno": str}) as leitor:
+                yield from leitor
+    
+    def importar(self, caminho, rejeitados_file=None):
+        """
+        Importa um arquivo de movimento.
+        
+        Args:
+            caminho (str): Caminho do arquivo CSV ou JSON a importar.
+            rejeitados_file (str, optional): Caminho de um CSV para gravar os
+                                           registros rejeitados com o motivo.
+        
+        Returns:
+            dict: Com as chaves 'lidos', 'importados' e 'rejeitados' (contagem
+                  de registros rejeitados por motivo).
+        """
+        indice_lote = IndiceChaves()
+        validos, rejeitados = [], []
+        lidos = 0
+        
+        for bloco in self.ler_blocos(caminho):
+            lidos += len(bloco)
+            bloco = bloco.reindex(columns=COLUNAS)
+            registros, motivos = self.gerenciador.validar_lote(bloco, indice_lote)
+            indice_lote.adicionar_lote(registros['data'], registros['turno'])
+            validos.append(registros)
+            if not motivos.empty:
+                rejeitados.append(bloco.loc[motivos.index].assign(motivo=motivos))
+        
+        registros = pd.concat(validos, ignore_index=True) if validos else pd.DataFrame(columns=COLUNAS)
+        if not self.gerenciador.salvar_lote(registros):
+            raise ValueError("Já existe um registro para uma das datas e turnos importados.")
+        
+        rejeitados = pd.concat(rejeitados, ignore_index=True) if rejeitados else pd.DataFrame(columns=COLUNAS + ["motivo"])
+        if rejeitados_file is not None and not rejeitados.empty:
+            rejeitados.to_csv(rejeitados_file, index=False)
+        
+        return {
+            "lidos": lidos,
+            "importados": len(registros),
+            "rejeitados": rejeitados['motivo'].value_counts().to_dict(),
+        }
+
+
+class AnaliseDados:
+    """
+    Classe responsável pelas análises e cálculos sobre os dados.
+    
+    Attributes:
+        gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+        regra (RegraFuncionarios): Regra de cálculo do número de funcionários.
+    """
+    
+    def __init__(self, gerenciador, regra=None):
+        """
+        Inicializa o analisador de dados.
+        
+        Args:
+            gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+            regra (RegraFuncionarios, optional): Regra de cálculo do número de
+                                               funcionários. Se None, carrega
+                                               a regra da loja do arquivo de regras.
+        """
+        self.gerenciador = gerenciador
+        self.regra = regra if regra is not None else RegraFuncionarios.carregar(loja=gerenciador.loja)
+    
+    def calcular_funcionarios(self, media_pessoas):
+        """
+        Determina o número ideal de funcionários com base na média de pessoas.
+        
+        Args:
+            media_pessoas (float): Média de pessoas no período.
+            
+        Returns:
+            int: Número recomendado de funcionários.
+        """
+        return int(self.regra.aplicar([media_pessoas])[0])
+    
+    @instrumentar
+    def gerar_escala_funcionarios(self, df=None, reconstruir=False):
+        """
+        Gera a escala recomendada de funcionários com base nos dados de movimento.
+        
+        Sem um DataFrame, a escala é obtida do cubo de agregados, atualizado a
+        cada registro salvo, sem reagrupar todo o histórico.
+        
+        Args:
+            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
+                                           usa o cubo de agregados.
+            reconstruir (bool): Se True, reconstrói o cubo a partir de todo
+                               o histórico.
+        
+        Returns:
+            pandas.DataFrame: DataFrame com a escala de funcionários.
+        """
+        try:
+            if df is None:
+                if reconstruir:
+                    cubo = self.gerenciador.reconstruir_cubo()
+                else:
+                    cubo = self.gerenciador.obter_cubo()
+                escala = cubo.medias()
+            else:
+                if df.empty:
+                    return pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_necessarios"])
+                
+                # Registros de movimento são validados no esquema tipado
+                # (sem nova conversão se já vierem de carregar_dados)
+                if 'data' in df.columns:
+                    df = aplicar_esquema(df)
+                
+                # Agrupar por dia da semana e turno, calcular média de pessoas
+                escala = df.groupby(["dia_da_semana", "turno"], observed=True)["quantidade_pessoas"].mean().reset_index()
+            
+            if escala.empty:
+                return pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_necessarios"])
+            
+            # Calcular número de funcionários necessários
+            escala["funcionarios_necessarios"] = self.regra.aplicar(escala["quantidade_pessoas"])
+            
+            # Ordenar dias da semana
+            escala['ordem'] = escala['dia_da_semana'].map({dia: i for i, dia in enumerate(DIAS_ORDENADOS)})
+            escala = escala.sort_values(['ordem', 'turno']).drop('ordem', axis=1)
+            
+            # Salvar no arquivo
+            try:
+                with INSTRUMENTACAO.gravacao(self.gerenciador.escala_file):
+                    escala.to_csv(self.gerenciador.escala_file, index=False)
+            except Exception as e:
+                st.warning(f"Não foi possível salvar a escala: {str(e)}")
+            
+            return escala
+        except Exception as e:
+            st.error(f"Erro ao gerar escala: {str(e)}")
+            traceback.print_exc()
+            return pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_necessarios"])
+    
+    
+    @instrumentar
+    def gerar_relatorio_semanal(self):
+        """
+        Gera o relatório semanal com dados agregados e insights.
+
+        Returns:
+            tuple: (DataFrame com resumo, turno mais movimentado, dia mais fraco)
+        """
+        try:
+            hoje = datetime.today()
+            inicio_semana = hoje - timedelta(days=hoje.weekday() + 7)  # Segunda anterior
+
+            # Médias por dia e turno da semana completa anterior (segunda a
+            # domingo), obtidas do cubo de agregados
+            resumo = self.gerenciador.obter_cubo().medias(semana=inicio_semana.date())
+            if resumo.empty:
+                return (pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_recomendados"]), 
+                        None, None)
+
+            resumo['funcionarios_recomendados'] = self.regra.aplicar(resumo['quantidade_pessoas'])
+
+            # Ordenar dias da semana
+            resumo['ordem'] = resumo['dia_da_semana'].map({dia: i for i, dia in enumerate(DIAS_ORDENADOS)})
+            resumo = resumo.sort_values(['ordem', 'turno']).drop('ordem', axis=1)
+
+            # Determinar turno mais movimentado
+            turno_mais_movimentado = resumo.loc[resumo['quantidade_pessoas'].idxmax()] if not resumo.empty else None
+
+            # Calcular média por dia (incluindo zeros)
+            media_por_dia = resumo.groupby('dia_da_semana', observed=True)['quantidade_pessoas'].mean().reindex(DIAS_ORDENADOS).fillna(0)
+            dia_mais_fraco = media_por_dia.idxmin()
+
+            # Salvar relatório
+            try:
+                with INSTRUMENTACAO.gravacao(self.gerenciador.relatorio_file):
+                    resumo.to_csv(self.gerenciador.relatorio_file, index=False)
+            except Exception as e:
+                st.warning(f"Não foi possível salvar o relatório: {str(e)}")
+
+            return resumo, turno_mais_movimentado, dia_mais_fraco
+        except Exception as e:
+            st.error(f"Erro ao gerar relatório semanal: {str(e)}")
+            traceback.print_exc()
+            return (pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_recomendados"]), 
+                    None, None)
+
+    
+    def _montar_relatorio(self, soma, contagem, valores_percentis, percentis):
+        """
+        Monta um relatório por (dia da semana, turno) a partir de agregados,
+        com a recomendação de funcionários pela média.
+        
+        Args:
+            soma (numpy.ndarray): Soma de pessoas por [..., dia, turno].
+            contagem (numpy.ndarray): Quantidade de registros por [..., dia, turno].
+            valores_percentis (numpy.ndarray): Percentis por [percentil, ..., dia, turno].
+            percentis (tuple): Percentis calculados.
+            
+        Returns:
+            tuple: (DataFrame com as colunas 'dia_da_semana', 'turno',
+                    'quantidade_pessoas', 'p<percentil>', 'registros' e
+                    'funcionarios_recomendados', apenas para combinações com
+                    registros; posições das linhas no vetor de agregados)
+        """
+        posicoes = np.nonzero(contagem)
+        relatorio = pd.DataFrame({
+            "dia_da_semana": pd.Categorical.from_codes(posicoes[-2], categories=DIAS_ORDENADOS),
+            "turno": pd.Categorical.from_codes(posicoes[-1], categories=TURNOS),
+            "quantidade_pessoas": soma[posicoes] / contagem[posicoes]
+        })
+        for i, percentil in enumerate(percentis):
+            relatorio[f"p{percentil:g}"] = valores_percentis[i][posicoes]
+        relatorio["registros"] = contagem[posicoes]
+        relatorio["funcionarios_recomendados"] = self.regra.aplicar(relatorio["quantidade_pessoas"])
+        return relatorio, posicoes
+    
+    @instrumentar
+    def gerar_relatorio_periodo(self, inicio=None, fim=None, percentis=PERCENTIS_RELATORIO):
+        """
+        Gera o relatório de um período qualquer, com média, percentis e
+        recomendação de funcionários por dia da semana e turno.
+        
+        Os totais do período são obtidos das somas acumuladas do cubo de
+        agregados, sem reler o histórico.
+        
+        Args:
+            inicio (datetime.date, optional): Primeiro dia do período (None para sem limite).
+            fim (datetime.date, optional): Último dia do período (None para sem limite).
+            percentis (tuple): Percentis a calcular (0 a 100).
+        
+        Returns:
+            pandas.DataFrame: Relatório do período (vazio se não houver registros).
+        """
+        # Os parciais do cubo são calculados e guardados sob a trava do cubo,
+        # para não misturar um cálculo com uma gravação concorrente
+        with self.gerenciador.trava:
+            cubo = self.gerenciador.obter_cubo()
+            soma, contagem = cubo.totais_periodo(inicio, fim)
+            valores_percentis = cubo.percentis_periodo(inicio, fim, percentis)
+        relatorio, _ = self._montar_relatorio(soma, contagem, valores_percentis, percentis)
+        return relatorio
+    
+    @instrumentar
+    def gerar_relatorio_mensal(self, ano, mes, percentis=PERCENTIS_RELATORIO):
+        """
+        Gera o relatório de um mês.
+        
+        Args:
+            ano (int): Ano.
+            mes (int): Mês (1 a 12).
+            percentis (tuple): Percentis a calcular (0 a 100).
+        
+        Returns:
+            pandas.DataFrame: Relatório do mês (ver gerar_relatorio_periodo).
+        """
+        inicio = date(ano, mes, 1)
+        fim = (pd.Timestamp(inicio) + pd.offsets.MonthEnd(0)).date()
+        return self.gerar_relatorio_periodo(inicio, fim, percentis)
+    
+    @instrumentar
+    def gerar_relatorio_trimestral(self, ano, trimestre, percentis=PERCENTIS_RELATORIO):
+        """
+        Gera o relatório de um trimestre.
+        
+        Args:
+            ano (int): Ano.
+            trimestre (int): Trimestre (1 a 4).
+            percentis (tuple): Percentis a calcular (0 a 100).
+        
+        Returns:
+            pandas.DataFrame: Relatório do trimestre (ver gerar_relatorio_periodo).
+        """
+        inicio = date(ano, 3 * trimestre - 2, 1)
+        fim = (pd.Timestamp(inicio) + pd.offsets.QuarterEnd(0)).date()
+        return self.gerar_relatorio_periodo(inicio, fim, percentis)
+    
+    @instrumentar
+    def gerar_relatorio_movel(self, semanas=4, percentis=PERCENTIS_RELATORIO):
+        """
+        Gera o relatório de janelas móveis de N semanas ao longo de todo o
+        histórico, com média, percentis e recomendação de funcionários por dia
+        da semana e turno em cada janela.
+        
+        Todas as janelas são calculadas em uma única passada vetorizada sobre o
+        cubo de agregados, e o resultado é reaproveitado em novos pedidos até
+        o cubo mudar.
+        
+        Args:
+            semanas (int): Tamanho da janela em semanas.
+            percentis (tuple): Percentis a calcular (0 a 100).
+        
+        Returns:
+            pandas.DataFrame: Relatório com a coluna 'semana_final' (segunda-feira
+                              da última semana da janela) e as colunas de
+                              gerar_relatorio_periodo.
+        """
+        with self.gerenciador.trava:
+            cubo = self.gerenciador.obter_cubo()
+            semanas_finais, soma, contagem, valores_percentis = cubo.janelas_moveis(semanas, percentis)
+        relatorio, posicoes = self._montar_relatorio(soma, contagem, valores_percentis, percentis)
+        inicio = pd.Timestamp(CuboAgregados.inicio_semana(0))
+        relatorio.insert(0, "semana_final", inicio + pd.to_timedelta(semanas_finais[posicoes[0]] * 7, unit="D"))
+        return relatorio
+
+
+def _analisar_loja(loja, diretorio):
+    """
+    Calcula os agregados parciais de uma loja (executado em um processo do pool).
+    
+    Args:
+        loja (str): Nome da loja.
+        diretorio (str): Diretório com uma subpasta de dados por loja.
+        
+    Returns:
+        dict: Escala e relatório semanal da loja, além das somas e contagens
+              por [dia, turno] de todo o histórico e da semana anterior.
+    """
+    gerenciador = GerenciadorDados.para_loja(loja, diretorio)
+    analise = AnaliseDados(gerenciador)
+    cubo = gerenciador.obter_cubo()
+    soma, contagem, _, _ = cubo.totais()
+    soma_semana, contagem_semana, _, _ = cubo.totais(semana=AnaliseRede.semana_anterior()[0])
+    
+    return {
+        "loja": loja,
+        "escala": analise.gerar_escala_funcionarios(),
+        "relatorio": analise.gerar_relatorio_semanal()[0],
+        "soma": soma,
+        "contagem": contagem,
+        "soma_semana": soma_semana,
+        "contagem_semana": contagem_semana,
+    }
+
+
+class AnaliseRede:
+    """
+    Classe responsável pelas análises de todas as lojas da rede.
+    
+    Cada loja é processada em paralelo em um pool de processos, e a visão
+    consolidada da rede é montada somando os agregados parciais (soma e
+    contagem por dia e turno) de cada loja, sem concatenar os dados brutos.
+    
+    Attributes:
+        diretorio (str): Diretório com uma subpasta de dados por loja.
+        lojas (list): Lojas analisadas.
+        max_processos (int): Número máximo de processos do pool.
+        regra (RegraFuncionarios): Regra de funcionários da visão consolidada.
+    """
+    
+    def __init__(self, lojas=None, diretorio=LOJAS_DIR, max_processos=None, regra=None):
+        """
+        Inicializa a análise da rede.
+        
+        Args:
+            lojas (list, optional): Lojas a analisar. Se None, todas as lojas do diretório.
+            diretorio (str): Diretório com uma subpasta de dados por loja.
+            max_processos (int, optional): Número máximo de processos. Se 1,
+                                         as lojas são processadas sem pool.
+            regra (RegraFuncionarios, optional): Regra da visão consolidada.
+        """
+        self.diretorio = diretorio
+        self.lojas = list(lojas) if lojas is not None else listar_lojas(diretorio)
+        self.max_processos = max_processos
+        self.regra = regra if regra is not None else RegraFuncionarios.carregar()
+    
+    @staticmethod
+    def semana_anterior():
+        """
+        Obtém o período da semana completa anterior (segunda a domingo).
+        
+        Returns:
+            tuple: (segunda-feira, domingo) como datetime.date.
+        """
+        hoje = date.today()
+        inicio_semana = hoje - timedelta(days=hoje.weekday() + 7)
+        return inicio_semana, inicio_semana + timedelta(days=6)
+    
+    def processar_lojas(self):
+        """
+        Processa todas as lojas, em paralelo quando houver mais de uma.
+        
+        Returns:
+            list: Resultados de _analisar_loja para cada loja.
+        """
+        if len(self.lojas) <= 1 or self.max_processos == 1:
+            return [_analisar_loja(loja, self.diretorio) for loja in self.lojas]
+        
+        # Ao ser executado pelo Streamlit, este arquivo é o módulo __main__, que
+        # não pode ser importado pelos processos do pool; usa-se o módulo pelo nome
+        modulo = sys.modules[__name__]
+        if __name__ == "__main__":
+            modulo = importlib.import_module(os.path.splitext(os.path.basename(__file__))[0])
+        
+        with ProcessPoolExecutor(max_workers=self.max_processos) as executor:
+            return list(executor.map(modulo._analisar_loja, self.lojas,
+                                     [self.diretorio] * len(self.lojas)))
+    
+    def _consolidar(self, resultados, chave_soma, chave_contagem, coluna):
+        """
+        Soma os agregados parciais das lojas e calcula a recomendação da rede.
+        
+        Args:
+            resultados (list): Resultados de processar_lojas.
+            chave_soma (str): Chave da soma parcial nos resultados.
+            chave_contagem (str): Chave da contagem parcial nos resultados.
+            coluna (str): Nome da coluna com o número de funcionários.
+            
+        Returns:
+            pandas.DataFrame: Médias por dia e turno da rede com a recomendação.
+        """
+        forma = (len(DIAS_ORDENADOS), len(TURNOS))
+        soma = sum((resultado[chave_soma] for resultado in resultados), np.zeros(forma))
+        contagem = sum((resultado[chave_contagem] for resultado in resultados), np.zeros(forma, dtype=np.int64))
+        
+        medias = CuboAgregados.medias_de(soma, contagem)
+        medias[coluna] = self.regra.aplicar(medias["quantidade_pessoas"])
+        return medias
+    
+    def gerar_analises(self):
+        """
+        Gera as escalas e relatórios semanais de cada loja e a visão
+        consolidada da rede.
+        
+        Returns:
+            dict: Com as chaves 'escalas' e 'relatorios' (DataFrames com a coluna
+                  'loja'), 'escala_rede' e 'relatorio_rede' (consolidados).
+        """
+        resultados = self.processar_lojas()
+        colunas_escala = ["loja", "dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_necessarios"]
+        colunas_relatorio = ["loja", "dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_recomendados"]
+        
+        escalas = [r["escala"].assign(loja=r["loja"]) for r in resultados if not r["escala"].empty]
+        relatorios = [r["relatorio"].assign(loja=r["loja"]) for r in resultados if not r["relatorio"].empty]
+        
+        return {
+            "escalas": pd.concat(escalas, ignore_index=True)[colunas_escala] if escalas else pd.DataFrame(columns=colunas_escala),
+            "relatorios": pd.concat(relatorios, ignore_index=True)[colunas_relatorio] if relatorios else pd.DataFrame(columns=colunas_relatorio),
+            "escala_rede": self._consolidar(resultados, "soma", "contagem", "funcionarios_necessarios"),
+            "relatorio_rede": self._consolidar(resultados, "soma_semana", "contagem_semana", "funcionarios_recomendados"),
+        }
+
+
+class VisualizacaoDados:
+    """
+    Classe responsável pela geração de gráficos e visualizações.
+    
+    Attributes:
+        gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+        cores (list): Cores das barras de cada turno.
+        tamanho (tuple): Tamanho da figura em polegadas.
+        grafico_file (str): Caminho para o arquivo de imagem do gráfico.
+    """
+    
+    def __init__(self, gerenciador, grafico_file=None):
+        """
+        Inicializa o visualizador de dados.
+        
+        Args:
+            gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+            grafico_file (str, optional): Caminho para o arquivo de imagem do gráfico.
+                                        Se None, usa o arquivo da partição do gerenciador.
+        """
+        self.gerenciador = gerenciador
+        self.cores = ['#9b59b6', '#3498db', '#e74c3c']  # Roxo, Azul, Vermelho
+        self.tamanho = (10, 6)
+        self.grafico_file = grafico_file if grafico_file is not None else gerenciador.grafico_file
+    
+    @instrumentar
+    def montar_pivot(self, df=None):
+        """
+        Monta a tabela pivô com a média de pessoas por dia e turno.
+        
+        Args:
+            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
+                                           usa as médias do cubo de
+                                           agregados por dia e turno.
+        
+        Returns:
+            pandas.DataFrame: Tabela com os dias nas linhas e os turnos nas
+                              colunas, ou None se não houver dados.
+        """
+        if df is None:
+            # Uma linha por dia e turno com a média, sem reler o histórico
+            df = self.gerenciador.obter_cubo().medias()
+        
+        if df.empty:
+            return None
+        
+        # Registros de movimento são validados no esquema tipado
+        # (sem nova conversão se já vierem de carregar_dados)
+        if 'data' in df.columns:
+            df = aplicar_esquema(df)
+        
+        # Criar tabela pivô com médias por dia e turno
+        pivot = df.pivot_table(values='quantidade_pessoas', 
+                              index='dia_da_semana', 
+                              columns='turno', 
+                              aggfunc='mean',
+                              observed=True).fillna(0)
+        
+        # Garantir que todos os turnos estejam presentes
+        for turno in TURNOS:
+            if turno not in pivot.columns:
+                pivot[turno] = 0
+        
+        # Selecionar apenas os turnos padrão e na ordem correta
+        pivot = pivot[TURNOS]
+        
+        # Ordenar dias da semana
+        return pivot.reindex(DIAS_ORDENADOS)
+    
+    def _criar_figura(self):
+        """
+        Cria uma figura vazia fora do pyplot, sem registro global de figuras.
+        
+        O matplotlib só é importado aqui, na primeira renderização, para não
+        pesar na inicialização da aplicação.
+        
+        Returns:
+            matplotlib.figure.Figure: Figura vazia.
+        """
+        from matplotlib.figure import Figure
+        return Figure(figsize=self.tamanho)
+    
+    def _figura_mensagem(self, mensagem, **estilo):
+        """
+        Cria uma figura contendo apenas uma mensagem centralizada.
+        
+        Args:
+            mensagem (str): Texto a exibir.
+            **estilo: Parâmetros de estilo do texto (fontsize, color etc.).
+            
+        Returns:
+            matplotlib.figure.Figure: Figura com a mensagem.
+        """
+        fig = self._criar_figura()
+        ax = fig.add_subplot()
+        ax.text(0.5, 0.5, mensagem, 
+                horizontalalignment='center', verticalalignment='center',
+                transform=ax.transAxes, **estilo)
+        return fig
+    
+    @instrumentar
+    def _desenhar(self, pivot):
+        """
+        Desenha o gráfico de barras a partir da tabela pivô.
+        
+        Args:
+            pivot (pandas.DataFrame): Tabela com a média por dia e turno.
+            
+        Returns:
+            matplotlib.figure.Figure: Figura com o gráfico.
+        """
+        # Criar figura e eixos
+        fig = self._criar_figura()
+        ax = fig.add_subplot()
+        
+        # Plotar gráfico de barras
+        pivot.plot(kind='bar', ax=ax, color=self.cores)
+        
+        # Configurar título e rótulos
+        ax.set_title("Média de Pessoas por Dia e Turno da Semana", fontsize=14)
+        ax.set_xlabel("Dia da Semana", fontsize=12)
+        ax.set_ylabel("Quantidade Média de Pessoas", fontsize=12)
+        ax.legend(title="Turno")
+        ax.tick_params(axis="x", labelrotation=45)
+        
+        # Adicionar rótulos nas barras
+        for container in ax.containers:
+            ax.bar_label(container, fmt='%.0f', label_type='edge', fontsize=8)
+        
+        fig.tight_layout()
+        return fig
+    
+    @instrumentar
+    def gerar_grafico(self, df=None):
+        """
+        Gera o gráfico de média de pessoas por dia e turno.
+        
+        A figura é criada fora do pyplot: não fica registrada em nenhum estado
+        global e é liberada assim que deixa de ser referenciada.
+        
+        Args:
+            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
+                                           usa as médias do cubo de
+                                           agregados por dia e turno.
+        
+        Returns:
+            matplotlib.figure.Figure: Figura com o gráfico gerado.
+        """
+        try:
+            pivot = self.montar_pivot(df)
+            if pivot is None:
+                return self._figura_mensagem("Sem dados para exibir", fontsize=14)
             
-            # Salvar no formato CSV
-            df.to_csv(self.data_file, index=False)
+            fig = self._desenhar(pivot)
             
-            # Reconverter para datetime após salvar para uso no restante do código
-            if 'data' in df.columns:
-                df['data'] = pd.to_datetime(df['data'])
+            # Salvar o gráfico como imagem
+            try:
+                with INSTRUMENTACAO.gravacao(self.grafico_file):
+                    fig.savefig(self.grafico_file)
+            except Exception as e:
+                st.warning(f"Não foi possível salvar o gráfico: {str(e)}")
             
-            return df, True, "Registro salvo com sucesso!"
+            return fig
         except Exception as e:
-            st.error(f"Erro ao salvar dados: {str(e)}")
+            st.error(f"Erro ao gerar gráfico: {str(e)}")
             traceback.print_exc()
-            return None, False, f"Erro ao salvar dados: {str(e)}"
+            
+            # Retornar um gráfico de erro
+            return self._figura_mensagem(f"Erro ao gerar gráfico: {str(e)}", fontsize=12, color='red')
     
-    def traduzir_dia(self, dia_en):
+    @instrumentar
+    def gerar_especificacao(self, df=None):
         """
-        Traduz o nome do dia da semana do inglês para o português.
+        Gera a especificação Vega-Lite do gráfico de média de pessoas por dia
+        e turno, para renderização no navegador.
+        
+        Apenas as médias agregadas são enviadas ao navegador; as dicas ao
+        passar o mouse e o destaque de turnos pela legenda não dependem do
+        servidor. Se os dados tiverem a coluna 'loja', a especificação inclui
+        uma seleção de loja, também resolvida no navegador.
         
         Args:
-            dia_en (str): Nome do dia em inglês.
-            
+            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
+                                           usa as médias do cubo de
+                                           agregados por dia e turno.
+        
         Returns:
-            str: Nome do dia em português.
+            dict: Especificação Vega-Lite ou None se não houver dados.
         """
-        traducoes = {
-            "Monday": "segunda-feira",
-            "Tuesday": "terça-feira",
-            "Wednesday": "quarta-feira",
-            "Thursday": "quinta-feira",
-            "Friday": "sexta-feira",
-            "Saturday": "sábado",
-            "Sunday": "domingo"
+        if df is not None and 'loja' in df.columns:
+            medias = (df.groupby(['loja', 'dia_da_semana', 'turno'], observed=True)['quantidade_pessoas']
+                      .mean()
+                      .reset_index())
+        else:
+            pivot = self.montar_pivot(df)
+            if pivot is None:
+                return None
+            medias = (pivot.rename_axis(index='dia_da_semana', columns='turno')
+                      .reset_index()
+                      .melt(id_vars='dia_da_semana', value_name='quantidade_pessoas')
+                      .dropna())
+        
+        if medias.empty:
+            return None
+        
+        medias['quantidade_pessoas'] = medias['quantidade_pessoas'].round(1)
+        for coluna in medias.columns.drop('quantidade_pessoas'):
+            medias[coluna] = medias[coluna].astype(str)
+        
+        especificacao = {
+            "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+            "title": "Média de Pessoas por Dia e Turno da Semana",
+            "data": {"values": medias.to_dict(orient='records')},
+            "params": [{
+                "name": "turno_selecionado",
+                "select": {"type": "point", "fields": ["turno"]},
+                "bind": "legend"
+            }],
+            "mark": "bar",
+            "encoding": {
+                "x": {"field": "dia_da_semana", "type": "nominal", "sort": DIAS_ORDENADOS,
+                      "title": "Dia da Semana", "axis": {"labelAngle": -45}},
+                "xOffset": {"field": "turno", "sort": TURNOS},
+                "y": {"field": "quantidade_pessoas", "type": "quantitative",
+                      "title": "Quantidade Média de Pessoas"},
+                "color": {"field": "turno", "type": "nominal", "title": "Turno",
+                          "scale": {"domain": TURNOS, "range": self.cores}},
+                "opacity": {"condition": {"param": "turno_selecionado", "value": 1}, "value": 0.2},
+                "tooltip": [
+                    {"field": "dia_da_semana", "title": "Dia"},
+                    {"field": "turno", "title": "Turno"},
+                    {"field": "quantidade_pessoas", "type": "quantitative", "title": "Média de pessoas"}
+                ]
+            }
         }
-        return traducoes.get(dia_en, dia_en)
+        
+        if 'loja' in medias.columns:
+            lojas = sorted(medias['loja'].unique())
+            especificacao["params"].append({
+                "name": "loja_selecionada",
+                "value": lojas[0],
+                "bind": {"input": "select", "options": lojas, "name": "Loja: "}
+            })
+            especificacao["transform"] = [{"filter": "datum.loja == loja_selecionada"}]
+            especificacao["encoding"]["tooltip"].insert(0, {"field": "loja", "title": "Loja"})
+        
+        return especificacao
     
-    def obter_dados_semana(self):
+    def impressao_digital(self, pivot, formato="png"):
         """
-        Obtém os dados da última semana.
+        Calcula a impressão digital de um gráfico a partir dos dados agregados
+        e das configurações de estilo.
         
+        Args:
+            pivot (pandas.DataFrame): Tabela com a média por dia e turno (ou None).
+            formato (str): Formato da imagem ('png' ou 'svg').
+            
         Returns:
-            pandas.DataFrame: DataFrame com os dados da última semana.
+            str: Impressão digital do gráfico.
         """
-        df = self.carregar_dados()
-        if df.empty:
-            return df
+        digest = hashlib.sha1(repr((formato, self.cores, self.tamanho)).encode())
+        if pivot is not None:
+            digest.update(repr((list(pivot.index), list(pivot.columns))).encode())
+            digest.update(pivot.to_numpy(dtype=np.float64).tobytes())
+        return digest.hexdigest()
+    
+    @instrumentar
+    def gerar_imagem(self, df=None, formato="png"):
+        """
+        Gera a imagem do gráfico de média de pessoas por dia e turno.
+        
+        A imagem é servida do cache de gráficos enquanto os dados agregados e
+        o estilo não mudarem; só então o gráfico é renderizado novamente e o
+        arquivo de imagem é regravado.
+        
+        Args:
+            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
+                                           usa as médias do cubo de
+                                           agregados por dia e turno.
+            formato (str): Formato da imagem ('png' ou 'svg').
         
+        Returns:
+            bytes: Imagem renderizada ou None em caso de erro.
+        """
         try:
-            ultima_semana = datetime.today() - timedelta(days=7)
-            # Garantir que a coluna de data seja do tipo datetime
-            df['data'] = pd.to_datetime(df['data'], errors='coerce')
-            # Remover linhas com datas inválidas
-            df = df.dropna(subset=['data'])
-            return df[df['data'] >= ultima_semana]
+            pivot = self.montar_pivot(df)
+            chave = self.impressao_digital(pivot, formato)
+            cache = obter_cache_graficos()
+            imagem = cache.obter(chave)
+            if imagem is not None:
+                return imagem
+            
+            if pivot is None:
+                fig = self._figura_mensagem("Sem dados para exibir", fontsize=14)
+            else:
+                fig = self._desenhar(pivot)
+            buffer = io.BytesIO()
+            with INSTRUMENTACAO.medir(f"renderizar {formato}"):
+                fig.savefig(buffer, format=formato)
+            # Descartar a figura assim que a imagem é gerada
+            fig.clear()
+            del fig
+            imagem = buffer.getvalue()
+            
+            # Salvar o gráfico como imagem apenas quando ele muda
+            if pivot is not None and formato == "png":
+                try:
+                    with INSTRUMENTACAO.gravacao(self.grafico_file), open(self.grafico_file, "wb") as arquivo:
+                        arquivo.write(imagem)
+                except Exception as e:
+                    st.warning(f"Não foi possível salvar o gráfico: {str(e)}")
+            
+            cache.guardar(chave, imagem)
+            return imagem
         except Exception as e:
-            st.error(f"Erro ao obter dados da semana: {str(e)}")
+            st.error(f"Erro ao gerar gráfico: {str(e)}")
             traceback.print_exc()
-            return pd.DataFrame(columns=["data", "dia_da_semana", "turno", "quantidade_pessoas"])
+            return None
 
 
-class AnaliseDados:
+class ProcessadorRelatorios:
     """
-    Classe responsável pelas análises e cálculos sobre os dados.
+    Classe responsável por gerar em segundo plano a escala, o relatório
+    semanal e o gráfico de cada loja, para que o registro de movimento não
+    espere por esses cálculos.
+    
+    Pedidos feitos enquanto uma tarefa da mesma loja está em execução são
+    agrupados em uma única nova execução ao final dela. A tarefa também
+    compacta o log de escrita dos dados quando ele passa de LIMITE_LOG e
+    regrava o arquivo do cubo de agregados e o snapshot binário dos registros.
     
     Attributes:
-        gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+        _executor (concurrent.futures.ThreadPoolExecutor): Threads de trabalho.
+        _tarefas (dict): Estado da tarefa de cada arquivo de dados.
+        _trava (threading.Lock): Trava para acesso concorrente ao estado.
     """
     
-    def __init__(self, gerenciador):
+    def __init__(self, max_threads=1):
         """
-        Inicializa o analisador de dados.
+        Inicializa o processador.
         
         Args:
-            gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+            max_threads (int): Quantidade de threads de trabalho.
         """
-        self.gerenciador = gerenciador
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="relatorios")
+        self._tarefas = {}
+        self._trava = threading.Lock()
     
-    def calcular_funcionarios(self, media_pessoas):
+    def _tarefa(self, gerenciador):
         """
-        Determina o número ideal de funcionários com base na média de pessoas.
+        Obtém o estado da tarefa de um gerenciador, criando-o se necessário.
+        Deve ser chamado com a trava adquirida.
         
         Args:
-            media_pessoas (float): Média de pessoas no período.
+            gerenciador (GerenciadorDados): Gerenciador dos dados da loja.
             
         Returns:
-            int: Número recomendado de funcionários.
+            dict: Estado da tarefa.
         """
-        if media_pessoas < 25:
-            return 1
-        elif media_pessoas < 50:
-            return 2
-        elif media_pessoas < 100:
-            return 3
-        else:
-            return 4
+        chave = os.path.abspath(gerenciador.data_file)
+        if chave not in self._tarefas:
+            self._tarefas[chave] = {
+                "estado": "ociosa",      # ociosa, agendada, executando, concluida ou erro
+                "versao": 0,             # incrementada a cada resultado gerado
+                "resultado": None,
+                "erro": None,
+                "duracao": None,
+                "repetir": False,
+                "imagem": False
+            }
+        return self._tarefas[chave]
     
-    def gerar_escala_funcionarios(self, df=None):
+    def agendar(self, gerenciador, imagem=False):
         """
-        Gera a escala recomendada de funcionários com base nos dados de movimento.
+        Agenda a atualização dos resultados de uma loja.
         
         Args:
-            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
-                                           carrega os dados do arquivo.
+            gerenciador (GerenciadorDados): Gerenciador dos dados da loja.
+            imagem (bool): Se True, também renderiza a imagem do gráfico.
+        """
+        with self._trava:
+            tarefa = self._tarefa(gerenciador)
+            tarefa["imagem"] = tarefa["imagem"] or imagem
+            if tarefa["estado"] == "agendada":
+                return
+            if tarefa["estado"] == "executando":
+                tarefa["repetir"] = True
+                return
+            tarefa["estado"] = "agendada"
+        self._executor.submit(self._executar, gerenciador)
+    
+    def _executar(self, gerenciador):
+        """
+        Executa a tarefa de uma loja, repetindo-a enquanto houver pedidos
+        feitos durante a execução.
         
-        Returns:
-            pandas.DataFrame: DataFrame com a escala de funcionários.
+        Args:
+            gerenciador (GerenciadorDados): Gerenciador dos dados da loja.
         """
-        try:
-            if df is None:
-                df = self.gerenciador.carregar_dados()
-            
-            if df.empty:
-                return pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_necessarios"])
-            
-            # Garantir que a coluna de data seja do tipo datetime
-            if 'data' in df.columns:
-                df['data'] = pd.to_datetime(df['data'], errors='coerce')
-                # Remover linhas com datas inválidas
-                df = df.dropna(subset=['data'])
-            
-            # Agrupar por dia da semana e turno, calcular média de pessoas
-            escala = df.groupby(["dia_da_semana", "turno"])["quantidade_pessoas"].mean().reset_index()
-            
-            # Calcular número de funcionários necessários
-            escala["funcionarios_necessarios"] = escala["quantidade_pessoas"].apply(self.calcular_funcionarios)
+        while True:
+            with self._trava:
+                tarefa = self._tarefa(gerenciador)
+                tarefa["estado"] = "executando"
+                tarefa["repetir"] = False
+                imagem = tarefa["imagem"]
             
-            # Ordenar dias da semana
-            escala['ordem'] = escala['dia_da_semana'].map({dia: i for i, dia in enumerate(DIAS_ORDENADOS)})
-            escala = escala.sort_values(['ordem', 'turno']).drop('ordem', axis=1)
-            
-            # Salvar no arquivo
+            inicio = time.perf_counter()
             try:
-                escala.to_csv(self.gerenciador.escala_file, index=False)
+                # Compactar o log de escrita fora do caminho das gravações
+                if gerenciador.precisa_compactar():
+                    gerenciador.compactar()
+                resultado = self.calcular(gerenciador, imagem)
+                # Deixar o cubo e o snapshot em dia para a próxima carga inicial
+                gerenciador.salvar_cubo()
+                gerenciador.atualizar_snapshot()
+                erro = None
             except Exception as e:
-                st.warning(f"Não foi possível salvar a escala: {str(e)}")
+                traceback.print_exc()
+                resultado, erro = None, str(e)
             
-            return escala
-        except Exception as e:
-            st.error(f"Erro ao gerar escala: {str(e)}")
-            traceback.print_exc()
-            return pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_necessarios"])
-    
+            with self._trava:
+                tarefa["duracao"] = time.perf_counter() - inicio
+                if tarefa["repetir"]:
+                    continue
+                if erro is None:
+                    tarefa["resultado"] = resultado
+                    tarefa["versao"] += 1
+                    tarefa["estado"] = "concluida"
+                else:
+                    tarefa["erro"] = erro
+                    tarefa["estado"] = "erro"
+                return
     
-    def gerar_relatorio_semanal(self):
+    @staticmethod
+    def calcular(gerenciador, imagem=False):
         """
-        Gera o relatório semanal com dados agregados e insights.
-
+        Gera a escala, o relatório semanal e o gráfico de uma loja.
+        
+        Args:
+            gerenciador (GerenciadorDados): Gerenciador dos dados da loja.
+            imagem (bool): Se True, também renderiza a imagem do gráfico.
+            
         Returns:
-            tuple: (DataFrame com resumo, turno mais movimentado, dia mais fraco)
+            dict: Com as chaves 'escala', 'relatorio' (resumo, turno mais
+                  movimentado e dia mais fraco), 'especificacao' e 'imagem',
+                  além da 'assinatura' do arquivo de dados e da data de
+                  'referencia' a que os resultados correspondem.
         """
-        try:
-            hoje = datetime.today()
-            inicio_semana = hoje - timedelta(days=hoje.weekday() + 7)  # Segunda anterior
-            fim_semana = inicio_semana + timedelta(days=6)             # Domingo anterior
-
-            df = self.gerenciador.carregar_dados()
-            if df.empty:
-                return (pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_recomendados"]), 
-                        None, None)
-
-            # Garantir tipo datetime
-            df['data'] = pd.to_datetime(df['data'], errors='coerce')
-            df = df.dropna(subset=['data'])
-
-            # Filtrar para a semana completa anterior (segunda a domingo)
-            df_semana = df[(df['data'] >= inicio_semana) & (df['data'] <= fim_semana)].copy()
-            if df_semana.empty:
-                return (pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_recomendados"]), 
-                        None, None)
-
-            # Agrupar por dia e turno
-            resumo = df_semana.groupby(['dia_da_semana', 'turno'])['quantidade_pessoas'].mean().reset_index()
-            resumo['funcionarios_recomendados'] = resumo['quantidade_pessoas'].apply(self.calcular_funcionarios)
-
-            # Ordenar dias da semana
-            resumo['ordem'] = resumo['dia_da_semana'].map({dia: i for i, dia in enumerate(DIAS_ORDENADOS)})
-            resumo = resumo.sort_values(['ordem', 'turno']).drop('ordem', axis=1)
-
-            # Determinar turno mais movimentado
-            turno_mais_movimentado = resumo.loc[resumo['quantidade_pessoas'].idxmax()] if not resumo.empty else None
-
-            # Calcular média por dia (incluindo zeros)
-            media_por_dia = resumo.groupby('dia_da_semana')['quantidade_pessoas'].mean().reindex(DIAS_ORDENADOS).fillna(0)
-            dia_mais_fraco = media_por_dia.idxmin()
-
-            # Salvar relatório
-            try:
-                resumo.to_csv(self.gerenciador.relatorio_file, index=False)
-            except Exception as e:
-                st.warning(f"Não foi possível salvar o relatório: {str(e)}")
-
-            return resumo, turno_mais_movimentado, dia_mais_fraco
-        except Exception as e:
-            st.error(f"Erro ao gerar relatório semanal: {str(e)}")
-            traceback.print_exc()
-            return (pd.DataFrame(columns=["dia_da_semana", "turno", "quantidade_pessoas", "funcionarios_recomendados"]), 
-                    None, None)
-
-
-class VisualizacaoDados:
-    """
-    Classe responsável pela geração de gráficos e visualizações.
-    
-    Attributes:
-        gerenciador (GerenciadorDados): Instância do gerenciador de dados.
-    """
+        analise = AnaliseDados(gerenciador)
+        visualizacao = VisualizacaoDados(gerenciador)
+        
+        # Ler o cubo sob a trava; a renderização não precisa dela
+        with gerenciador.trava:
+            # Obtidas antes da leitura: uma gravação durante o cálculo deixa
+            # o resultado desatualizado, e não o contrário
+            assinatura = CacheCarregamento.assinatura(gerenciador.data_file)
+            referencia = date.today()
+            escala = analise.gerar_escala_funcionarios()
+            relatorio = analise.gerar_relatorio_semanal()
+            medias = gerenciador.obter_cubo().medias()
+        
+        return {
+            "escala": escala,
+            "relatorio": relatorio,
+            "especificacao": visualizacao.gerar_especificacao(medias),
+            "imagem": visualizacao.gerar_imagem(medias) if imagem else None,
+            "assinatura": assinatura,
+            "referencia": referencia
+        }
     
-    def __init__(self, gerenciador):
+    @staticmethod
+    def atualizado(gerenciador, resultado):
         """
-        Inicializa o visualizador de dados.
+        Verifica se um resultado ainda corresponde ao arquivo de dados e à
+        data atual (o relatório semanal depende da semana corrente).
         
         Args:
-            gerenciador (GerenciadorDados): Instância do gerenciador de dados.
+            gerenciador (GerenciadorDados): Gerenciador dos dados da loja.
+            resultado (dict): Resultado gerado por calcular.
+            
+        Returns:
+            bool: True se o resultado está em dia.
         """
-        self.gerenciador = gerenciador
-        self.cores = ['#9b59b6', '#3498db', '#e74c3c']  # Roxo, Azul, Vermelho
+        return (resultado["assinatura"] == CacheCarregamento.assinatura(gerenciador.data_file)
+                and resultado["referencia"] == date.today())
     
-    def gerar_grafico(self, df=None):
+    def estado(self, gerenciador):
         """
-        Gera o gráfico de média de pessoas por dia e turno.
+        Obtém uma cópia do estado da tarefa de uma loja.
         
         Args:
-            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
-                                           carrega os dados do arquivo.
-        
+            gerenciador (GerenciadorDados): Gerenciador dos dados da loja.
+            
         Returns:
-            matplotlib.figure.Figure: Figura com o gráfico gerado.
+            dict: Estado da tarefa (ver _tarefa).
         """
-        try:
-            if df is None:
-                df = self.gerenciador.carregar_dados()
-            
-            if df.empty:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                ax.text(0.5, 0.5, "Sem dados para exibir", 
-                        horizontalalignment='center', verticalalignment='center',
-                        transform=ax.transAxes, fontsize=14)
-                return fig
-            
-            # Garantir que a coluna de data seja do tipo datetime
-            if 'data' in df.columns:
-                df['data'] = pd.to_datetime(df['data'], errors='coerce')
-                # Remover linhas com datas inválidas
-                df = df.dropna(subset=['data'])
-            
-            # Criar tabela pivô com médias por dia e turno
-            pivot = df.pivot_table(values='quantidade_pessoas', 
-                                  index='dia_da_semana', 
-                                  columns='turno', 
-                                  aggfunc='mean').fillna(0)
-            
-            # Garantir que todos os turnos estejam presentes
-            for turno in TURNOS:
-                if turno not in pivot.columns:
-                    pivot[turno] = 0
-            
-            # Selecionar apenas os turnos padrão e na ordem correta
-            pivot = pivot[TURNOS]
-            
-            # Ordenar dias da semana
-            pivot = pivot.reindex(DIAS_ORDENADOS)
-            
-            # Criar figura e eixos
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            # Plotar gráfico de barras
-            pivot.plot(kind='bar', ax=ax, color=self.cores)
-            
-            # Configurar título e rótulos
-            ax.set_title("Média de Pessoas por Dia e Turno da Semana", fontsize=14)
-            ax.set_xlabel("Dia da Semana", fontsize=12)
-            ax.set_ylabel("Quantidade Média de Pessoas", fontsize=12)
-            ax.legend(title="Turno")
-            plt.xticks(rotation=45)
-            
-            # Adicionar rótulos nas barras
-            for container in ax.containers:
-                ax.bar_label(container, fmt='%.0f', label_type='edge', fontsize=8)
-            
-            plt.tight_layout()
-            
-            # Salvar o gráfico como imagem
-            try:
-                plt.savefig("grafico_turnos.png")
-            except Exception as e:
-                st.warning(f"Não foi possível salvar o gráfico: {str(e)}")
-            
-            return fig
-        except Exception as e:
-            st.error(f"Erro ao gerar gráfico: {str(e)}")
-            traceback.print_exc()
+        with self._trava:
+            return dict(self._tarefa(gerenciador))
+    
+    def obter(self, gerenciador, imagem=False):
+        """
+        Obtém os resultados mais recentes de uma loja. Na primeira vez, ou
+        quando os dados foram alterados por outro processo ou o dia mudou, os
+        resultados são calculados imediatamente. Enquanto houver tarefa desta
+        loja em andamento, o resultado anterior é mantido até ela terminar.
+        
+        Args:
+            gerenciador (GerenciadorDados): Gerenciador dos dados da loja.
+            imagem (bool): Se True, os resultados devem incluir a imagem do gráfico.
             
-            # Retornar um gráfico de erro
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.text(0.5, 0.5, f"Erro ao gerar gráfico: {str(e)}", 
-                    horizontalalignment='center', verticalalignment='center',
-                    transform=ax.transAxes, fontsize=12, color='red')
-            return fig
+        Returns:
+            tuple: (resultados, versão) como em calcular.
+        """
+        tarefa = self.estado(gerenciador)
+        resultado = tarefa["resultado"]
+        if (resultado is not None and (resultado["imagem"] is not None or not imagem)
+                and (tarefa["estado"] in ("agendada", "executando") or self.atualizado(gerenciador, resultado))):
+            INSTRUMENTACAO.contar("resultados_segundo_plano_acertos")
+            return resultado, tarefa["versao"]
+        
+        INSTRUMENTACAO.contar("resultados_segundo_plano_falhas")
+        resultado = self.calcular(gerenciador, imagem)
+        with self._trava:
+            tarefa = self._tarefa(gerenciador)
+            tarefa["imagem"] = tarefa["imagem"] or imagem
+            if tarefa["estado"] in ("ociosa", "concluida", "erro"):
+                tarefa["resultado"] = resultado
+                tarefa["versao"] += 1
+                tarefa["estado"] = "concluida"
+            return resultado, tarefa["versao"]
+
+
+@st.cache_resource(show_spinner=False)
+def obter_processador_relatorios():
+    """
+    Obtém o processador de relatórios em segundo plano compartilhado pelo
+    processo, preservado entre as reexecuções do Streamlit.
+    
+    Returns:
+        ProcessadorRelatorios: Instância única do processador.
+    """
+    return ProcessadorRelatorios()
 
 
 class InterfaceStreamlit:
@@ -471,16 +4123,20 @@ class InterfaceStreamlit:
     Classe responsável pela interface do usuário usando Streamlit.
     
     Attributes:
+        lojas (list): Lojas com partição de dados (vazia para a loja única).
         gerenciador (GerenciadorDados): Instância do gerenciador de dados.
         analise (AnaliseDados): Instância do analisador de dados.
         visualizacao (VisualizacaoDados): Instância do visualizador de dados.
+        modo_grafico (str): Renderização dos gráficos ('Interativo' no
+                            navegador ou 'Imagem' no servidor).
+        processador (ProcessadorRelatorios): Processador de relatórios em segundo plano.
+        depuracao (bool): Se True, exibe o painel com os tempos da execução.
     """
     
     def __init__(self):
         """Inicializa a interface do usuário."""
-        self.gerenciador = GerenciadorDados()
-        self.analise = AnaliseDados(self.gerenciador)
-        self.visualizacao = VisualizacaoDados(self.gerenciador)
+        # Medir os tempos de cada etapa desta execução
+        INSTRUMENTACAO.iniciar_execucao()
         
         # Configurar a página
         st.set_page_config(
@@ -488,7 +4144,37 @@ class InterfaceStreamlit:
             layout="centered",
             initial_sidebar_state="collapsed"
         )
+        
+        # Seleção da loja quando houver dados particionados por loja
+        self.lojas = listar_lojas()
+        loja = st.sidebar.selectbox("Loja", self.lojas) if self.lojas else None
+        self.modo_grafico = st.sidebar.radio("Gráfico", MODOS_GRAFICO,
+                                             help="Interativo: desenhado no navegador. Imagem: renderizado no servidor.")
+        self.depuracao = st.sidebar.checkbox("Depuração", help="Exibe os tempos e contadores de cada etapa da execução.")
+        
+        # O gerenciador é compartilhado entre as reexecuções do Streamlit
+        self.gerenciador = obter_gerenciador(loja)
+        self.processador = obter_processador_relatorios()
+        
+        # Analisador e visualizador são criados apenas quando usados
+        self._analise = None
+        self._visualizacao = None
+    
+    @property
+    def analise(self):
+        """AnaliseDados: Analisador de dados, criado no primeiro uso."""
+        if self._analise is None:
+            self._analise = AnaliseDados(self.gerenciador)
+        return self._analise
     
+    @property
+    def visualizacao(self):
+        """VisualizacaoDados: Visualizador de dados, criado no primeiro uso."""
+        if self._visualizacao is None:
+            self._visualizacao = VisualizacaoDados(self.gerenciador)
+        return self._visualizacao
+    
+    @instrumentar
     def exibir_cabecalho(self):
         """Exibe o cabeçalho da aplicação com logo e título."""
         # Layout com colunas para logo e título
@@ -498,7 +4184,7 @@ class InterfaceStreamlit:
         try:
             with col1:
                 if os.path.exists(LOGO_PATH):
-                    logo = Image.open(LOGO_PATH)
+                    logo = carregar_logo(LOGO_PATH, assinatura=CacheCarregamento.assinatura(LOGO_PATH))
                     st.image(logo, width=150)
                 else:
                     st.warning("Logo não encontrada.")
@@ -519,6 +4205,7 @@ class InterfaceStreamlit:
             Com isso, a empresa pode tomar decisões baseadas em dados, otimizar a alocação de funcionários e melhorar a experiência dos clientes.
             """)
     
+    @instrumentar
     def exibir_formulario_registro(self):
         """Exibe o formulário para registro de movimento diário."""
         st.subheader("\U0001F4C5 Registrar Movimento Diário")
@@ -557,33 +4244,58 @@ class InterfaceStreamlit:
                 
                 if sucesso:
                     st.success(f"\u2705 {mensagem}")
-                    escala = self.analise.gerar_escala_funcionarios(df)
-                    st.dataframe(escala, use_container_width=True)
+                    # Escala, relatório e gráfico são atualizados em segundo plano
+                    self.processador.agendar(self.gerenciador, imagem=self.modo_grafico == "Imagem")
                 else:
                     st.error(f"\u274C {mensagem}")
     
+    def exibir_grafico(self, df=None, resultado=None):
+        """
+        Exibe o gráfico de média por dia e turno no modo escolhido.
+        
+        Args:
+            df (pandas.DataFrame, optional): DataFrame com os dados. Se None,
+                                           usa as médias do cubo de agregados.
+            resultado (dict, optional): Resultados do processamento em segundo
+                                        plano com o gráfico já gerado.
+        """
+        if self.modo_grafico == "Interativo":
+            if resultado is not None:
+                especificacao = resultado["especificacao"]
+            else:
+                especificacao = self.visualizacao.gerar_especificacao(df)
+            if especificacao is not None:
+                st.vega_lite_chart(spec=especificacao, use_container_width=True)
+        else:
+            if resultado is not None and resultado["imagem"] is not None:
+                imagem = resultado["imagem"]
+            else:
+                imagem = self.visualizacao.gerar_imagem(df)
+            if imagem is not None:
+                st.image(imagem)
+    
+    @instrumentar
     def exibir_visualizacoes(self):
         """Exibe as visualizações de dados se houver dados disponíveis."""
-        df = self.gerenciador.carregar_dados()
+        # O cubo de agregados evita carregar todo o histórico
+        cubo = self.gerenciador.obter_cubo()
         
-        if not df.empty:
+        if cubo.contagem.any():
+            # Resultados mais recentes do processamento em segundo plano
+            resultado, versao = self.processador.obter(self.gerenciador, imagem=self.modo_grafico == "Imagem")
+            st.session_state.setdefault("versao_relatorios", {})[self.gerenciador.data_file] = versao
+            
             # Exibir gráfico
             st.subheader("\U0001F4CA Gráfico de Média por Turno")
-            fig = self.visualizacao.gerar_grafico(df)
-            st.pyplot(fig)
+            self.exibir_grafico(resultado=resultado)
             
             # Exibir escala de funcionários
             st.subheader("\U0001F4CB Escala Recomendada de Funcionários")
-            try:
-                escala = pd.read_csv(self.gerenciador.escala_file)
-                st.dataframe(escala, use_container_width=True)
-            except Exception:
-                escala = self.analise.gerar_escala_funcionarios(df)
-                st.dataframe(escala, use_container_width=True)
+            st.dataframe(resultado["escala"], use_container_width=True)
             
             # Exibir relatório semanal
             st.subheader("\U0001F4D1 Relatório Semanal de Movimento")
-            resumo, turno_top, dia_fraco = self.analise.gerar_relatorio_semanal()
+            resumo, turno_top, dia_fraco = resultado["relatorio"]
             
             if not resumo.empty:
                 st.dataframe(resumo, use_container_width=True)
@@ -598,24 +4310,79 @@ class InterfaceStreamlit:
         else:
             st.info("Nenhum dado registrado ainda.")
     
+    @instrumentar
+    def exibir_relatorios_periodo(self):
+        """Exibe os relatórios mensais, trimestrais e de janelas móveis."""
+        if not self.gerenciador.obter_cubo().contagem.any():
+            return
+        
+        with st.expander("\U0001F4C6 Relatórios por Período"):
+            tipo = st.radio("Período", ["Mensal", "Trimestral", "Janela móvel"], horizontal=True)
+            hoje = date.today()
+            
+            if tipo == "Janela móvel":
+                semanas = st.number_input("Semanas por janela", min_value=1, max_value=104, value=4, step=1)
+                relatorio = self.analise.gerar_relatorio_movel(int(semanas))
+                if not relatorio.empty:
+                    # Exibir a janela mais recente; o histórico fica disponível para download
+                    st.dataframe(relatorio[relatorio['semana_final'] == relatorio['semana_final'].max()],
+                                 use_container_width=True)
+                    st.download_button("Baixar todas as janelas", relatorio.to_csv(index=False).encode('utf-8'),
+                                       file_name=f"relatorio_movel_{int(semanas)}_semanas.csv", mime="text/csv")
+            else:
+                col1, col2 = st.columns(2)
+                with col1:
+                    ano = st.number_input("Ano", min_value=1970, max_value=hoje.year, value=hoje.year, step=1)
+                with col2:
+                    if tipo == "Mensal":
+                        periodo = st.selectbox("Mês", list(range(1, 13)), index=hoje.month - 1)
+                    else:
+                        periodo = st.selectbox("Trimestre", [1, 2, 3, 4], index=(hoje.month - 1) // 3)
+                if tipo == "Mensal":
+                    relatorio = self.analise.gerar_relatorio_mensal(int(ano), periodo)
+                else:
+                    relatorio = self.analise.gerar_relatorio_trimestral(int(ano), periodo)
+            
+            if relatorio.empty:
+                st.info("Não há registros no período selecionado.")
+            elif tipo != "Janela móvel":
+                st.dataframe(relatorio, use_container_width=True)
+    
+    @instrumentar
+    def exibir_status_processamento(self):
+        """
+        Exibe o andamento do processamento em segundo plano e recarrega a
+        página quando houver resultados mais novos que os exibidos.
+        """
+        def acompanhar():
+            tarefa = self.processador.estado(self.gerenciador)
+            if tarefa["estado"] in ("agendada", "executando"):
+                st.caption("\u23F3 Atualizando escala, relatório e gráfico em segundo plano...")
+            elif tarefa["estado"] == "erro":
+                st.warning(f"Não foi possível atualizar os relatórios: {tarefa['erro']}")
+            else:
+                exibida = st.session_state.get("versao_relatorios", {}).get(self.gerenciador.data_file)
+                if exibida is not None and exibida != tarefa["versao"]:
+                    st.rerun()
+        
+        # Consultar o estado periodicamente apenas enquanto houver tarefa em andamento
+        if self.processador.estado(self.gerenciador)["estado"] in ("agendada", "executando"):
+            st.fragment(acompanhar, run_every=1)()
+        else:
+            acompanhar()
+    
+    @instrumentar
     def exibir_opcoes_exportacao(self):
         """Exibe opções para exportação de dados."""
-        df = self.gerenciador.carregar_dados()
-        
-        if not df.empty:
+        if self.gerenciador.obter_cubo().contagem.any():
             st.subheader("\U0001F4BE Exportar Dados")
             
             col1, col2 = st.columns(2)
             
             with col1:
                 if st.button("Exportar CSV"):
-                    # Garantir que a coluna de data esteja no formato ISO antes de exportar
-                    if 'data' in df.columns:
-                        df['data'] = pd.to_datetime(df['data'], errors='coerce')
-                        df = df.dropna(subset=['data'])
-                        df['data'] = df['data'].dt.strftime("%Y-%m-%d")
-                    
-                    csv = df.to_csv(index=False).encode('utf-8')
+                    # Exportar com a data no formato ISO
+                    csv = self.gerenciador.exportar_csv()
                     st.download_button(
                         label="Baixar CSV",
                         data=csv,
@@ -624,12 +4391,78 @@ class InterfaceStreamlit:
                     )
             
              
+    @instrumentar
+    def exibir_visao_rede(self):
+        """Exibe a visão consolidada da rede quando houver mais de uma loja."""
+        if len(self.lojas) < 2:
+            return
+        
+        with st.expander("\U0001F3EA Visão Consolidada da Rede"):
+            if st.button("Gerar análise da rede"):
+                analises = AnaliseRede(self.lojas).gerar_analises()
+                st.markdown("**Escala recomendada da rede**")
+                st.dataframe(analises["escala_rede"], use_container_width=True)
+                st.markdown("**Relatório semanal da rede**")
+                st.dataframe(analises["relatorio_rede"], use_container_width=True)
+                st.markdown("**Escalas por loja**")
+                st.dataframe(analises["escalas"], use_container_width=True)
+                if self.modo_grafico == "Interativo" and not analises["escalas"].empty:
+                    self.exibir_grafico(analises["escalas"])
+    
+    def exibir_painel_depuracao(self, execucao):
+        """
+        Exibe os tempos de cada etapa da execução atual, os contadores de
+        arquivos e caches e os totais acumulados pelo processo.
+        
+        Args:
+            execucao (dict): Execução finalizada pela instrumentação.
+        """
+        with st.expander("\U0001F6E0 Depuração", expanded=True):
+            st.metric("Tempo desta execução", f"{execucao['duracao_ms']:.1f} ms")
+            
+            # Trechos em ordem de início, recuados conforme o aninhamento
+            trechos = pd.DataFrame(execucao["trechos"], columns=["trecho", "nivel", "inicio_ms", "duracao_ms"])
+            trechos["trecho"] = ["\u2003" * nivel + trecho for trecho, nivel in zip(trechos["trecho"], trechos["nivel"])]
+            st.dataframe(trechos.drop(columns="nivel"), use_container_width=True, hide_index=True)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Contadores desta execução**")
+                st.json(execucao["contadores"])
+            with col2:
+                st.markdown("**Contadores acumulados**")
+                st.json(INSTRUMENTACAO.contadores())
+            
+            st.markdown("**Totais acumulados por trecho**")
+            st.dataframe(INSTRUMENTACAO.resumo(), use_container_width=True, hide_index=True)
+            
+            # Opção desta sessão; o registro de todas as sessões é ativado por ACAI_LOG_TEMPOS
+            st.checkbox(f"Registrar as execuções desta sessão em {TEMPOS_PATH}", key="registrar_tempos")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                historico = "".join(json.dumps(registro, ensure_ascii=False) + "\n"
+                                    for registro in list(INSTRUMENTACAO.historico))
+                st.download_button("Baixar histórico de execuções", historico.encode('utf-8'),
+                                   file_name="tempos_execucao.jsonl", mime="application/jsonl")
+            with col2:
+                if st.button("Zerar medições"):
+                    INSTRUMENTACAO.limpar()
+    
     def executar(self):
         """Executa a aplicação Streamlit."""
         self.exibir_cabecalho()
         self.exibir_formulario_registro()
         self.exibir_visualizacoes()
+        self.exibir_relatorios_periodo()
+        self.exibir_status_processamento()
+        self.exibir_visao_rede()
         self.exibir_opcoes_exportacao()
+        
+        log_file = TEMPOS_PATH if st.session_state.get("registrar_tempos") else None
+        execucao = INSTRUMENTACAO.finalizar_execucao(self.gerenciador.data_file, log_file)
+        if self.depuracao and execucao is not None:
+            self.exibir_painel_depuracao(execucao)
 
 
 # Ponto de entrada da aplicação
@@ -0,0 +1,56 @@
+"""
+Açaí do Senna - Importação de Histórico
+
+Importa em lote históricos de movimento (exportações de PDV, registros de
+contadores de porta etc.) em CSV ou JSON para os dados do Otimizador de Turnos,
+aplicando as mesmas validações do formulário de registro.
+
+Uso:
+
+    python importar_movimento.py historico.csv
+    python importar_movimento.py historico.jsonl --loja centro --rejeitados rejeitados.csv
+
+"""
+
+import argparse
+import sys
+import time
+
+from controle_acesso_streamlit import GerenciadorDados, ImportadorMovimento
+
+
+def main():
+    """Executa a importação a partir dos argumentos da linha de comando."""
+    parser = argparse.ArgumentParser(description="Importa históricos de movimento em lote.")
+    parser.add_argument("arquivo", help="Arquivo CSV ou JSON com as colunas data, turno e quantidade_pessoas.")
+    parser.add_argument("--dados", default="movimento_loja.csv",
+                        help="Arquivo de movimento de destino (padrão: movimento_loja.csv).")
+    parser.add_argument("--loja", help="Importar para a partição de dados desta loja.")
+    parser.add_argument("--bloco", type=int, default=200_000,
+                        help="Quantidade de linhas lidas por bloco (padrão: 200000).")
+    parser.add_argument("--rejeitados", help="Gravar os registros rejeitados neste arquivo CSV.")
+    args = parser.parse_args()
+    
+    if args.loja:
+        gerenciador = GerenciadorDados.para_loja(args.loja)
+    else:
+        gerenciador = GerenciadorDados(args.dados)
+    
+    inicio = time.perf_counter()
+    try:
+        resultado = ImportadorMovimento(gerenciador, args.bloco).importar(args.arquivo, args.rejeitados)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao importar: {e}", file=sys.stderr)
+        return 1
+    duracao = time.perf_counter() - inicio
+    
+    print(f"Registros lidos: {resultado['lidos']}")
+    print(f"Registros importados: {resultado['importados']}")
+    for motivo, quantidade in resultado['rejeitados'].items():
+        print(f"Rejeitados ({motivo}): {quantidade}")
+    print(f"Tempo: {duracao:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
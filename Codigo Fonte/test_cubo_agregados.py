@@ -0,0 +1,141 @@
+"""
+Testes do cubo de agregados e dos relatórios por período calculados com ele,
+comparando-os com o mesmo cálculo feito com pandas sobre os registros.
+
+Execução:
+    python -m pytest -q
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from controle_acesso_streamlit import (DIAS_ORDENADOS, TURNOS, AnaliseDados, CuboAgregados, GerenciadorDados,
+                                       RegraFuncionarios, aplicar_esquema)
+
+
+@pytest.fixture(scope="module")
+def movimento():
+    """Quatro meses de movimento com dias e turnos faltando, no esquema tipado."""
+    gerador = np.random.default_rng(7)
+    datas = pd.date_range("2024-12-26", "2025-04-20", freq="D")
+    df = pd.DataFrame([(dia, turno) for dia in datas for turno in TURNOS], columns=["data", "turno"])
+    df = df[gerador.random(len(df)) < 0.8]
+    return aplicar_esquema(df.assign(dia_da_semana=None, quantidade_pessoas=gerador.integers(0, 120, len(df))))
+
+
+@pytest.fixture
+def analise(movimento, tmp_path, monkeypatch):
+    """Análise sobre um arquivo de dados temporário com o movimento gravado."""
+    monkeypatch.chdir(tmp_path)
+    gerenciador = GerenciadorDados(data_file=str(tmp_path / "movimento_loja.csv"))
+    assert gerenciador.salvar_lote(movimento)
+    return AnaliseDados(gerenciador, regra=RegraFuncionarios())
+
+
+def agregados(df):
+    """Soma, contagem, mínimo e máximo por (dia da semana, turno), calculados com pandas."""
+    grupos = df.groupby(['dia_da_semana', 'turno'], observed=True)['quantidade_pessoas']
+    return grupos.agg(['sum', 'count', 'min', 'max'])
+
+
+def relatorio_pandas(df):
+    """Média, percentis (interpolação linear) e registros por (dia da semana, turno), calculados com pandas."""
+    grupos = df.groupby(['dia_da_semana', 'turno'], observed=True)['quantidade_pessoas']
+    return grupos.agg(quantidade_pessoas='mean', p50=lambda valores: valores.quantile(0.5),
+                      p90=lambda valores: valores.quantile(0.9), registros='count').reset_index()
+
+
+def matrizes(cubo_totais):
+    """Converte vetores [dia, turno] do cubo para o formato de agregados."""
+    soma, contagem, minimo, maximo = cubo_totais
+    dias, turnos = np.nonzero(contagem)
+    indice = pd.MultiIndex.from_arrays([pd.Categorical.from_codes(dias, categories=DIAS_ORDENADOS),
+                                        pd.Categorical.from_codes(turnos, categories=TURNOS)],
+                                       names=['dia_da_semana', 'turno'])
+    return pd.DataFrame({"sum": soma[dias, turnos], "count": contagem[dias, turnos],
+                         "min": minimo[dias, turnos], "max": maximo[dias, turnos]}, index=indice)
+
+
+def test_totais_do_historico_e_de_cada_semana(movimento):
+    cubo = CuboAgregados.de_dataframe(movimento)
+
+    pd.testing.assert_frame_equal(matrizes(cubo.totais()), agregados(movimento), check_dtype=False)
+    for semana in pd.date_range("2024-12-23", "2025-04-14", freq="W-MON"):
+        da_semana = movimento[(movimento['data'] >= semana) & (movimento['data'] < semana + pd.Timedelta(days=7))]
+        pd.testing.assert_frame_equal(matrizes(cubo.totais(semana=(semana + pd.Timedelta(days=3)).date())),
+                                      agregados(da_semana), check_dtype=False)
+
+    # Semana sem registros
+    assert not cubo.totais(semana=date(2030, 1, 1))[1].any()
+
+
+def test_cubo_incremental_igual_ao_cubo_do_historico(movimento):
+    # Blocos fora de ordem ampliam o cubo para antes e depois das semanas já conhecidas
+    cubo = CuboAgregados()
+    embaralhado = movimento.sample(frac=1, random_state=3)
+    for inicio in range(0, len(embaralhado), 100):
+        cubo.adicionar_lote(embaralhado.iloc[inicio:inicio + 100])
+    completo = CuboAgregados.de_dataframe(movimento)
+
+    assert cubo.semana_inicial == completo.semana_inicial
+    for parte, esperado in zip(cubo.totais(), completo.totais()):
+        np.testing.assert_array_equal(parte, esperado)
+    pd.testing.assert_frame_equal(cubo.medias(), completo.medias())
+
+
+@pytest.mark.parametrize("inicio, fim", [
+    (None, None),
+    (date(2025, 1, 15), date(2025, 3, 6)),     # Começa e termina no meio da semana
+    (date(2025, 2, 11), date(2025, 2, 13)),    # Dentro de uma única semana
+    (date(2025, 2, 16), date(2025, 2, 17)),    # Domingo e segunda-feira seguinte
+    (date(2024, 12, 1), date(2025, 1, 2)),     # Começa antes dos registros
+    (date(2025, 4, 10), None),                 # Termina depois dos registros
+])
+def test_relatorio_periodo_igual_ao_pandas(analise, movimento, inicio, fim):
+    no_periodo = movimento[(movimento['data'] >= pd.Timestamp(inicio or date.min))
+                           & (movimento['data'] <= pd.Timestamp(fim or date(2100, 1, 1)))]
+
+    relatorio = analise.gerar_relatorio_periodo(inicio, fim)
+
+    pd.testing.assert_frame_equal(relatorio.drop(columns="funcionarios_recomendados"), relatorio_pandas(no_periodo),
+                                  check_dtype=False)
+    assert relatorio["funcionarios_recomendados"].tolist() == \
+        analise.regra.aplicar(relatorio["quantidade_pessoas"]).tolist()
+
+
+def test_relatorio_de_periodo_sem_registros_vazio(analise):
+    assert analise.gerar_relatorio_periodo(date(2026, 1, 1), date(2026, 2, 1)).empty
+    assert analise.gerar_relatorio_periodo(date(2025, 3, 10), date(2025, 3, 1)).empty
+
+
+def test_relatorio_mensal_igual_ao_pandas(analise, movimento):
+    fevereiro = movimento[movimento['data'].dt.to_period("M") == pd.Period("2025-02")]
+
+    relatorio = analise.gerar_relatorio_mensal(2025, 2)
+
+    pd.testing.assert_frame_equal(relatorio.drop(columns="funcionarios_recomendados"), relatorio_pandas(fevereiro),
+                                  check_dtype=False)
+
+
+@pytest.mark.parametrize("semanas", [1, 4, 6])
+def test_relatorio_movel_igual_ao_pandas_em_cada_janela(analise, movimento, semanas):
+    relatorio = analise.gerar_relatorio_movel(semanas)
+
+    # Uma janela para cada semana final, da N-ésima semana dos registros até a última
+    primeira = movimento['data'].min().to_period("W-SUN").start_time
+    ultima = movimento['data'].max().to_period("W-SUN").start_time
+    esperadas = pd.date_range(primeira + pd.Timedelta(weeks=semanas - 1), ultima, freq="W-MON")
+    assert relatorio["semana_final"].unique().tolist() == esperadas.tolist()
+
+    for semana_final, janela in relatorio.groupby("semana_final"):
+        na_janela = movimento[(movimento['data'] >= semana_final - pd.Timedelta(weeks=semanas - 1))
+                              & (movimento['data'] < semana_final + pd.Timedelta(weeks=1))]
+        pd.testing.assert_frame_equal(janela.drop(columns=["semana_final", "funcionarios_recomendados"])
+                                      .reset_index(drop=True), relatorio_pandas(na_janela), check_dtype=False)
+
+
+def test_janelas_maiores_que_o_historico_vazias(analise):
+    assert analise.gerar_relatorio_movel(100).empty
@@ -0,0 +1,480 @@
+"""
+Testes de regressão do GerenciadorDados.
+
+Execução:
+    python -m pytest -q
+"""
+
+import threading
+import time
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import controle_acesso_streamlit
+from controle_acesso_streamlit import (CacheCarregamento, GerenciadorDados, GerenciadorDadosSQLite, ImportadorMovimento,
+                                       IndiceChaves, Instrumentacao, ProcessadorRelatorios, RegraFuncionarios,
+                                       VisualizacaoDados, aplicar_esquema, gravar_atomico)
+
+
+@pytest.fixture
+def gerenciador(tmp_path, monkeypatch):
+    """Gerenciador com um arquivo CSV de movimento em um diretório temporário."""
+    monkeypatch.chdir(tmp_path)
+    gerenciador = GerenciadorDados(data_file=str(tmp_path / "movimento_loja.csv"))
+    _, sucesso, _ = gerenciador.salvar_dados("2025-05-31", "Manhã", 10)
+    assert sucesso
+    return gerenciador
+
+
+def anexar_bruto(gerenciador, conteudo):
+    """Anexa bytes ao arquivo de dados como outro processo faria, sem a trava."""
+    with open(gerenciador.data_file, "ab") as arquivo:
+        arquivo.write(conteudo)
+
+
+def registros(gerenciador, data, turno):
+    """Quantidade de linhas do arquivo para a chave (data, turno)."""
+    df = aplicar_esquema(pd.read_csv(gerenciador.data_file))
+    return int(((df['data'] == pd.Timestamp(data)) & (df['turno'] == turno)).sum())
+
+
+def test_linha_parcial_na_leitura_incremental_nao_perde_a_chave(gerenciador):
+    # Índice construído; outro processo começa a anexar uma linha
+    assert not gerenciador.verificar_duplicidade("2025-06-01", "Tarde")
+    anexar_bruto(gerenciador, "2025-06-01,domingo,Ta".encode())
+    assert not gerenciador.verificar_duplicidade("2025-06-01", "Tarde")
+
+    # A linha é concluída: a chave precisa entrar no índice deste processo
+    anexar_bruto(gerenciador, "rde,40\n".encode())
+    _, sucesso, _ = gerenciador.salvar_dados("2025-06-01", "Tarde", 99)
+
+    assert not sucesso
+    assert registros(gerenciador, "2025-06-01", "Tarde") == 1
+
+
+def test_linha_parcial_na_construcao_do_indice_nao_perde_a_chave(gerenciador):
+    # Outro processo está no meio de uma gravação quando o índice é construído
+    outro = GerenciadorDados(data_file=gerenciador.data_file)
+    anexar_bruto(gerenciador, "2025-06-01,domingo,Ta".encode())
+    assert not outro.verificar_duplicidade("2025-06-01", "Tarde")
+
+    anexar_bruto(gerenciador, "rde,40\n".encode())
+    _, sucesso, _ = outro.salvar_dados("2025-06-01", "Tarde", 99)
+
+    assert not sucesso
+    assert registros(gerenciador, "2025-06-01", "Tarde") == 1
+
+
+def test_quantidade_negativa_no_arquivo_nao_bloqueia_o_gerenciador(gerenciador):
+    # Linha antiga com quantidade negativa, gravada por fora da aplicação
+    anexar_bruto(gerenciador, "2025-05-30,sexta-feira,Tarde,-3\n".encode())
+    outro = GerenciadorDados(data_file=gerenciador.data_file)
+
+    _, sucesso, mensagem = outro.salvar_dados("2025-06-02", "Noite", 20)
+    assert sucesso, mensagem
+    assert outro.verificar_duplicidade("2025-05-31", "Manhã")
+    assert len(outro.consultar()) == 2
+    assert outro.reconstruir_cubo().contagem.sum() == 2
+
+
+def test_salvar_dados_rejeita_quantidade_negativa(gerenciador):
+    _, sucesso, mensagem = gerenciador.salvar_dados("2025-06-03", "Tarde", -5)
+
+    assert not sucesso
+    assert mensagem == "Quantidade de pessoas inválida."
+    assert registros(gerenciador, "2025-06-03", "Tarde") == 0
+
+
+def test_salvar_lote_grava_apenas_registros_validos_no_esquema(gerenciador):
+    # Lote sem 'dia_da_semana' e com uma data futura
+    lote = pd.DataFrame({
+        "data": ["2025-06-04", "2999-01-01"],
+        "turno": ["Tarde", "Tarde"],
+        "quantidade_pessoas": [30, 40],
+    })
+    assert not gerenciador.salvar_lote(lote)
+
+    assert gerenciador.salvar_lote(lote.iloc[:1])
+    _, sucesso, mensagem = gerenciador.salvar_dados("2025-06-05", "Noite", 15)
+    assert sucesso, mensagem
+
+    df = pd.read_csv(gerenciador.data_file)
+    assert list(df.columns) == ["data", "dia_da_semana", "turno", "quantidade_pessoas"]
+    assert df['dia_da_semana'].tolist() == ["sábado", "quarta-feira", "quinta-feira"]
+
+
+def test_importador_rejeita_duplicados_do_arquivo_e_dos_dados(gerenciador, tmp_path):
+    historico = tmp_path / "historico.csv"
+    historico.write_text(
+        "data,turno,quantidade_pessoas\n"
+        "2025-06-01,Manhã,10\n"
+        "2025-06-01,Tarde,20\n"
+        "2025-06-01,Manhã,11\n"      # Duplicado no próprio arquivo, em outro bloco
+        "2025-05-31,Manhã,12\n"      # Já existe nos dados
+        "2999-01-01,Noite,5\n"
+        "01/13/2025x,Noite,5\n"
+        "2025-06-02,Madrugada,5\n"
+        "2025-06-02,Noite,-1\n"
+        "2025-06-02,Noite,30\n",
+        encoding="utf-8")
+    rejeitados_file = tmp_path / "rejeitados.csv"
+
+    resultado = ImportadorMovimento(gerenciador, tamanho_bloco=2).importar(str(historico), str(rejeitados_file))
+
+    assert resultado["lidos"] == 9
+    assert resultado["importados"] == 3
+    assert resultado["rejeitados"] == {
+        "Já existe um registro para esta data e turno.": 2,
+        "Não é possível registrar datas futuras.": 1,
+        "Formato de data inválido.": 1,
+        "Turno inválido.": 1,
+        "Quantidade de pessoas inválida.": 1,
+    }
+    rejeitados = pd.read_csv(rejeitados_file)
+    assert rejeitados['quantidade_pessoas'].tolist() == [11, 12, 5, 5, 5, -1]
+
+    # Apenas a primeira ocorrência de cada chave foi gravada
+    df = aplicar_esquema(pd.read_csv(gerenciador.data_file))
+    assert df['quantidade_pessoas'].tolist() == [10, 10, 20, 30]
+    assert gerenciador.obter_cubo().contagem.sum() == 4
+
+
+def test_importador_nao_grava_nada_se_outro_processo_grava_uma_das_chaves(gerenciador, tmp_path, monkeypatch):
+    historico = tmp_path / "historico.csv"
+    historico.write_text("data,turno,quantidade_pessoas\n2025-06-01,Manhã,10\n2025-06-02,Noite,30\n",
+                         encoding="utf-8")
+    importador = ImportadorMovimento(gerenciador)
+    outro = GerenciadorDados(data_file=gerenciador.data_file)
+
+    # Outro processo grava uma das chaves entre a validação e a gravação do lote
+    ler_blocos = importador.ler_blocos
+    def ler_blocos_com_gravacao_concorrente(caminho):
+        yield from ler_blocos(caminho)
+        _, sucesso, _ = outro.salvar_dados("2025-06-02", "Noite", 7)
+        assert sucesso
+    monkeypatch.setattr(importador, "ler_blocos", ler_blocos_com_gravacao_concorrente)
+
+    with pytest.raises(ValueError):
+        importador.importar(str(historico))
+
+    df = aplicar_esquema(pd.read_csv(gerenciador.data_file))
+    assert df['quantidade_pessoas'].tolist() == [10, 7]
+    assert not gerenciador.verificar_duplicidade("2025-06-01", "Manhã")
+    assert gerenciador.obter_cubo().contagem.sum() == 2
+
+
+def test_compactacao_interrompida_nao_duplica_o_cubo(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.chdir(tmp_path)
+    gerenciador = GerenciadorDados(data_file=str(tmp_path / "movimento_loja.parquet"))
+    for data, quantidade in [("2025-05-31", 10), ("2025-06-01", 20), ("2025-06-02", 30)]:
+        _, sucesso, mensagem = gerenciador.salvar_dados(data, "Manhã", quantidade)
+        assert sucesso, mensagem
+
+    # Compactação interrompida: o arquivo colunar já contém o log, que não foi removido
+    armazenamento = gerenciador.armazenamento
+    df = aplicar_esquema(armazenamento.ler())
+    gravar_atomico(armazenamento.caminho, lambda temporario: armazenamento._gravar_colunar(df, temporario))
+    assert armazenamento.tamanho_log() > 0
+
+    cubo = gerenciador.agregar_em_blocos(tamanho_bloco=1)
+    assert cubo.contagem.sum() == 3
+    assert cubo.soma.sum() == 60
+
+
+def test_grafico_de_cada_loja_fica_na_particao_da_loja(tmp_path):
+    centro = GerenciadorDados.para_loja("centro", str(tmp_path))
+    praia = GerenciadorDados.para_loja("praia", str(tmp_path))
+
+    assert VisualizacaoDados(centro).grafico_file == str(tmp_path / "centro" / "grafico_turnos.png")
+    assert VisualizacaoDados(praia).grafico_file == str(tmp_path / "praia" / "grafico_turnos.png")
+
+
+def media_escala(resultado, dia, turno):
+    """Média de pessoas da escala de um resultado do processador."""
+    escala = resultado["escala"]
+    return escala.loc[(escala['dia_da_semana'] == dia) & (escala['turno'] == turno), 'quantidade_pessoas'].item()
+
+
+def test_processador_recalcula_quando_outro_processo_grava(gerenciador):
+    processador = ProcessadorRelatorios()
+    resultado, versao = processador.obter(gerenciador)
+    assert media_escala(resultado, "sábado", "Manhã") == 10
+
+    # Outro processo (outro gerenciador do mesmo arquivo) grava um registro
+    outro = GerenciadorDados(data_file=gerenciador.data_file)
+    _, sucesso, mensagem = outro.salvar_dados("2025-06-07", "Manhã", 90)
+    assert sucesso, mensagem
+
+    resultado, nova_versao = processador.obter(gerenciador)
+    assert nova_versao > versao
+    assert media_escala(resultado, "sábado", "Manhã") == 50
+    assert processador.obter(gerenciador)[1] == nova_versao
+
+
+def test_processador_recalcula_quando_o_dia_muda(gerenciador, monkeypatch):
+    processador = ProcessadorRelatorios()
+    _, versao = processador.obter(gerenciador)
+
+    class Amanha(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(controle_acesso_streamlit, "date", Amanha)
+    resultado, nova_versao = processador.obter(gerenciador)
+    assert nova_versao > versao
+    assert resultado["referencia"] == Amanha.today()
+
+
+def aguardar_tarefa(processador, gerenciador, limite=10):
+    """Aguarda a tarefa em segundo plano do gerenciador terminar e devolve o estado final."""
+    fim = time.monotonic() + limite
+    while processador.estado(gerenciador)["estado"] in ("agendada", "executando"):
+        assert time.monotonic() < fim, "a tarefa em segundo plano não terminou"
+        time.sleep(0.01)
+    return processador.estado(gerenciador)
+
+
+def test_processador_agrupa_pedidos_e_mantem_o_resultado_durante_a_execucao(gerenciador, monkeypatch):
+    processador = ProcessadorRelatorios()
+    resultado, versao = processador.obter(gerenciador)
+
+    # A tarefa em segundo plano fica presa no cálculo até ser liberada
+    calcular, iniciou, liberar, chamadas = processador.calcular, threading.Event(), threading.Event(), []
+    def calcular_bloqueado(gerenciador, imagem=False):
+        chamadas.append(imagem)
+        iniciou.set()
+        assert liberar.wait(10)
+        return calcular(gerenciador, imagem)
+    monkeypatch.setattr(processador, "calcular", calcular_bloqueado)
+
+    _, sucesso, mensagem = gerenciador.salvar_dados("2025-06-07", "Manhã", 90)
+    assert sucesso, mensagem
+    processador.agendar(gerenciador)
+    assert iniciou.wait(10)
+
+    # Durante a execução, o resultado anterior é mantido sem novo cálculo
+    atual, versao_atual = processador.obter(gerenciador)
+    assert atual is resultado and versao_atual == versao
+
+    # Pedidos feitos durante a execução viram uma única nova execução
+    processador.agendar(gerenciador)
+    processador.agendar(gerenciador)
+    assert processador.estado(gerenciador)["repetir"]
+    liberar.set()
+
+    estado = aguardar_tarefa(processador, gerenciador)
+    assert estado["estado"] == "concluida"
+    assert len(chamadas) == 2
+    assert estado["versao"] == versao + 1
+    assert media_escala(estado["resultado"], "sábado", "Manhã") == 50
+
+    # O novo resultado está em dia e é servido sem recalcular
+    atual, versao_atual = processador.obter(gerenciador)
+    assert atual is estado["resultado"] and versao_atual == versao + 1
+    assert len(chamadas) == 2
+
+
+def test_processador_com_erro_recalcula_no_proximo_pedido(gerenciador, monkeypatch):
+    processador = ProcessadorRelatorios()
+    _, versao = processador.obter(gerenciador)
+    _, sucesso, mensagem = gerenciador.salvar_dados("2025-06-07", "Manhã", 90)
+    assert sucesso, mensagem
+
+    def calcular_com_erro(gerenciador, imagem=False):
+        raise RuntimeError("falha no cálculo")
+    with monkeypatch.context() as contexto:
+        contexto.setattr(processador, "calcular", calcular_com_erro)
+        processador.agendar(gerenciador)
+        estado = aguardar_tarefa(processador, gerenciador)
+    assert estado["estado"] == "erro" and estado["erro"] == "falha no cálculo"
+
+    # O resultado guardado ficou desatualizado: o próximo pedido o recalcula
+    resultado, nova_versao = processador.obter(gerenciador)
+    assert nova_versao == versao + 1
+    assert media_escala(resultado, "sábado", "Manhã") == 50
+
+
+def test_snapshot_novo_nao_substitui_o_arquivo_mapeado(gerenciador, tmp_path):
+    assert gerenciador.atualizar_snapshot()
+    mapeado = gerenciador._ler_snapshot(CacheCarregamento.assinatura(gerenciador.data_file))
+    assert len(mapeado) == 1
+
+    _, sucesso, mensagem = gerenciador.salvar_dados("2025-06-01", "Tarde", 40)
+    assert sucesso, mensagem
+    assert gerenciador.atualizar_snapshot()
+
+    # A versão anterior continua válida para quem a mapeou; a nova é outro arquivo
+    assert mapeado.quantidades.tolist() == [10]
+    atual = gerenciador._ler_snapshot(CacheCarregamento.assinatura(gerenciador.data_file))
+    assert atual.quantidades.tolist() == [10, 40]
+    assert len(list(tmp_path.glob("movimento_loja.csv.snapshot.*.npy"))) == 1
+
+
+def test_atualizar_snapshot_le_o_arquivo_em_blocos(gerenciador, monkeypatch):
+    for data, quantidade in [("2025-06-01", 20), ("2025-06-02", 70000)]:
+        _, sucesso, mensagem = gerenciador.salvar_dados(data, "Noite", quantidade)
+        assert sucesso, mensagem
+
+    def ler_completo():
+        raise AssertionError("o arquivo inteiro não deve ser lido")
+
+    with monkeypatch.context() as contexto:
+        contexto.setattr(gerenciador.armazenamento, "ler", ler_completo)
+        assert gerenciador.atualizar_snapshot()
+
+    registros = gerenciador._ler_snapshot(CacheCarregamento.assinatura(gerenciador.data_file))
+    esperado = aplicar_esquema(gerenciador.armazenamento.ler())
+    pd.testing.assert_frame_equal(registros.para_dataframe(), esperado, check_dtype=False, check_categorical=False)
+
+
+def test_aplicar_esquema_deriva_o_dia_da_semana_e_descarta_turnos_invalidos():
+    df = pd.DataFrame({
+        "data": ["2025-05-31", "2025-06-01", "2025-06-02"],
+        "dia_da_semana": ["sabado", "domingo", "segunda-feira"],
+        "turno": ["Manhã", "Madrugada", "Noite"],
+        "quantidade_pessoas": [10, 20, 30],
+    })
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        tipado = aplicar_esquema(df)
+
+    assert tipado['dia_da_semana'].tolist() == ["sábado", "segunda-feira"]
+    assert tipado['turno'].tolist() == ["Manhã", "Noite"]
+    assert aplicar_esquema(tipado.assign(dia_da_semana=tipado['dia_da_semana'].iloc[::-1].to_numpy()))[
+        'dia_da_semana'].tolist() == ["sábado", "segunda-feira"]
+
+
+def test_codificar_lote_rejeita_turnos_e_datas_invalidos():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        codigos = IndiceChaves.codificar_lote(["2025-06-01", "2025-06-01", "data"], ["Tarde", "Madrugada", "Noite"])
+
+    assert codigos.tolist() == [IndiceChaves.codificar(date(2025, 6, 1), "Tarde"), -1, -1]
+
+
+def test_alterar_os_dados_obtidos_nao_altera_o_cache(gerenciador):
+    dados = gerenciador.carregar_dados()
+    dados.loc[0, 'quantidade_pessoas'] = 999
+    dados.iloc[0, 2] = "Noite"
+
+    novamente = gerenciador.carregar_dados()
+    assert novamente.loc[0, 'quantidade_pessoas'] == 10
+    assert novamente.loc[0, 'turno'] == "Manhã"
+
+
+def test_arquivo_sqlite_usa_o_gerenciador_sqlite(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    caixa1 = GerenciadorDados(data_file=str(tmp_path / "movimento_loja.db"))
+    caixa2 = GerenciadorDados(str(tmp_path / "movimento_loja.db"))
+    loja = GerenciadorDados.para_loja("centro", str(tmp_path), extensao=".db")
+    assert all(isinstance(gerenciador, GerenciadorDadosSQLite) for gerenciador in (caixa1, caixa2, loja))
+
+    # O segundo caixa já conhecia o banco (índice construído) antes da gravação do primeiro
+    assert not caixa2.verificar_duplicidade("2025-06-01", "Tarde")
+    _, sucesso, _ = caixa1.salvar_dados("2025-06-01", "Tarde", 40)
+    assert sucesso
+    _, sucesso, mensagem = caixa2.salvar_dados("2025-06-01", "Tarde", 99)
+    assert not sucesso
+    assert mensagem == "Já existe um registro para esta data e turno."
+
+
+def test_cubo_incorpora_gravacoes_de_outros_processos_sem_reconstruir(gerenciador, monkeypatch):
+    assert gerenciador.obter_cubo().contagem.sum() == 1
+    _, sucesso, _ = gerenciador.salvar_dados("2025-06-01", "Tarde", 20)
+    assert sucesso
+
+    def reconstruir():
+        raise AssertionError("o cubo não deve ser reconstruído")
+
+    monkeypatch.setattr(gerenciador, "reconstruir_cubo", reconstruir)
+    outro = GerenciadorDados(data_file=gerenciador.data_file)
+    _, sucesso, _ = outro.salvar_dados("2025-06-02", "Noite", 30)
+    assert sucesso
+    anexar_bruto(gerenciador, "2025-06-03,terça-feira,Manhã,4".encode())
+    assert gerenciador.obter_cubo().soma.sum() == 60
+
+    # A linha incompleta é incorporada uma única vez, quando terminada
+    anexar_bruto(gerenciador, "0\n".encode())
+    _, sucesso, _ = gerenciador.salvar_dados("2025-06-04", "Tarde", 50)
+    assert sucesso
+    cubo = gerenciador.obter_cubo()
+    assert cubo.contagem.sum() == 5
+    assert cubo.soma.sum() == 150
+
+
+def test_cubo_e_salvo_fora_do_caminho_das_gravacoes(gerenciador, monkeypatch):
+    gerenciador.obter_cubo()
+    _, sucesso, _ = gerenciador.salvar_dados("2025-06-01", "Tarde", 20)
+    assert sucesso
+    assert gerenciador.salvar_cubo()
+    assert not gerenciador.salvar_cubo()
+
+    # Outra instância carrega o cubo salvo, sem reconstruí-lo
+    outro = GerenciadorDados(data_file=gerenciador.data_file)
+    monkeypatch.setattr(outro, "reconstruir_cubo", lambda: pytest.fail("o cubo não deve ser reconstruído"))
+    assert outro.obter_cubo().soma.sum() == 30
+
+
+def test_regra_sem_faixas_para_a_loja_usa_as_faixas_padrao(tmp_path):
+    caminho = tmp_path / "regras_funcionarios.csv"
+    caminho.write_text("loja,limite_minimo,funcionarios\npraia,0,2\npraia,40,5\n", encoding="utf-8")
+
+    assert RegraFuncionarios.carregar(str(caminho), loja="praia").aplicar([10, 40]).tolist() == [2, 5]
+    for loja in ("centro", None):
+        regra = RegraFuncionarios.carregar(str(caminho), loja=loja)
+        assert regra.limites.tolist() == RegraFuncionarios.LIMITES_PADRAO
+
+    # Arquivo sem as colunas esperadas também não impede a análise
+    caminho.write_text("limite,quantidade\n0,1\n", encoding="utf-8")
+    assert RegraFuncionarios.carregar(str(caminho)).limites.tolist() == RegraFuncionarios.LIMITES_PADRAO
+
+
+def funcionarios_por_faixas_fixas(media_pessoas):
+    """Faixas fixas usadas antes da tabela de regras."""
+    if media_pessoas < 25:
+        return 1
+    elif media_pessoas < 50:
+        return 2
+    elif media_pessoas < 100:
+        return 3
+    else:
+        return 4
+
+
+def test_regra_padrao_equivale_as_faixas_fixas_nos_limites():
+    limites = np.array(RegraFuncionarios.LIMITES_PADRAO, dtype=np.float64)
+    # Cada limite, o valor imediatamente abaixo e o imediatamente acima
+    medias = np.concatenate([limites, np.nextafter(limites, -np.inf), np.nextafter(limites, np.inf),
+                             [-1.0, 24.99, 49.99, 99.99, 1e9]])
+
+    assert RegraFuncionarios().aplicar(medias).tolist() == [funcionarios_por_faixas_fixas(m) for m in medias]
+
+
+def test_regra_do_arquivo_fora_de_ordem_aplica_as_faixas_pelos_limites(tmp_path):
+    caminho = tmp_path / "regras_funcionarios.csv"
+    caminho.write_text("limite_minimo,funcionarios\n100,4\n0,1\n50,3\n25,2\n", encoding="utf-8")
+
+    regra = RegraFuncionarios.carregar(str(caminho))
+
+    medias = [0, 24.999, 25, 49.999, 50, 99.999, 100, 250]
+    assert regra.aplicar(medias).tolist() == [funcionarios_por_faixas_fixas(m) for m in medias]
+
+
+def test_registro_dos_tempos_vale_apenas_para_a_execucao_que_o_pede(tmp_path):
+    instrumentacao = Instrumentacao()
+    log = tmp_path / "tempos_execucao.jsonl"
+    for registrar in (True, False, True):
+        instrumentacao.iniciar_execucao()
+        with instrumentacao.medir("trecho"):
+            pass
+        instrumentacao.finalizar_execucao("sessão", str(log) if registrar else None)
+
+    assert len(log.read_text(encoding="utf-8").splitlines()) == 2
+    assert instrumentacao.log_file is None
+    assert len(instrumentacao.historico) == 3